@@ -4,10 +4,18 @@ File: app.py
 """
 
 from flask import Flask
+import logging
 import os
 from dotenv import load_dotenv
 load_dotenv()
 
+# These register MongoDB command listeners, so they must come before any model import
+from utils import metrics
+from utils import slow_queries  # noqa: F401 (import registers the slow-query listener)
+from utils import logging_setup
+
+logger = logging.getLogger(__name__)
+
 # ============================================
 # FLASK APP INITIALIZATION
 # ============================================
@@ -15,6 +23,9 @@ load_dotenv()
 def create_app():
     """Factory function to create Flask app"""
     
+    # JSON logs through a background thread (before any model logs a line)
+    logging_setup.configure_logging()
+
     # Get absolute paths
     BASE_DIR = os.path.abspath(os.path.dirname(__file__))
     TEMPLATE_DIR = os.path.join(BASE_DIR, 'templates')
@@ -24,11 +35,23 @@ def create_app():
     app = Flask(__name__, 
                 template_folder=TEMPLATE_DIR,
                 static_folder=STATIC_DIR)
-    app.secret_key = os.getenv("SECRET_KEY")
+    # Signs session cookies and API tokens; refuse to start without a real one
+    from utils.security import require_secret_key
+    app.secret_key = require_secret_key(os.getenv("SECRET_KEY"))
+
+    # ObjectId/datetime-aware JSON (orjson when installed)
+    from utils.json_provider import MongoJSONProvider
+    app.json = MongoJSONProvider(app)
 
-    # Debug: Print paths
-    print(f"Template folder: {TEMPLATE_DIR}")
-    print(f"Static folder: {STATIC_DIR}")
+    # Keep session data server-side; the cookie only holds an opaque ID
+    if os.getenv('SESSION_BACKEND', 'mongo') == 'mongo':
+        from models.database import db
+        from utils.session_store import MongoSessionInterface
+        app.session_interface = MongoSessionInterface(db['sessions'])
+
+    # Debug: Log paths
+    logger.debug("Template folder: %s", TEMPLATE_DIR)
+    logger.debug("Static folder: %s", STATIC_DIR)
     
     # ============================================
     # REGISTER BLUEPRINTS (Routes)
@@ -39,12 +62,28 @@ def create_app():
     from routes.profile_routes import profile_bp
     from routes.form_routes import form_bp
     from routes.calendar_routes import calendar_bp
+    from routes.health_routes import health_bp
+    from routes.admin_routes import admin_bp
+    from routes.api_v1 import api_v1_bp
 
     app.register_blueprint(calendar_bp)
     app.register_blueprint(auth_bp)
     app.register_blueprint(medicine_bp)
     app.register_blueprint(profile_bp)
     app.register_blueprint(form_bp)
+    app.register_blueprint(health_bp)
+    app.register_blueprint(admin_bp)
+    app.register_blueprint(api_v1_bp)
+    
+    # Request timing and /metrics
+    metrics.init_app(app)
+
+    # Request IDs on every log line and response
+    logging_setup.init_app(app)
+
+    # Maintenance commands (flask --app app <command>)
+    from commands import register_commands
+    register_commands(app)
     
     # ============================================
     # ERROR HANDLERS
@@ -79,6 +118,8 @@ if __name__ == '__main__':
     print("Forgot Password: http://localhost:5000/forgot_password")
     print("Set new Password: http://localhost:5000/set_new_password/<token>")
     print("Calendar: http://localhost:5000/calendar")
+    print("Health: http://localhost:5000/healthz  Ready: http://localhost:5000/readyz")
+    print("\nProduction: gunicorn -c gunicorn.conf.py wsgi:app")
     print("\nPress CTRL+C to stop\n")
     
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,332 @@
+"""
+ASGI Entry Point - Async Serving Mode
+File: asgi.py
+
+Run with an ASGI server, for example:
+    uvicorn asgi:app --host 0.0.0.0 --port 8000
+
+The hot endpoints (medicine page, /api/* reads and the calendar) are served
+by async handlers that use the async MongoDB driver and async HTTP for LM
+Studio, so a slow query or a long AI generation only parks a coroutine.
+Every other route is passed through to the normal Flask app.
+"""
+
+from asgiref.wsgi import WsgiToAsgi
+from flask import g, render_template, session
+from flask.ctx import RequestContext
+from pymongo.errors import DuplicateKeyError
+import asyncio
+import logging
+import re
+import time
+
+from app import create_app
+from models import async_collections, interactions
+from utils import ai_refresh, logging_setup, metrics, page_cache, rate_limit
+from utils.ai_service import generate_medicine_info_async
+from utils.helpers import get_current_user
+
+logger = logging.getLogger(__name__)
+
+flask_app = create_app()
+wsgi_fallback = WsgiToAsgi(flask_app)
+
+# Same in-process status map (and interaction lookup) the sync medicine routes use
+from routes.medicine_routes import ai_status, load_user_interactions
+
+# Keep references so running generation tasks aren't garbage collected
+_background_tasks = set()
+
+# ============================================
+# REQUEST HELPERS
+# ============================================
+
+def _scope_to_environ(scope):
+    """Build a minimal WSGI environ (no body) from an ASGI HTTP scope"""
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': None,
+        'wsgi.errors': None,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    server = scope.get('server') or ('localhost', 80)
+    environ['SERVER_NAME'] = server[0]
+    environ['SERVER_PORT'] = str(server[1])
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name == 'CONTENT_LENGTH':
+            environ['CONTENT_LENGTH'] = value
+        else:
+            key = f'HTTP_{name}'
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+async def _request_context(environ):
+    """
+    Create a Flask request context for an async handler.
+    The session lookup may hit MongoDB, so it is opened in a worker thread
+    and handed to the context; pushing it then doesn't open it again.
+    """
+    request = flask_app.request_class(environ)
+    session_interface = flask_app.session_interface
+    flask_session = await asyncio.to_thread(session_interface.open_session, flask_app, request)
+    if flask_session is None:
+        flask_session = session_interface.make_null_session(flask_app)
+    return RequestContext(flask_app, environ, request=request, session=flask_session)
+
+
+async def _send_response(send, status, body, content_type, headers=()):
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', content_type.encode('latin-1')),
+            (b'content-length', str(len(body)).encode('latin-1')),
+            *headers
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _send_html(send, html, status=200, headers=()):
+    await _send_response(send, status, html, 'text/html; charset=utf-8', headers)
+
+
+async def _send_json(send, payload, status=200):
+    await _send_response(send, status, flask_app.json.dumps(payload), 'application/json')
+
+
+async def _send_redirect(send, location):
+    await _send_response(send, 302, b'', 'text/html; charset=utf-8',
+                         [(b'location', location.encode('latin-1'))])
+
+# ============================================
+# ASYNC ROUTES
+# ============================================
+
+async def medicine_details(send, name):
+    """Async version of routes.medicine_routes.medicine_details"""
+    medicine_name = name.lower().replace('-', ' ')
+
+    # Track search history if user is logged in
+    if 'email' in session:
+        await async_collections.add_to_search_history(session['email'], medicine_name)
+
+    # Anonymous visitors all see the same page, so serve it from the cache
+    is_anonymous = 'email' not in session and 'user_id' not in session
+    if is_anonymous:
+        cached_page = await asyncio.to_thread(page_cache.get_page, medicine_name)
+        if cached_page is not None:
+            await async_collections.record_medicine_view(medicine_name)
+            return await _send_html(send, cached_page)
+        page_version = await asyncio.to_thread(page_cache.get_version, medicine_name)
+
+    medicine_data = await async_collections.get_medicine_by_name(medicine_name)
+
+    if medicine_data:
+        await async_collections.record_medicine_view(medicine_name)
+        await asyncio.to_thread(ai_refresh.schedule_refresh, medicine_data)
+
+        # Fetch reviews, rating, favorite state and the user's medications concurrently
+        if 'email' in session:
+            favorite_query = async_collections.is_favorite(session['email'], medicine_name)
+            interactions_query = asyncio.to_thread(load_user_interactions, session['email'])
+        else:
+            favorite_query = asyncio.sleep(0, result=False)
+            interactions_query = asyncio.sleep(0, result=None)
+        reviews, rating_data, is_favorited, user_interactions = await asyncio.gather(
+            async_collections.get_medicine_reviews(medicine_name),
+            async_collections.get_medicine_average_rating(medicine_name),
+            favorite_query,
+            interactions_query
+        )
+        interaction_warnings = []
+        if user_interactions:
+            interaction_warnings = interactions.get_index().with_drug(
+                medicine_data['name'], user_interactions['medications'])
+
+        html = render_template(
+            'medicine.html',
+            medicine=medicine_data,
+            user=get_current_user(),
+            is_favorited=is_favorited,
+            reviews=reviews,
+            interaction_warnings=interaction_warnings,
+            average_rating=rating_data['average'] if rating_data else 0,
+            review_count=rating_data['count'] if rating_data else 0
+        )
+
+        if is_anonymous:
+            await asyncio.to_thread(page_cache.set_page, medicine_name, html, page_version)
+
+        return await _send_html(send, html)
+
+    # Medicine not found - need AI to generate it
+    description = '🤖 AI is generating information... Please wait 1-3 minutes.'
+    retry_after = None
+    if ai_status.get(medicine_name, 'new') == 'new':
+        retry_after = await asyncio.to_thread(rate_limit.check, 'ai')
+        lease_id = None if retry_after else await asyncio.to_thread(rate_limit.acquire_generation_slot)
+        if lease_id is None:
+            description = '🤖 Too many medicines are being generated right now. Trying again shortly...'
+            retry_after = retry_after or rate_limit.LM_SLOT_RETRY_AFTER
+        else:
+            ai_status[medicine_name] = 'working'
+            task = asyncio.create_task(generate_ai_info(medicine_name, lease_id))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+
+    loading_data = {
+        'name': name.replace('-', ' ').title(),
+        'description': description,
+        'advice': '⏳ Page will refresh automatically every 10 seconds.',
+        'warning': '💡 Make sure LM Studio is running!',
+        'pubmed_link': f'https://pubmed.ncbi.nlm.nih.gov/?term={name.replace("-", "+")}'
+    }
+
+    html = render_template('medicine.html',
+                           medicine=loading_data,
+                           user=get_current_user(),
+                           is_favorited=False,
+                           reviews=[],
+                           average_rating=0,
+                           review_count=0)
+    if retry_after:
+        return await _send_html(send, html, 429, [(b'retry-after', str(retry_after).encode())])
+    await _send_html(send, html)
+
+
+async def generate_ai_info(medicine_name, lease_id=None):
+    """Background task: generate medicine info without holding a thread"""
+    try:
+        with metrics.AI_GENERATIONS_IN_PROGRESS.track_inprogress():
+            medicine_data = await generate_medicine_info_async(medicine_name)
+    finally:
+        if lease_id:
+            await asyncio.to_thread(rate_limit.release_generation_slot, lease_id)
+
+    if medicine_data:
+        try:
+            await async_collections.create_medicine(medicine_data)
+        except DuplicateKeyError:
+            # Another worker stored it first (or the LM named a medicine we have)
+            logger.info("Medicine already stored", extra={'medicine': medicine_name})
+        await asyncio.to_thread(page_cache.invalidate, medicine_data.get('name', medicine_name))
+        ai_status[medicine_name] = 'done'
+    else:
+        ai_status[medicine_name] = 'failed'
+
+
+async def search_history_api(send):
+    """Async version of GET /api/search-history"""
+    if 'email' not in session:
+        return await _send_json(send, {'success': False, 'history': []})
+
+    history = await async_collections.get_user_search_history(session['email'], limit=20)
+    await _send_json(send, {'success': True, 'history': history})
+
+
+async def favorites_api(send):
+    """Async version of GET /api/favorites"""
+    if 'email' not in session:
+        return await _send_json(send, {'success': False, 'favorites': []})
+
+    favorites = await async_collections.get_user_favorites(session['email'])
+    await _send_json(send, {'success': True, 'favorites': favorites})
+
+
+async def auth_status_api(send):
+    """Async version of GET /api/auth/status"""
+    await _send_json(send, get_current_user())
+
+
+async def calendar_page(send):
+    """Async version of routes.calendar_routes.calendar_page"""
+    email = session.get('email')
+    if not email:
+        return await _send_redirect(send, '/login')
+
+    schedule = await async_collections.get_schedule_by_email(email)
+    html = render_template('calendar.html', schedule=schedule)
+    await _send_html(send, html)
+
+
+# (pattern, handler) - only GET requests are routed here
+ASYNC_ROUTES = [
+    (re.compile(r'^/medicine/(?P<name>[^/]+)$'), medicine_details),
+    (re.compile(r'^/api/search-history$'), search_history_api),
+    (re.compile(r'^/api/favorites$'), favorites_api),
+    (re.compile(r'^/api/auth/status$'), auth_status_api),
+    (re.compile(r'^/calendar$'), calendar_page),
+]
+
+# ============================================
+# ASGI APPLICATION
+# ============================================
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await async_collections.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def _dispatch(handler, scope, send, kwargs):
+    """Run an async handler inside a Flask request context and time it"""
+    status = 500
+    started = time.perf_counter()
+    request_id = None
+
+    async def send_with_status(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+            if request_id:
+                message['headers'] = [*message.get('headers', []),
+                                      (b'x-request-id', request_id.encode('latin-1'))]
+        await send(message)
+
+    try:
+        ctx = await _request_context(_scope_to_environ(scope))
+        with ctx:
+            logging_setup.assign_request_id()
+            request_id = g.request_id
+            await handler(send_with_status, **kwargs)
+    finally:
+        metrics.record_request('asgi', handler.__name__, scope['method'], status,
+                               time.perf_counter() - started)
+
+
+async def app(scope, receive, send):
+    """ASGI callable: async handlers for hot GET routes, Flask for the rest"""
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+
+    # The async handlers always send a body, so HEAD goes to Flask, which drops it
+    if scope['type'] == 'http' and scope['method'] == 'GET':
+        for pattern, handler in ASYNC_ROUTES:
+            match = pattern.match(scope['path'])
+            if match:
+                return await _dispatch(handler, scope, send, match.groupdict())
+
+    await wsgi_fallback(scope, receive, send)
@@ -0,0 +1,99 @@
+"""
+Benchmark - Sync (WSGI) vs Async (ASGI) serving mode
+File: benchmarks/bench_async.py
+
+Start both servers against the same database, then point this script at them:
+
+    python app.py                                   # sync, port 5000
+    uvicorn asgi:app --port 8000                    # async, port 8000
+    python benchmarks/bench_async.py \\
+        --sync http://localhost:5000 --async http://localhost:8000 \\
+        --path /medicine/aspirin --concurrency 1000 --requests 20000
+
+Reports requests/second, latency percentiles and errors for each mode.
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(pct / 100 * len(values))) - 1))
+    return values[index]
+
+
+async def run_load(base_url, path, total_requests, concurrency):
+    """
+    Fire total_requests GETs at base_url + path with a fixed number of
+    concurrent connections.
+
+    Returns:
+        dict: rps, latency percentiles (ms) and error count
+    """
+    latencies = []
+    errors = 0
+    remaining = total_requests
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    if response.status_code >= 500:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'errors': errors,
+    }
+
+
+def print_result(label, result):
+    print(f"{label:<6} {result['requests']:>8} req  {result['rps']:>9.1f} req/s  "
+          f"p50 {result['p50']:>8.1f} ms  p95 {result['p95']:>8.1f} ms  "
+          f"p99 {result['p99']:>8.1f} ms  errors {result['errors']}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description='Compare sync and async serving modes')
+    parser.add_argument('--sync', dest='sync_url', help='Base URL of the WSGI server')
+    parser.add_argument('--async', dest='async_url', help='Base URL of the ASGI server')
+    parser.add_argument('--path', default='/medicine/aspirin')
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=200)
+    args = parser.parse_args()
+
+    if not args.sync_url and not args.async_url:
+        parser.error('give at least one of --sync / --async')
+
+    print(f"GET {args.path}  requests={args.requests}  concurrency={args.concurrency}")
+    for label, url in (('sync', args.sync_url), ('async', args.async_url)):
+        if url:
+            print_result(label, await run_load(url, args.path, args.requests, args.concurrency))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,141 @@
+"""
+Benchmark - Cache value serialization and backend round trips
+File: benchmarks/bench_cache_serialization.py
+
+Measures what it costs to put our typical cached values (a rendered medicine
+page, a medicine document, a session, a rating summary) into a shared cache:
+
+1. encode/decode time and size per serializer (pickle, json, and orjson /
+   msgpack when installed)
+2. set/get/get_many throughput per backend in utils/cache.py
+
+    python benchmarks/bench_cache_serialization.py
+    python benchmarks/bench_cache_serialization.py --redis redis://localhost:6379/15
+
+The SQLite backend uses a temporary file; Redis is only measured with --redis.
+"""
+
+import argparse
+import json
+import os
+import pickle
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.cache import MemoryCache, RedisCache, SQLiteCache
+
+
+def sample_values():
+    """Values shaped like what the app caches"""
+    medicine = {
+        'name': 'Ibuprofen',
+        'description': 'Ibuprofen is a painkiller that helps with headaches, muscle aches, '
+                       'period pain, and fever. ' * 2,
+        'advice': '\n'.join(f'• Advice line number {i}' for i in range(4)),
+        'warning': '\n'.join(f'• Warning line number {i}' for i in range(4)),
+        'pubmed_link': 'https://pubmed.ncbi.nlm.nih.gov/?term=ibuprofen',
+        'source': 'ai',
+        'prompt_version': 2,
+        'model': 'local-model',
+    }
+    return {
+        'page': '<html>' + '<div class="review">Great, worked fast.</div>' * 400 + '</html>',
+        'medicine': medicine,
+        'session': {'user_id': '65f0c0ffee', 'email': 'user@example.com', 'username': 'Test User'},
+        'rating': {'average': 4.3, 'count': 27},
+    }
+
+
+def serializers():
+    """name -> (dumps, loads) for every serializer available here"""
+    found = {
+        'pickle': (lambda v: pickle.dumps(v, protocol=pickle.HIGHEST_PROTOCOL), pickle.loads),
+        'json': (lambda v: json.dumps(v).encode(), json.loads),
+    }
+    try:
+        import orjson
+        found['orjson'] = (orjson.dumps, orjson.loads)
+    except ImportError:
+        pass
+    try:
+        import msgpack
+        found['msgpack'] = (msgpack.packb, msgpack.unpackb)
+    except ImportError:
+        pass
+    return found
+
+
+def time_per_call(func, iterations):
+    """Average microseconds per call"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+def bench_serializers(values, iterations):
+    print(f"{'value':<10}{'serializer':<12}{'bytes':>9}{'dump µs':>10}{'load µs':>10}")
+    for value_name, value in values.items():
+        for name, (dumps, loads) in serializers().items():
+            data = dumps(value)
+            dump_us = time_per_call(lambda: dumps(value), iterations)
+            load_us = time_per_call(lambda: loads(data), iterations)
+            print(f"{value_name:<10}{name:<12}{len(data):>9}{dump_us:>10.2f}{load_us:>10.2f}")
+    # datetimes (sessions carry expires_at) only survive pickle unchanged
+    print("\nNote: json/orjson/msgpack turn datetimes into strings or fail; "
+          "pickle round-trips them:", pickle.loads(pickle.dumps(datetime.utcnow())).__class__.__name__)
+
+
+def bench_backend(name, cache, values, iterations):
+    """Print ops/second for set, get and a 20-key get_many"""
+    keys = [f'bench:{i}' for i in range(20)]
+    value = values['medicine']
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        cache.set(keys[i % len(keys)], value, 60)
+    set_rate = iterations / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        cache.get(keys[i % len(keys)])
+    get_rate = iterations / (time.perf_counter() - start)
+
+    batches = max(1, iterations // 20)
+    start = time.perf_counter()
+    for _ in range(batches):
+        cache.get_many(keys)
+    many_rate = batches * len(keys) / (time.perf_counter() - start)
+
+    print(f"{name:<10}{set_rate:>12,.0f}{get_rate:>12,.0f}{many_rate:>16,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cache serialization and backend benchmark")
+    parser.add_argument('--iterations', type=int, default=5000)
+    parser.add_argument('--redis', help="Redis URL to include (use a scratch database)")
+    args = parser.parse_args()
+
+    values = sample_values()
+    print("=== Serializers ===")
+    bench_serializers(values, args.iterations)
+
+    print("\n=== Backends (ops/second, medicine document) ===")
+    print(f"{'backend':<10}{'set':>12}{'get':>12}{'get_many/key':>16}")
+    bench_backend('memory', MemoryCache(), values, args.iterations)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bench_backend('sqlite', SQLiteCache(os.path.join(tmp, 'cache.db')), values, args.iterations)
+
+    if args.redis:
+        cache = RedisCache(args.redis, prefix='medinfo-bench:')
+        bench_backend('redis', cache, values, args.iterations)
+        cache.clear()
+
+
+if __name__ == '__main__':
+    main()
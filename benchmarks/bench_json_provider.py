@@ -0,0 +1,107 @@
+"""
+Benchmark - JSON encoding of large review and history payloads
+File: benchmarks/bench_json_provider.py
+
+Compares three ways of turning MongoDB documents into a JSON response body:
+
+1. the old way: convert every _id to str in a loop, then Flask's default provider
+2. utils/json_provider.py on the stdlib json module (no orjson)
+3. utils/json_provider.py on orjson (when installed)
+
+    python benchmarks/bench_json_provider.py
+    python benchmarks/bench_json_provider.py --documents 20000 --iterations 20
+
+No database is needed; the documents are generated in memory.
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils import json_provider
+from utils.json_provider import MongoJSONProvider
+
+
+def sample_payloads(documents):
+    """Reviews and search history shaped like what the API returns"""
+    now = datetime.utcnow()
+    reviews = [{
+        '_id': ObjectId(),
+        'user_email': f'user{i}@example.com',
+        'medicine_name': 'ibuprofen',
+        'rating': i % 5 + 1,
+        'review_text': 'Worked well for my headache, no side effects so far. ' * 3,
+        'created_at': now - timedelta(minutes=i),
+        'updated_at': now - timedelta(minutes=i),
+    } for i in range(documents)]
+    history = [{
+        '_id': ObjectId(),
+        'user_email': 'user@example.com',
+        'medicine_name': f'medicine {i}',
+        'timestamp': now - timedelta(seconds=i),
+        'search_count': i % 7 + 1,
+    } for i in range(documents)]
+    return {'reviews': reviews, 'history': history}
+
+
+def legacy_dumps(provider, documents):
+    """The per-document str(_id) loop the getters used to run, then dumps"""
+    converted = [dict(document) for document in documents]
+    for document in converted:
+        document['_id'] = str(document['_id'])
+    return provider.dumps({'success': True, 'items': converted})
+
+
+def time_per_call(func, iterations):
+    """Average milliseconds per call"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON provider benchmark")
+    parser.add_argument('--documents', type=int, default=5000)
+    parser.add_argument('--iterations', type=int, default=10)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    default_provider = DefaultJSONProvider(app)
+    mongo_provider = MongoJSONProvider(app)
+    orjson_module = json_provider.orjson
+
+    print(f"{'payload':<10}{'encoder':<22}{'bytes':>11}{'ms':>10}")
+    for name, documents in sample_payloads(args.documents).items():
+        runs = [('str(_id) + default', lambda: legacy_dumps(default_provider, documents))]
+
+        def stdlib(documents=documents):
+            json_provider.orjson = None
+            try:
+                return mongo_provider.dumps({'success': True, 'items': documents})
+            finally:
+                json_provider.orjson = orjson_module
+        runs.append(('provider (stdlib)', stdlib))
+
+        if orjson_module is not None:
+            runs.append(('provider (orjson)',
+                         lambda: mongo_provider.dumps({'success': True, 'items': documents})))
+        else:
+            print("(orjson not installed, skipping the orjson run)")
+
+        for label, func in runs:
+            size = len(func())
+            ms = time_per_call(func, args.iterations)
+            print(f"{name:<10}{label:<22}{size:>11,}{ms:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark - Full documents vs projected records
+File: benchmarks/bench_records.py
+
+For 10k documents per collection, compares what a list endpoint used to
+load (whole documents as dicts) with what it loads now (projected fields
+built into the slotted records from models/records.py):
+
+- BSON bytes on the wire
+- BSON decode time
+- memory held by the resulting Python objects (tracemalloc)
+
+    python benchmarks/bench_records.py
+    python benchmarks/bench_records.py --records 50000
+
+No database is needed: documents are BSON-encoded in memory to stand in
+for server replies.
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import bson
+from bson import ObjectId
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models.records import Favorite, Review, SavedMed, ScheduledMed
+
+
+def sample_documents(count):
+    """Full documents as stored, per record type"""
+    now = datetime.utcnow()
+    return {
+        SavedMed: [{
+            '_id': ObjectId(), 'email': 'user@example.com', 'medication': f'Medicine {i}'
+        } for i in range(count)],
+        ScheduledMed: [{
+            '_id': ObjectId(), 'email': 'user@example.com', 'medication': f'Medicine {i}',
+            'schedule_time': '2026-03-01T08:30'
+        } for i in range(count)],
+        Favorite: [{
+            '_id': ObjectId(), 'user_email': 'user@example.com',
+            'medicine_name': f'medicine {i}', 'added_at': now - timedelta(minutes=i)
+        } for i in range(count)],
+        Review: [{
+            '_id': ObjectId(), 'user_email': f'user{i}@example.com', 'medicine_name': 'ibuprofen',
+            'rating': i % 5 + 1, 'review_text': 'Worked well for my headache. ' * 4,
+            'created_at': now - timedelta(minutes=i), 'updated_at': now - timedelta(minutes=i)
+        } for i in range(count)],
+    }
+
+
+def project(document, projection):
+    """What the server sends back for a projected find()"""
+    wanted = {key for key, value in projection.items() if value}
+    return {key: value for key, value in document.items() if key in wanted}
+
+
+def measure(build):
+    """(milliseconds to build, bytes held by the result), timed without tracemalloc"""
+    gc.collect()
+    start = time.perf_counter()
+    result = build()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    del result
+
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed_ms, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Projected record benchmark")
+    parser.add_argument('--records', type=int, default=10000)
+    args = parser.parse_args()
+
+    print(f"Per {args.records:,} records\n")
+    print(f"{'record':<14}{'shape':<10}{'wire KB':>10}{'decode ms':>11}{'memory KB':>11}")
+    for record_type, documents in sample_documents(args.records).items():
+        full_wire = [bson.encode(document) for document in documents]
+        projected_wire = [bson.encode(project(document, record_type.PROJECTION))
+                          for document in documents]
+
+        dict_ms, dict_memory = measure(lambda: [bson.decode(raw) for raw in full_wire])
+        record_ms, record_memory = measure(
+            lambda: [record_type.from_doc(bson.decode(raw)) for raw in projected_wire])
+
+        name = record_type.__name__
+        print(f"{name:<14}{'dict':<10}{sum(map(len, full_wire)) / 1024:>10,.0f}"
+              f"{dict_ms:>11.1f}{dict_memory / 1024:>11,.0f}")
+        print(f"{name:<14}{'record':<10}{sum(map(len, projected_wire)) / 1024:>10,.0f}"
+              f"{record_ms:>11.1f}{record_memory / 1024:>11,.0f}")
+
+
+if __name__ == '__main__':
+    main()
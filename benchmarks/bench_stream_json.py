@@ -0,0 +1,145 @@
+"""
+Benchmark - Incremental JSON validation of streamed AI answers
+File: benchmarks/bench_stream_json.py
+
+Replays a corpus of model answers token by token and compares:
+
+1. the old way: wait for the whole answer, strip ``` fences, json.loads,
+   check the fields (parse_medicine_json before streaming)
+2. utils/stream_json.py: validate while the tokens arrive and stop at the
+   closing brace, or as soon as the answer can't be valid
+
+For each kind of answer it reports how many were accepted, the completion
+tokens each approach pays for, and the parse time per answer.
+
+    python benchmarks/bench_stream_json.py
+    python benchmarks/bench_stream_json.py --answers 2000
+    python benchmarks/bench_stream_json.py --corpus answers.ndjson
+
+A corpus file has one JSON string (the raw answer text) per line. Without
+one, answers are generated like loadtest/fake_lm_server.py writes them,
+plus the failure modes seen from real models. No LM server is needed.
+"""
+
+from collections import defaultdict
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'loadtest'))
+
+from fake_lm_server import fake_medicine_json, runaway_medicine_json, split_tokens
+from utils.stream_json import MedicineStreamParser, StreamAbort
+
+NAMES = ['aspirin', 'ibuprofen', 'metformin', 'amoxicillin', 'lisinopril', 'sertraline']
+
+
+def sample_corpus(count):
+    """(kind, answer text) pairs in roughly the mix a local model produces"""
+    kinds = [
+        ('valid', 50, lambda name: fake_medicine_json(name)),
+        ('fenced', 15, lambda name: '```json\n' + fake_medicine_json(name) + '\n```\nHope this helps!'),
+        ('truncated', 10, lambda name: '```json\n' + fake_medicine_json(name)[:200]),
+        ('runaway', 10, lambda name: runaway_medicine_json(name)),
+        ('prose', 5, lambda name: f"I'm sorry, but I can't provide medical advice about {name}. " * 15),
+        ('wrong type', 5, lambda name: json.dumps({'name': name.title(), 'description': {'text': 'x'},
+                                                   'advice': '', 'warning': '', 'pubmed_link': ''})),
+        ('overlong', 5, lambda name: fake_medicine_json(name).replace(
+            'is a test medicine', 'is a test medicine ' + 'that helps a lot ' * 150)),
+    ]
+    rng = random.Random(0)
+    population = [kind for kind in kinds for _ in range(kind[1])]
+    corpus = []
+    for _ in range(count):
+        kind, _, build = rng.choice(population)
+        corpus.append((kind, build(rng.choice(NAMES))))
+    return corpus
+
+
+def load_corpus(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [('corpus', json.loads(line)) for line in f if line.strip()]
+
+
+def legacy_parse(ai_response):
+    """parse_medicine_json as it was: fences stripped, then one json.loads"""
+    cleaned = ai_response.strip()
+    if cleaned.startswith('```json'):
+        cleaned = cleaned[7:]
+    elif cleaned.startswith('```'):
+        cleaned = cleaned[3:]
+    if cleaned.endswith('```'):
+        cleaned = cleaned[:-3]
+    try:
+        medicine_info = json.loads(cleaned.strip())
+    except json.JSONDecodeError:
+        return None
+    required_fields = ['name', 'description', 'advice', 'warning', 'pubmed_link']
+    if any(field not in medicine_info for field in required_fields):
+        return None
+    return medicine_info
+
+
+def stream_parse(tokens):
+    """(parsed medicine or None, tokens consumed before finishing or aborting)"""
+    parser = MedicineStreamParser()
+    try:
+        for used, token in enumerate(tokens, 1):
+            if parser.feed(token):
+                return parser.result(), used
+        return parser.result(), len(tokens)
+    except StreamAbort:
+        return None, used
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming JSON validation benchmark")
+    parser.add_argument('--answers', type=int, default=1000)
+    parser.add_argument('--corpus', help='NDJSON file of raw answers (one JSON string per line)')
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else sample_corpus(args.answers)
+
+    rows = defaultdict(lambda: defaultdict(float))
+    for kind, answer in corpus:
+        tokens = split_tokens(answer)
+        row = rows[kind]
+        row['answers'] += 1
+
+        start = time.perf_counter()
+        legacy = legacy_parse(answer)
+        row['legacy_us'] += (time.perf_counter() - start) * 1e6
+        row['legacy_ok'] += legacy is not None
+        row['legacy_tokens'] += len(tokens)  # The whole generation is paid for
+
+        start = time.perf_counter()
+        streamed, used = stream_parse(tokens)
+        row['stream_us'] += (time.perf_counter() - start) * 1e6
+        row['stream_ok'] += streamed is not None
+        row['stream_tokens'] += used
+
+    print(f"{len(corpus):,} answers\n")
+    print(f"{'kind':<12}{'answers':>8}{'ok old':>8}{'ok new':>8}{'tokens old':>12}"
+          f"{'tokens new':>12}{'saved':>8}{'old us':>9}{'new us':>9}")
+    totals = defaultdict(float)
+    for kind, row in sorted(rows.items(), key=lambda item: -item[1]['answers']):
+        for key, value in row.items():
+            totals[key] += value
+        print_row(kind, row)
+    print_row('total', totals)
+
+
+def print_row(label, row):
+    answers = row['answers']
+    saved = 1 - row['stream_tokens'] / row['legacy_tokens'] if row['legacy_tokens'] else 0
+    print(f"{label:<12}{answers:>8,.0f}{row['legacy_ok']:>8,.0f}{row['stream_ok']:>8,.0f}"
+          f"{row['legacy_tokens']:>12,.0f}{row['stream_tokens']:>12,.0f}{saved:>8.0%}"
+          f"{row['legacy_us'] / answers:>9.1f}{row['stream_us'] / answers:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
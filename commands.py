@@ -0,0 +1,91 @@
+"""
+Maintenance Commands - Flask CLI
+File: commands.py
+
+Run with the Flask CLI, for example:
+    flask --app app migrate-recent-history
+    flask --app app import-catalog drugs.ndjson.gz
+    flask --app app export-catalog backup.ndjson.gz
+    flask --app app export-users exports/ --all
+"""
+
+import click
+
+
+def register_commands(app):
+    """Attach the maintenance commands to the app's CLI"""
+
+    @app.cli.command('migrate-recent-history')
+    @click.option('--batch-size', default=500, show_default=True,
+                  help='Users written per bulk request')
+    def migrate_recent_history_command(batch_size):
+        """Build per-user recent history from search_history (safe to re-run)"""
+        from models.user_collections import migrate_recent_history, HISTORY_RETENTION_DAYS
+        count = migrate_recent_history(batch_size)
+        click.echo(f"Migrated recent history for {count} users "
+                   f"(search detail kept for {HISTORY_RETENTION_DAYS} days)")
+
+    @app.cli.command('import-catalog')
+    @click.argument('path')
+    @click.option('--batch-size', default=None, type=int,
+                  help='Upserts per bulk request (default CATALOG_BATCH_SIZE)')
+    @click.option('--ordered/--unordered', default=False, show_default=True,
+                  help='Stop at the first failed write')
+    def import_catalog_command(path, batch_size, ordered):
+        """Upsert medicines from an NDJSON file (.gz for gzip, - for stdin)"""
+        from models.catalog import import_catalog, CATALOG_BATCH_SIZE
+        from models.database import medicines_collection
+
+        def progress(stats):
+            rate = stats['read'] / stats['seconds'] if stats['seconds'] else 0
+            click.echo(f"  {stats['read']:,} read, {rate:,.0f}/s", err=True)
+
+        stats = import_catalog(medicines_collection, path, batch_size or CATALOG_BATCH_SIZE,
+                               ordered=ordered, progress=progress)
+        click.echo(f"Imported {stats['read']:,} lines in {stats['seconds']:.1f}s: "
+                   f"{stats['inserted']:,} new, {stats['updated']:,} updated, "
+                   f"{stats['skipped']:,} skipped", err=True)
+
+    @app.cli.command('export-catalog')
+    @click.argument('path')
+    @click.option('--batch-size', default=None, type=int,
+                  help='Documents per cursor batch (default CATALOG_BATCH_SIZE)')
+    def export_catalog_command(path, batch_size):
+        """Write every medicine to an NDJSON file (.gz for gzip, - for stdout)"""
+        from models.catalog import export_catalog, CATALOG_BATCH_SIZE
+        from models.database import medicines_collection
+
+        def progress(count, seconds):
+            rate = count / seconds if seconds else 0
+            click.echo(f"  {count:,} written, {rate:,.0f}/s", err=True)
+
+        count = export_catalog(medicines_collection, path, batch_size or CATALOG_BATCH_SIZE,
+                               progress=progress)
+        click.echo(f"Exported {count:,} medicines to {path}", err=True)
+
+    @app.cli.command('export-users')
+    @click.argument('out_dir')
+    @click.option('--email', 'emails', multiple=True, help='User to export (repeatable)')
+    @click.option('--emails-file', type=click.File('r'), help='File with one email per line')
+    @click.option('--all', 'all_users', is_flag=True, help='Export every user')
+    @click.option('--format', 'export_format', type=click.Choice(['zip', 'json']), default='zip',
+                  show_default=True)
+    @click.option('--workers', default=4, show_default=True, help='Exports running at once')
+    def export_users_command(out_dir, emails, emails_file, all_users, export_format, workers):
+        """Write one data export file per user into OUT_DIR"""
+        from models import user_export
+
+        if all_users:
+            source = user_export.iter_all_emails()
+        elif emails_file:
+            source = (line.strip() for line in emails_file if line.strip())
+        elif emails:
+            source = iter(emails)
+        else:
+            raise click.UsageError('Pass --email, --emails-file or --all')
+
+        def progress(email, path):
+            click.echo(f"  {email}: {path or 'FAILED'}", err=True)
+
+        result = user_export.export_users(source, out_dir, export_format, workers, progress)
+        click.echo(f"Exported {result['exported']:,} users, {result['failed']:,} failed", err=True)
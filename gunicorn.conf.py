@@ -0,0 +1,90 @@
+"""
+Gunicorn Configuration - Production Server
+File: gunicorn.conf.py
+
+Run with:
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Every setting can be overridden with the environment variable shown next to it.
+"""
+
+import multiprocessing
+import os
+
+# ============================================
+# SOCKET
+# ============================================
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+backlog = int(os.getenv('GUNICORN_BACKLOG', '2048'))
+
+# ============================================
+# WORKERS
+# ============================================
+
+# Requests mostly wait on MongoDB, so a few threads per process pay off
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+
+# The app opens MongoClient connections at import time (models/database.py,
+# models/user_collections.py, routes/medicine_routes.py). MongoClient is not
+# fork-safe, so the app must be imported inside each worker, never in the
+# master before forking.
+preload_app = False
+
+# ============================================
+# TIMEOUTS AND GRACEFUL RECYCLING
+# ============================================
+
+# AI generation runs in background threads, so no request should take long
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+# Restart each worker after a number of requests (jittered so they don't all
+# restart together) to cap memory growth from in-process caches
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '200'))
+
+# ============================================
+# LOGGING
+# ============================================
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = os.getenv('GUNICORN_ERROR_LOG', '-')
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+# ============================================
+# HOOKS
+# ============================================
+
+def on_starting(server):
+    """Warn when workers can't see each other's cache invalidations"""
+    if workers > 1 and os.getenv('CACHE_URL', 'memory://').startswith('memory://'):
+        server.log.warning(
+            "CACHE_URL is memory:// with %d workers: each worker caches on its own, so "
+            "cached pages and ratings can be stale for up to LOCAL_CACHE_MAX_TTL seconds "
+            "after a write. Set CACHE_URL to a redis:// or sqlite:// URL.", workers
+        )
+
+
+def child_exit(server, worker):
+    """Drop a dead worker's live gauges from the shared metrics directory"""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def worker_exit(server, worker):
+    """Close MongoDB connections cleanly when a worker is recycled"""
+    import sys
+
+    for module_name in ('models.database', 'models.user_collections'):
+        module = sys.modules.get(module_name)
+        if module is not None:
+            module.client.close()
+
+    medicine_routes = sys.modules.get('routes.medicine_routes')
+    if medicine_routes is not None:
+        medicine_routes.medicine_model.close_connection()
@@ -0,0 +1,185 @@
+"""
+Fake LM Studio - OpenAI-compatible stand-in for load tests
+File: loadtest/fake_lm_server.py
+
+Answers /v1/chat/completions with a valid medicine JSON after a configurable
+delay, and can be told to fail or return malformed JSON some of the time.
+With "stream": true in the request the answer arrives as server-sent events,
+a few characters per token, spread over the same delay; a runaway answer
+(one field that keeps going until max_tokens, like a model stuck in a loop)
+can be simulated too. Streams stop when the client disconnects.
+
+    python loadtest/fake_lm_server.py --port 1234 --latency 2.0 --jitter 1.0 \\
+        --failure-rate 0.05 --malformed-rate 0.1 --runaway-rate 0.05
+
+Point the app at it with LM_STUDIO_URL=http://localhost:1234/v1/chat/completions
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import json
+import random
+import re
+import threading
+import time
+
+
+class FakeLMConfig:
+    """Behaviour knobs shared by all request handlers"""
+
+    def __init__(self, latency=1.0, jitter=0.0, failure_rate=0.0, malformed_rate=0.0,
+                 runaway_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.malformed_rate = malformed_rate
+        self.runaway_rate = runaway_rate
+
+
+def _medicine_name(body):
+    """Recover the medicine name from the prompt the app sends"""
+    for message in body.get('messages', []):
+        match = re.search(r'understand (.+?)\.\n', message.get('content', ''))
+        if match:
+            return match.group(1)
+    return 'unknown medicine'
+
+
+def fake_medicine_json(name):
+    """A well-formed answer in the format utils/ai_service.py asks for"""
+    return json.dumps({
+        'name': name.title(),
+        'description': f'{name.title()} is a test medicine generated by the fake LM server.',
+        'advice': '• Take with water\n• Follow the label\n• Do not skip doses\n• Ask a pharmacist',
+        'warning': '• Do not overdose\n• Avoid alcohol\n• Stop if you feel unwell\n• Keep away from children',
+        'pubmed_link': f"https://pubmed.ncbi.nlm.nih.gov/?term={name.replace(' ', '+')}"
+    })
+
+
+def runaway_medicine_json(name, max_tokens=1000):
+    """An answer whose description never ends, cut off at max_tokens"""
+    start = json.dumps({'name': name.title()})[:-1] + ', "description": "'
+    loop = f'{name.title()} helps with pain. ' * (max_tokens * 4 // 20 + 1)
+    return (start + loop)[:max_tokens * 4]
+
+
+def split_tokens(content):
+    """Roughly model-sized tokens: about four characters each"""
+    return re.findall(r'\s*\S{1,4}|\s+', content)
+
+
+def make_handler(config):
+
+    class FakeLMHandler(BaseHTTPRequestHandler):
+
+        def log_message(self, format, *args):
+            pass  # Keep load test output readable
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip('/') == '/v1/models':
+                return self._send_json(200, {'data': [{'id': 'fake-model', 'object': 'model'}]})
+            self._send_json(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path.rstrip('/') != '/v1/chat/completions':
+                return self._send_json(404, {'error': 'not found'})
+
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+
+            delay = max(0.0, random.gauss(config.latency, config.jitter))
+            if not body.get('stream'):
+                time.sleep(delay)
+
+            if random.random() < config.failure_rate:
+                return self._send_json(500, {'error': 'simulated model failure'})
+
+            content = fake_medicine_json(_medicine_name(body))
+            if random.random() < config.malformed_rate:
+                # Cut the JSON off part way, like a model hitting max_tokens
+                content = '```json\n' + content[:len(content) // 2]
+            elif random.random() < config.runaway_rate:
+                content = runaway_medicine_json(_medicine_name(body), body.get('max_tokens') or 1000)
+
+            if body.get('stream'):
+                return self._stream(content, delay)
+
+            self._send_json(200, {
+                'id': 'chatcmpl-fake',
+                'object': 'chat.completion',
+                'model': 'fake-model',
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': content},
+                    'finish_reason': 'stop'
+                }],
+                'usage': {
+                    'prompt_tokens': 400,
+                    'completion_tokens': len(content) // 4,
+                    'total_tokens': 400 + len(content) // 4
+                }
+            })
+
+        def _stream(self, content, delay):
+            """Send content as chat.completion.chunk events, one token at a time"""
+            tokens = split_tokens(content)
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            events = [{'role': 'assistant', 'content': ''}] + [{'content': token} for token in tokens]
+            try:
+                for delta in events:
+                    chunk = {
+                        'id': 'chatcmpl-fake',
+                        'object': 'chat.completion.chunk',
+                        'model': 'fake-model',
+                        'choices': [{'index': 0, 'delta': delta, 'finish_reason': None}]
+                    }
+                    self.wfile.write(f'data: {json.dumps(chunk)}\n\n'.encode('utf-8'))
+                    self.wfile.flush()
+                    time.sleep(delay / max(len(tokens), 1))
+                self.wfile.write(b'data: [DONE]\n\n')
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # Client cancelled the generation
+
+    return FakeLMHandler
+
+
+def start_server(port=1234, config=None):
+    """
+    Start the fake server on a background thread
+
+    Returns:
+        ThreadingHTTPServer: call .shutdown() to stop it
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(config or FakeLMConfig()))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fake OpenAI-compatible LM server')
+    parser.add_argument('--port', type=int, default=1234)
+    parser.add_argument('--latency', type=float, default=1.0, help='Mean seconds per completion')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Std deviation of latency')
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--malformed-rate', type=float, default=0.0)
+    parser.add_argument('--runaway-rate', type=float, default=0.0,
+                        help='Share of answers with a field that never ends')
+    args = parser.parse_args()
+
+    config = FakeLMConfig(args.latency, args.jitter, args.failure_rate, args.malformed_rate,
+                          args.runaway_rate)
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(config))
+    print(f"Fake LM server on http://127.0.0.1:{args.port}/v1/chat/completions")
+    server.serve_forever()
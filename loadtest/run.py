@@ -0,0 +1,380 @@
+"""
+Load Test - Realistic user mixes with per-route latency and baselines
+File: loadtest/run.py
+
+Against a server that is already running:
+    python loadtest/run.py --url http://localhost:5000 --users 50 --duration 60
+
+Or let the script start everything locally (mongod on PATH, fake LM server,
+gunicorn) with a throwaway database:
+    python loadtest/run.py --start-stack --users 50 --duration 60 \\
+        --lm-latency 2 --lm-failure-rate 0.05 --lm-malformed-rate 0.1
+
+Save a baseline once, then compare later runs against it:
+    python loadtest/run.py ... --save-baseline loadtest/baseline.json
+    python loadtest/run.py ... --baseline loadtest/baseline.json --tolerance 0.25
+
+The comparison exits with status 1 when a route's p95 or error rate regresses
+by more than the tolerance.
+"""
+
+from collections import defaultdict
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_lm_server import FakeLMConfig, start_server
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+KNOWN_MEDICINES = ['aspirin', 'ibuprofen', 'paracetamol']
+
+DEFAULT_MIX = 'browse=60,member=25,login=10,calendar=5'
+
+# ============================================
+# STATS
+# ============================================
+
+class Stats:
+    """Thread-safe latency and error collection per route"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, route, seconds, ok):
+        with self._lock:
+            self.latencies[route].append(seconds * 1000)
+            if not ok:
+                self.errors[route] += 1
+
+    def summary(self, elapsed):
+        """Per-route RPS, percentiles (ms) and error rate"""
+        routes = {}
+        total = 0
+        for route, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            total += len(values)
+            routes[route] = {
+                'requests': len(values),
+                'rps': round(len(values) / elapsed, 2),
+                'p50': round(percentile(values, 50), 1),
+                'p95': round(percentile(values, 95), 1),
+                'p99': round(percentile(values, 99), 1),
+                'error_rate': round(self.errors[route] / len(values), 4),
+            }
+        return {
+            'duration_s': round(elapsed, 1),
+            'requests': total,
+            'rps': round(total / elapsed, 2) if elapsed else 0.0,
+            'routes': routes,
+        }
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(pct / 100 * len(values))) - 1))
+    return values[index]
+
+# ============================================
+# VIRTUAL USER
+# ============================================
+
+class VirtualUser:
+    """One browser: its own cookie jar, account and scenario choices"""
+
+    def __init__(self, base_url, stats, unknown_rate):
+        self.base_url = base_url.rstrip('/')
+        self.stats = stats
+        self.unknown_rate = unknown_rate
+        self.http = requests.Session()
+        self.email = f"load-{uuid.uuid4().hex[:12]}@example.com"
+        self.password = 'LoadTest123'
+        self.logged_in = False
+
+    def request(self, route, method, path, ok_statuses=(200, 302), **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.http.request(method, self.base_url + path,
+                                         allow_redirects=False, timeout=30, **kwargs)
+            ok = response.status_code in ok_statuses
+        except requests.RequestException:
+            response, ok = None, False
+        self.stats.record(route, time.perf_counter() - start, ok)
+        return response
+
+    def pick_medicine(self):
+        if random.random() < self.unknown_rate:
+            return f"loadtest-drug-{uuid.uuid4().hex[:6]}"
+        return random.choice(KNOWN_MEDICINES)
+
+    # --------------------------------------------
+    # Scenarios
+    # --------------------------------------------
+
+    def signup(self):
+        self.request('POST /signup', 'POST', '/signup', data={
+            'fullname': 'Load Test', 'email': self.email,
+            'password': self.password, 'confirm-password': self.password
+        })
+        self.logged_in = True
+
+    def browse(self):
+        """Anonymous visitor: homepage, search, medicine page"""
+        anonymous = requests.Session()
+        http, self.http = self.http, anonymous
+        try:
+            name = self.pick_medicine()
+            self.request('GET /', 'GET', '/')
+            self.request('POST /search', 'POST', '/search', data={'medicine': name})
+            self.request('GET /medicine/<name>', 'GET', f'/medicine/{name}')
+        finally:
+            self.http = http
+
+    def member(self):
+        """Logged-in user: search → medicine page → favorite → review"""
+        if not self.logged_in:
+            self.signup()
+        name = self.pick_medicine()
+        self.request('POST /search', 'POST', '/search', data={'medicine': name})
+        self.request('GET /medicine/<name>', 'GET', f'/medicine/{name}')
+        self.request('POST /favorites/add', 'POST', '/favorites/add',
+                     data={'medicine_name': name})
+        if random.random() < 0.3:
+            self.request('POST /review/add', 'POST', '/review/add', data={
+                'medicine_name': name, 'rating': random.randint(1, 5),
+                'review_text': 'Load test review'
+            })
+        # The homepage inlines history, favorites and trending (no follow-up fetches)
+        self.request('GET /homepage', 'GET', '/homepage')
+
+    def login(self):
+        """Log out and back in"""
+        if not self.logged_in:
+            self.signup()
+        self.request('POST /logout', 'POST', '/logout')
+        self.request('POST /login', 'POST', '/login',
+                     data={'email': self.email, 'password': self.password})
+
+    def calendar(self):
+        """Schedule a dose and look at the calendar"""
+        if not self.logged_in:
+            self.signup()
+        self.request('POST /schedule/add', 'POST', '/schedule/add', data={
+            'medication': random.choice(KNOWN_MEDICINES),
+            'schedule_time': '2025-01-01T09:00'
+        })
+        self.request('GET /calendar', 'GET', '/calendar')
+
+
+def parse_mix(mix):
+    """'browse=60,member=25' -> (['browse', 'member'], [60, 25])"""
+    names, weights = [], []
+    for part in mix.split(','):
+        name, weight = part.split('=')
+        if not hasattr(VirtualUser, name.strip()):
+            raise ValueError(f"Unknown scenario: {name}")
+        names.append(name.strip())
+        weights.append(float(weight))
+    return names, weights
+
+
+def run_load(base_url, users, duration, mix, unknown_rate, ramp_up):
+    """Run virtual users for `duration` seconds and return the summary"""
+    stats = Stats()
+    names, weights = parse_mix(mix)
+    deadline = time.monotonic() + duration
+
+    def user_loop(delay):
+        time.sleep(delay)
+        user = VirtualUser(base_url, stats, unknown_rate)
+        while time.monotonic() < deadline:
+            getattr(user, random.choices(names, weights)[0])()
+
+    threads = [
+        threading.Thread(target=user_loop, args=(ramp_up * i / max(users, 1),), daemon=True)
+        for i in range(users)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats.summary(time.monotonic() - started)
+
+# ============================================
+# LOCAL STACK (mongod + fake LM + gunicorn)
+# ============================================
+
+def wait_for(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"{url} did not come up")
+
+
+def start_stack(args):
+    """
+    Start mongod, the fake LM server and the app
+
+    Returns:
+        tuple: (base_url, cleanup function)
+    """
+    processes = []
+    data_dir = tempfile.mkdtemp(prefix='medinfo-loadtest-')
+
+    mongod = shutil.which('mongod')
+    if not mongod:
+        raise RuntimeError('mongod not found on PATH')
+    processes.append(subprocess.Popen(
+        [mongod, '--dbpath', data_dir, '--port', str(args.mongo_port), '--bind_ip', '127.0.0.1'],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    ))
+
+    lm_server = start_server(args.lm_port, FakeLMConfig(
+        args.lm_latency, args.lm_jitter, args.lm_failure_rate, args.lm_malformed_rate,
+        args.lm_runaway_rate
+    ))
+
+    mongo_uri = f"mongodb://127.0.0.1:{args.mongo_port}/"
+    env = dict(
+        os.environ,
+        MONGODB_URI=mongo_uri,
+        MONGO_URI=mongo_uri,
+        DATABASE_NAME='MedInfo',
+        SECRET_KEY='loadtest',
+        LM_STUDIO_URL=f"http://127.0.0.1:{args.lm_port}/v1/chat/completions",
+        GUNICORN_BIND=f"127.0.0.1:{args.app_port}",
+        GUNICORN_ACCESS_LOG='/dev/null',
+        # Every virtual user shares one IP, so per-client limits would only measure the limiter
+        RATE_LIMITS_ENABLED='false',
+    )
+    processes.append(subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+        cwd=REPO_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    ))
+
+    base_url = f"http://127.0.0.1:{args.app_port}"
+
+    def cleanup():
+        for process in reversed(processes):
+            process.terminate()
+            process.wait(timeout=30)
+        lm_server.shutdown()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    try:
+        wait_for(f"{base_url}/readyz", timeout=60)
+    except Exception:
+        cleanup()
+        raise
+    return base_url, cleanup
+
+# ============================================
+# REPORTING
+# ============================================
+
+def print_summary(summary):
+    print(f"\n{summary['requests']} requests in {summary['duration_s']}s "
+          f"({summary['rps']} req/s)\n")
+    print(f"{'route':<28}{'req':>8}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'err%':>8}")
+    for route, row in summary['routes'].items():
+        print(f"{route:<28}{row['requests']:>8}{row['rps']:>9}{row['p50']:>9}"
+              f"{row['p95']:>9}{row['p99']:>9}{row['error_rate'] * 100:>7.1f}%")
+
+
+def compare_to_baseline(summary, baseline, tolerance):
+    """
+    Compare p95 latency and error rate per route
+
+    Returns:
+        list: Human readable regressions (empty when everything is in budget)
+    """
+    regressions = []
+    for route, base in baseline['routes'].items():
+        current = summary['routes'].get(route)
+        if current is None:
+            continue
+        if current['p95'] > base['p95'] * (1 + tolerance):
+            regressions.append(f"{route}: p95 {base['p95']} ms -> {current['p95']} ms")
+        if current['error_rate'] > base['error_rate'] + tolerance / 10:
+            regressions.append(f"{route}: error rate {base['error_rate']:.2%} -> "
+                               f"{current['error_rate']:.2%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MedInfo load test')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=30, help='Seconds')
+    parser.add_argument('--ramp-up', type=float, default=5, help='Seconds to start all users')
+    parser.add_argument('--mix', default=DEFAULT_MIX)
+    parser.add_argument('--unknown-rate', type=float, default=0.02,
+                        help='Share of medicine views for names that need AI generation')
+    parser.add_argument('--save-baseline')
+    parser.add_argument('--baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+
+    stack = parser.add_argument_group('local stack')
+    stack.add_argument('--start-stack', action='store_true')
+    stack.add_argument('--app-port', type=int, default=5055)
+    stack.add_argument('--mongo-port', type=int, default=27055)
+    stack.add_argument('--lm-port', type=int, default=1255)
+    stack.add_argument('--lm-latency', type=float, default=1.0)
+    stack.add_argument('--lm-jitter', type=float, default=0.0)
+    stack.add_argument('--lm-failure-rate', type=float, default=0.0)
+    stack.add_argument('--lm-malformed-rate', type=float, default=0.0)
+    stack.add_argument('--lm-runaway-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    base_url, cleanup = args.url, None
+    if args.start_stack:
+        base_url, cleanup = start_stack(args)
+
+    try:
+        summary = run_load(base_url, args.users, args.duration, args.mix,
+                           args.unknown_rate, args.ramp_up)
+    finally:
+        if cleanup:
+            cleanup()
+
+    print_summary(summary)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        print(f"\nBaseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare_to_baseline(summary, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print("\nNo regressions against baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+"""
+Async Collections - Data access for the ASGI serving mode
+File: models/async_collections.py
+
+Async versions of the queries behind the hot endpoints (medicine page,
+/api/* and calendar). They use pymongo's AsyncMongoClient and talk to the
+same databases and collections as the sync models.
+"""
+
+from pymongo import AsyncMongoClient, DESCENDING
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime
+import logging
+import os
+from dotenv import load_dotenv
+from models.medicine_model import DATABASE_NAME, MONGODB_URI, normalize_medicine_name
+from models.records import Favorite, Review, ScheduledMed
+from models.user_collections import (
+    HISTORY_ITEM_PROJECTION, RECENT_HISTORY_SIZE, popularity_bucket, recent_history_bump,
+    recent_history_push, recent_history_items
+)
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# MONGODB CONNECTION (Same settings as the sync models)
+# ============================================
+
+mongodb_uri = MONGODB_URI
+database_name = DATABASE_NAME
+
+client = AsyncMongoClient(mongodb_uri)
+db = client[database_name]
+
+medicines_collection = db['Medicine']
+search_history_collection = db['search_history']
+medicine_popularity_collection = db['medicine_popularity']
+recent_history_collection = db['user_recent_history']
+user_favorites_collection = db['user_favorites']
+user_reviews_collection = db['user_reviews']
+
+# Scheduled_meds lives in the MedInfo database of MONGO_URI (see models/user_model.py)
+user_client = AsyncMongoClient(os.getenv('MONGO_URI', mongodb_uri))
+scheduled_meds_collection = user_client['MedInfo']['Scheduled_meds']
+
+
+async def close():
+    """Close the async MongoDB clients"""
+    await client.close()
+    await user_client.close()
+
+# ============================================
+# MEDICINES
+# ============================================
+
+async def get_medicine_by_name(medicine_name):
+    """Find medicine by name (case-insensitive)"""
+    return await medicines_collection.find_one({
+        'name': {'$regex': f'^{medicine_name}$', '$options': 'i'}
+    })
+
+
+async def create_medicine(medicine_data):
+    """Add a new medicine and return its ID as a string"""
+    medicine_data['name_key'] = normalize_medicine_name(medicine_data.get('name', ''))
+    result = await medicines_collection.insert_one(medicine_data)
+    return str(result.inserted_id)
+
+# ============================================
+# SEARCH HISTORY
+# ============================================
+
+async def add_to_search_history(user_email, medicine_name):
+    """Record a search: detail entry and recent list (see user_collections)"""
+    try:
+        medicine_name = medicine_name.lower()
+        now = datetime.utcnow()
+        await search_history_collection.update_one(
+            {'user_email': user_email, 'medicine_name': medicine_name},
+            {
+                '$set': {'timestamp': now},
+                '$inc': {'search_count': 1}
+            },
+            upsert=True
+        )
+        for _ in range(2):
+            bump_filter, bump = recent_history_bump(user_email, medicine_name, now)
+            if (await recent_history_collection.update_one(bump_filter, bump)).matched_count:
+                break
+            push_filter, push = recent_history_push(user_email, medicine_name, now)
+            try:
+                await recent_history_collection.update_one(push_filter, push, upsert=True)
+                break
+            except DuplicateKeyError:
+                continue
+    except Exception:
+        logger.exception("Error adding to search history")
+
+
+async def record_medicine_view(medicine_name):
+    """Count one view of a medicine towards trending (any visitor)"""
+    try:
+        bucket_filter, update = popularity_bucket(medicine_name.lower())
+        await medicine_popularity_collection.update_one(bucket_filter, update, upsert=True)
+    except Exception:
+        logger.exception("Error recording medicine view")
+
+
+async def get_user_search_history(user_email, limit=10):
+    """Get user's search history (most recent first)"""
+    try:
+        doc = await recent_history_collection.find_one({'_id': user_email}, {'items': 1})
+        if doc is None:
+            # Not migrated yet, see models.user_collections.get_user_search_history
+            cursor = search_history_collection.find({'user_email': user_email}, HISTORY_ITEM_PROJECTION)
+            return await cursor.sort('timestamp', DESCENDING).limit(min(limit, RECENT_HISTORY_SIZE)).to_list()
+        return recent_history_items(doc, limit)
+    except Exception:
+        logger.exception("Error getting search history")
+        return []
+
+# ============================================
+# FAVORITES
+# ============================================
+
+async def get_user_favorites(user_email):
+    """Get all favorites for a user"""
+    try:
+        cursor = user_favorites_collection.find(
+            {'user_email': user_email}, Favorite.PROJECTION
+        ).sort('added_at', DESCENDING)
+        return [Favorite.from_doc(doc) async for doc in cursor]
+    except Exception:
+        logger.exception("Error getting favorites")
+        return []
+
+
+async def is_favorite(user_email, medicine_name):
+    """Check if a medicine is in user's favorites"""
+    try:
+        count = await user_favorites_collection.count_documents({
+            'user_email': user_email,
+            'medicine_name': medicine_name.lower()
+        }, limit=1)
+        return count > 0
+    except Exception:
+        logger.exception("Error checking favorite")
+        return False
+
+# ============================================
+# REVIEWS
+# ============================================
+
+async def get_medicine_reviews(medicine_name):
+    """Get all reviews for a specific medicine"""
+    try:
+        cursor = user_reviews_collection.find(
+            {'medicine_name': medicine_name.lower()}, Review.PROJECTION
+        ).sort('created_at', DESCENDING)
+        return [Review.from_doc(doc) async for doc in cursor]
+    except Exception:
+        logger.exception("Error getting reviews")
+        return []
+
+
+async def get_medicine_average_rating(medicine_name):
+    """Calculate average rating for a medicine"""
+    try:
+        cursor = await user_reviews_collection.aggregate([
+            {'$match': {'medicine_name': medicine_name.lower()}},
+            {'$group': {
+                '_id': None,
+                'average_rating': {'$avg': '$rating'},
+                'review_count': {'$sum': 1}
+            }}
+        ])
+        result = await cursor.to_list()
+        if result:
+            return {
+                'average': round(result[0]['average_rating'], 1),
+                'count': result[0]['review_count']
+            }
+        return None
+    except Exception:
+        logger.exception("Error calculating average rating")
+        return None
+
+# ============================================
+# SCHEDULED MEDS
+# ============================================
+
+async def get_schedule_by_email(email):
+    """Fetch a user's medicine schedule"""
+    email = email.strip().lower()
+    cursor = scheduled_meds_collection.find({'email': email}, ScheduledMed.PROJECTION)
+    return [ScheduledMed.from_doc(doc) async for doc in cursor]
@@ -0,0 +1,207 @@
+"""
+Medicine Catalog - Streaming NDJSON import/export
+File: models/catalog.py
+
+A catalog file holds one medicine document per line, gzip-compressed when
+the path ends in .gz ('-' reads stdin / writes stdout):
+
+    {"name": "Aspirin", "description": "...", "advice": "...", ...}
+
+Both directions stream, so memory stays flat whatever the catalog size.
+Imports are bulk upserts keyed on name_key (the normalized medicine name),
+sent CATALOG_BATCH_SIZE at a time, so loading the same catalog twice
+updates medicines in place instead of duplicating them. Imported medicines
+get source='catalog' unless the file says otherwise. Pages already in
+the page cache pick up imported changes when they expire (PAGE_CACHE_TTL).
+
+From the command line:
+    flask --app app import-catalog drugs.ndjson.gz
+    flask --app app export-catalog backup.ndjson.gz
+"""
+
+from bson import json_util
+from bson.json_util import RELAXED_JSON_OPTIONS
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+import gzip
+import logging
+import os
+import sys
+import time
+
+from models.medicine_model import normalize_medicine_name
+
+logger = logging.getLogger(__name__)
+
+CATALOG_BATCH_SIZE = int(os.getenv('CATALOG_BATCH_SIZE', '5000'))
+
+# Bookkeeping fields that don't belong in a catalog file
+EXPORT_PROJECTION = {'_id': 0, 'name_key': 0, 'refresh_claimed_until': 0}
+
+
+def open_ndjson(path, mode):
+    """Open a catalog file as text, 'r' or 'w'"""
+    if path == '-':
+        return sys.stdin if mode == 'r' else sys.stdout
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def ensure_name_keys(collection, batch_size=CATALOG_BATCH_SIZE):
+    """
+    Backfill name_key on medicines stored before it existed, then index it
+
+    Returns:
+        int: Number of documents backfilled
+    """
+    backfilled = 0
+    requests = []
+    for medicine in collection.find({'name_key': {'$exists': False}}, {'name': 1}):
+        requests.append(UpdateOne(
+            {'_id': medicine['_id']},
+            {'$set': {'name_key': normalize_medicine_name(medicine.get('name', ''))}}
+        ))
+        if len(requests) >= batch_size:
+            backfilled += collection.bulk_write(requests, ordered=False).modified_count
+            requests = []
+    if requests:
+        backfilled += collection.bulk_write(requests, ordered=False).modified_count
+
+    try:
+        collection.create_index('name_key', unique=True)
+    except OperationFailure:
+        # Older data can hold the same medicine twice under different casing
+        logger.warning("Duplicate medicine names, name_key index is not unique", exc_info=True)
+        collection.create_index('name_key')
+
+    if backfilled:
+        logger.info("Backfilled medicine name keys", extra={'count': backfilled})
+    return backfilled
+
+
+def import_documents(collection, documents, batch_size=CATALOG_BATCH_SIZE,
+                     ordered=False, overwrite=True, source='catalog', progress=None):
+    """
+    Upsert medicine documents in bulk, keyed on the normalized name
+
+    Args:
+        collection: Medicine collection
+        documents (iterable): Medicine dicts, consumed lazily
+        batch_size (int): Upserts per bulk_write
+        ordered (bool): Stop at the first failed write instead of carrying on
+        overwrite (bool): Update medicines that already exist (False only
+            adds new ones)
+        source (str): source for documents that don't name one; curated
+            sources are skipped by the AI refresher
+        progress (callable): Called with the running stats after every batch
+
+    Returns:
+        dict: {'read', 'skipped', 'inserted', 'updated', 'seconds'}
+    """
+    ensure_name_keys(collection, batch_size)
+
+    stats = {'read': 0, 'skipped': 0, 'inserted': 0, 'updated': 0, 'seconds': 0.0}
+    start = time.perf_counter()
+    requests = []
+
+    def flush():
+        result = collection.bulk_write(requests, ordered=ordered)
+        stats['inserted'] += result.upserted_count
+        stats['updated'] += result.modified_count
+        stats['seconds'] = time.perf_counter() - start
+        requests.clear()
+        logger.info("Imported catalog batch", extra={
+            'read': stats['read'],
+            'per_second': round(stats['read'] / stats['seconds']) if stats['seconds'] else None
+        })
+        if progress:
+            progress(stats)
+
+    for document in documents:
+        stats['read'] += 1
+        name = document.get('name') if isinstance(document, dict) else None
+        if not isinstance(name, str) or not name.strip():
+            stats['skipped'] += 1
+            continue
+
+        document.pop('_id', None)
+        document['name'] = name.strip()
+        document['name_key'] = normalize_medicine_name(name)
+        if source:
+            document.setdefault('source', source)
+        update = {'$set': document} if overwrite else {'$setOnInsert': document}
+        requests.append(UpdateOne({'name_key': document['name_key']}, update, upsert=True))
+
+        if len(requests) >= batch_size:
+            flush()
+    if requests:
+        flush()
+
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+
+def _read_ndjson(handle, stats_holder):
+    """Yield parsed lines, counting the ones that aren't valid JSON"""
+    for line_number, line in enumerate(handle, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json_util.loads(line)
+        except ValueError:
+            stats_holder['invalid'] += 1
+            logger.warning("Skipping invalid catalog line", extra={'line': line_number})
+
+
+def import_catalog(collection, path, batch_size=CATALOG_BATCH_SIZE, ordered=False, progress=None):
+    """
+    Stream an NDJSON catalog file into the Medicine collection
+
+    Returns:
+        dict: Import stats, see import_documents()
+    """
+    invalid = {'invalid': 0}
+    handle = open_ndjson(path, 'r')
+    try:
+        stats = import_documents(
+            collection, _read_ndjson(handle, invalid),
+            batch_size=batch_size, ordered=ordered, progress=progress
+        )
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+    stats['skipped'] += invalid['invalid']
+    logger.info("Imported catalog", extra={'file': path, **stats})
+    return stats
+
+
+def export_catalog(collection, path, batch_size=CATALOG_BATCH_SIZE, progress=None):
+    """
+    Stream every medicine into an NDJSON catalog file
+
+    Returns:
+        int: Number of medicines written
+    """
+    count = 0
+    start = time.perf_counter()
+    handle = open_ndjson(path, 'w')
+    try:
+        for medicine in collection.find({}, EXPORT_PROJECTION, batch_size=batch_size):
+            handle.write(json_util.dumps(medicine, json_options=RELAXED_JSON_OPTIONS))
+            handle.write('\n')
+            count += 1
+            if progress and count % batch_size == 0:
+                progress(count, time.perf_counter() - start)
+    finally:
+        if handle is not sys.stdout:
+            handle.close()
+
+    if progress:
+        progress(count, time.perf_counter() - start)
+    logger.info("Exported catalog", extra={
+        'file': path, 'count': count, 'seconds': round(time.perf_counter() - start, 2)
+    })
+    return count
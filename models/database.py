@@ -4,19 +4,29 @@ File: models/database.py
 """
 
 from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError
 from bson import ObjectId
+from datetime import datetime
+import hashlib
 import os
 from dotenv import load_dotenv
 import json
+import logging
+import threading
+from models.medicine_model import (DATABASE_NAME, LEGACY_DATABASE_NAME, MONGODB_URI,
+                                   normalize_medicine_name)
+from utils import page_cache
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # ============================================
 # MONGODB CONNECTION
 # ============================================
 
-mongodb_uri = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/')
-database_name = os.getenv('DATABASE_NAME', 'MedInfo')
+mongodb_uri = MONGODB_URI
+database_name = DATABASE_NAME
 
 client = MongoClient(mongodb_uri)
 db = client[database_name]
@@ -25,8 +35,15 @@ db = client[database_name]
 users_collection = db['users']
 medicines_collection = db['Medicine'] 
 reset_tokens_collection = db['reset_tokens']
+migrations_collection = db['migrations']
+
+# Reset tokens are looked up by hash and deleted by MongoDB when they expire
+reset_tokens_collection.create_index('token_hash', unique=True)
+reset_tokens_collection.create_index('expires', expireAfterSeconds=0)
+# Tokens from before hashing were stored in plain text and never expired
+reset_tokens_collection.delete_many({'token_hash': {'$exists': False}})
 
-print(f"✓ Connected to MongoDB at {mongodb_uri}, DB: {database_name}")
+logger.info("Connected to MongoDB", extra={'database': database_name})
 
 # ============================================
 # USERS DATABASE (For backwards compatibility)
@@ -77,11 +94,13 @@ class MedicineDatabase:
     
     def __setitem__(self, medicine_name, medicine_data):
         """Add or update medicine"""
+        medicine_data['name_key'] = normalize_medicine_name(medicine_data.get('name', medicine_name))
         medicines_collection.update_one(
             {'name': {'$regex': f'^{medicine_name}$', '$options': 'i'}},
             {'$set': medicine_data},
             upsert=True
         )
+        page_cache.invalidate(medicine_name)
     
     def __getitem__(self, medicine_name):
         """Get medicine by name (raises KeyError if not found)"""
@@ -105,29 +124,44 @@ MEDICINE_DATABASE = MedicineDatabase()
 # ============================================
 
 class ResetTokensDatabase:
-    """Wrapper for reset tokens"""
+    """
+    Wrapper for reset tokens
+    
+    Only a SHA-256 hash of each token is stored, and a TTL index on
+    'expires' removes tokens once they run out. Lookups match on the hash
+    and an unexpired 'expires', so every call is one indexed query.
+    """
+    
+    @staticmethod
+    def _hash(token):
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def _live(token):
+        return {'token_hash': ResetTokensDatabase._hash(token), 'expires': {'$gt': datetime.utcnow()}}
     
     def get(self, token, default=None):
-        """Get token data"""
-        token_data = reset_tokens_collection.find_one({'token': token})
+        """Get token data (None once expired)"""
+        token_data = reset_tokens_collection.find_one(self._live(token))
+        return token_data if token_data else default
+    
+    def pop(self, token, default=None):
+        """Validate and consume a token in one step (atomic, so it works once)"""
+        token_data = reset_tokens_collection.find_one_and_delete(self._live(token))
         return token_data if token_data else default
     
     def __setitem__(self, token, token_data):
-        """Add or update token"""
-        token_data['token'] = token  # Add token to data
-        reset_tokens_collection.update_one(
-            {'token': token},
-            {'$set': token_data},
-            upsert=True
-        )
+        """Add token ('expires' must be a UTC datetime)"""
+        token_data = dict(token_data, token_hash=self._hash(token))
+        reset_tokens_collection.insert_one(token_data)
     
     def __delitem__(self, token):
         """Delete token"""
-        reset_tokens_collection.delete_one({'token': token})
+        reset_tokens_collection.delete_one({'token_hash': self._hash(token)})
     
     def __contains__(self, token):
-        """Check if token exists"""
-        return reset_tokens_collection.count_documents({'token': token}) > 0
+        """Check if an unexpired token exists"""
+        return reset_tokens_collection.count_documents(self._live(token), limit=1) > 0
 
 RESET_TOKENS = ResetTokensDatabase()
 
@@ -142,10 +176,10 @@ def save_medicine_to_file(medicine_name, medicine_data):
     """
     try:
         MEDICINE_DATABASE[medicine_name] = medicine_data
-        print(f"✓ Saved '{medicine_name}' to MongoDB")
+        logger.info("Saved medicine", extra={'medicine': medicine_name})
         return True
-    except Exception as e:
-        print(f"Error saving medicine: {e}")
+    except Exception:
+        logger.exception("Error saving medicine")
         return False
 
 # ============================================
@@ -157,10 +191,10 @@ def seed_default_medicines():
     
     # Check if medicines already exist
     if medicines_collection.count_documents({}) > 0:
-        print(f"✓ Database already has {medicines_collection.count_documents({})} medicines")
+        logger.debug("Medicines already seeded")
         return
     
-    print("📦 Seeding default medicines...")
+    logger.info("Seeding default medicines")
     
     default_medicines = [
         {
@@ -168,55 +202,190 @@ def seed_default_medicines():
             'description': 'Aspirin is a common painkiller that helps reduce pain, fever, and inflammation in your body. It works by blocking chemicals that cause pain and swelling. Doctors also prescribe it to prevent heart attacks and strokes because it stops blood from clotting too much. You can buy it at any pharmacy without a prescription.',
             'advice': '• Take with food or a full glass of water\n• Don\'t take on an empty stomach\n• Take one tablet every 4-6 hours as needed\n• Don\'t take more than 8 tablets in 24 hours',
             'warning': '• Don\'t mix with other painkillers without asking a doctor\n• Avoid if you have stomach ulcers or bleeding problems\n• Don\'t drink alcohol while taking it\n• May cause stomach upset or bleeding in some people',
-            'pubmed_link': 'https://pubmed.ncbi.nlm.nih.gov/?term=aspirin'
+            'pubmed_link': 'https://pubmed.ncbi.nlm.nih.gov/?term=aspirin',
+            'source': 'seed'
         },
         {
             'name': 'Ibuprofen',
             'description': 'Ibuprofen is a painkiller that helps with headaches, muscle aches, period pain, and fever. It belongs to a group of medicines called NSAIDs which reduce inflammation and pain in your body. It works by blocking chemicals that cause swelling and pain. You can buy it at pharmacies without a prescription for short-term use.',
             'advice': '• Take with food or milk to protect your stomach\n• Drink plenty of water with each dose\n• Take the lowest dose that works for you\n• Don\'t use for more than 10 days without seeing a doctor',
             'warning': '• Don\'t take if you have stomach problems or asthma\n• May increase risk of heart problems if used long-term\n• Avoid alcohol while taking this medicine\n• Can interact badly with blood pressure medicines',
-            'pubmed_link': 'https://pubmed.ncbi.nlm.nih.gov/?term=ibuprofen'
+            'pubmed_link': 'https://pubmed.ncbi.nlm.nih.gov/?term=ibuprofen',
+            'source': 'seed'
         },
         {
             'name': 'Paracetamol',
             'description': 'Paracetamol (also called acetaminophen) is a very common medicine for pain and fever. It helps with headaches, toothaches, period pain, cold symptoms, and reducing high temperature. It\'s gentler on your stomach than other painkillers and is safe for most people when used correctly. You can buy it without a prescription.',
             'advice': '• Can take with or without food\n• Take one or two tablets every 4-6 hours as needed\n• Wait at least 4 hours between doses\n• Read the label carefully - many cold medicines also contain paracetamol',
             'warning': '• Never take more than 8 tablets (4000mg) in 24 hours\n• Taking too much can cause serious liver damage\n• Don\'t drink alcohol while taking this\n• Check other medicines don\'t also contain paracetamol',
-            'pubmed_link': 'https://pubmed.ncbi.nlm.nih.gov/?term=paracetamol'
+            'pubmed_link': 'https://pubmed.ncbi.nlm.nih.gov/?term=paracetamol',
+            'source': 'seed'
         }
     ]
     
+    for medicine in default_medicines:
+        medicine['name_key'] = normalize_medicine_name(medicine['name'])
     medicines_collection.insert_many(default_medicines)
-    print(f"✅ Added {len(default_medicines)} default medicines")
+    logger.info("Added default medicines", extra={'count': len(default_medicines)})
+
+# Names seed_default_medicines() writes
+SEED_MEDICINE_NAMES = ('Aspirin', 'Ibuprofen', 'Paracetamol')
+
+SEED_SOURCE_MIGRATION_ID = 'seed_source'
+
+def mark_seeded_medicines():
+    """
+    Tag default medicines seeded before documents had a source, once
+    
+    Without source='seed' the refresher would see them as outdated AI output
+    and overwrite them on their first view.
+    """
+    if migrations_collection.count_documents({'_id': SEED_SOURCE_MIGRATION_ID}, limit=1):
+        return
+    
+    try:
+        result = medicines_collection.update_many(
+            {
+                'name': {'$in': list(SEED_MEDICINE_NAMES)},
+                'source': {'$exists': False},
+                'generated_at': {'$exists': False}  # Not already replaced by the LM
+            },
+            {'$set': {'source': 'seed'}}
+        )
+        migrations_collection.insert_one({
+            '_id': SEED_SOURCE_MIGRATION_ID,
+            'marked': result.modified_count,
+            'completed_at': datetime.utcnow()
+        })
+        if result.modified_count:
+            logger.info("Marked seeded medicines", extra={'count': result.modified_count})
+    except Exception:
+        logger.exception("Error marking seeded medicines")
 
 # ============================================
 # MIGRATE OLD JSON DATA (Run once)
 # ============================================
 
+JSON_MIGRATION_ID = 'medicine_database_json'
+
 def migrate_from_json_if_needed():
-    """Migrate medicines from old JSON file to MongoDB"""
+    """
+    Migrate medicines from the old JSON file to MongoDB, once
+    
+    A marker in the migrations collection stops later imports of this module
+    from reading the file again. Medicines already in MongoDB are left as is.
+    """
     
     json_file = os.path.join(os.path.dirname(__file__), '..', 'medicine_database.json')
     
     if not os.path.exists(json_file):
         return  # No old data to migrate
     
+    if migrations_collection.count_documents({'_id': JSON_MIGRATION_ID}, limit=1):
+        return  # Already migrated
+    
     try:
+        from models.catalog import import_documents
+        
         with open(json_file, 'r', encoding='utf-8') as f:
             old_medicines = json.load(f)
         
-        migrated = 0
-        for medicine_name, medicine_data in old_medicines.items():
-            # Check if already exists
-            if medicine_name.lower() not in MEDICINE_DATABASE:
-                medicines_collection.insert_one(medicine_data)
-                migrated += 1
+        # The file is keyed by name; older entries don't repeat it inside.
+        # Its medicines were AI generated, so they keep no source and can be refreshed.
+        medicines = ({'name': name, **data} for name, data in old_medicines.items())
+        stats = import_documents(medicines_collection, medicines, overwrite=False, source=None)
+        migrations_collection.insert_one({
+            '_id': JSON_MIGRATION_ID,
+            'file': os.path.abspath(json_file),
+            'migrated': stats['inserted'],
+            'completed_at': datetime.utcnow()
+        })
+        
+        if stats['inserted'] > 0:
+            logger.info("Migrated medicines from JSON", extra={'count': stats['inserted'], 'file': json_file})
+    
+    except Exception:
+        logger.exception("Error migrating JSON data")
+
+# ============================================
+# MEDICINES FROM THE OLD DEFAULT DATABASE (Run once)
+# ============================================
+
+LEGACY_DATABASE_MIGRATION_ID = 'legacy_medicine_database'
+
+def migrate_legacy_database_medicines():
+    """
+    Copy medicines MedicineModel stored in LEGACY_DATABASE_NAME, once
+    
+    Without DATABASE_NAME set, MedicineModel used to write to 'medinfo_db'
+    while everything else used 'MedInfo'. Medicines already here are kept.
+    """
+    if os.getenv('DATABASE_NAME') or database_name == LEGACY_DATABASE_NAME:
+        return  # Every module already agreed on the database
+    if migrations_collection.count_documents({'_id': LEGACY_DATABASE_MIGRATION_ID}, limit=1):
+        return
+    
+    try:
+        from models.catalog import import_documents
         
-        if migrated > 0:
-            print(f"✓ Migrated {migrated} medicines from {json_file} into MongoDB")
+        legacy = client[LEGACY_DATABASE_NAME]['Medicine'].find({}, {'_id': 0})
+        stats = import_documents(medicines_collection, legacy, overwrite=False, source=None)
+        migrations_collection.insert_one({
+            '_id': LEGACY_DATABASE_MIGRATION_ID,
+            'migrated': stats['inserted'],
+            'completed_at': datetime.utcnow()
+        })
+        if stats['inserted']:
+            logger.info("Copied medicines from the old default database",
+                        extra={'count': stats['inserted'], 'database': LEGACY_DATABASE_NAME})
+    except Exception:
+        logger.exception("Error copying medicines from the old default database")
+
+# ============================================
+# PER-USER RECENT HISTORY (Run once, in the background)
+# ============================================
+
+RECENT_HISTORY_MIGRATION_ID = 'recent_history'
+
+def migrate_recent_history_once():
+    """
+    Build user_recent_history from search_history once, after deploying it
+    
+    The first worker to insert the marker runs the migration in a thread so
+    it doesn't hold up startup; until it finishes, users without a recent
+    history document are read from search_history. `flask migrate-recent-history`
+    can still re-run it by hand.
+    """
+    try:
+        migrations_collection.insert_one({'_id': RECENT_HISTORY_MIGRATION_ID, 'started_at': datetime.utcnow()})
+    except DuplicateKeyError:
+        return  # Done already, or another worker is on it
+    
+    def run():
+        try:
+            from models.user_collections import migrate_recent_history
+            count = migrate_recent_history()
+            migrations_collection.update_one(
+                {'_id': RECENT_HISTORY_MIGRATION_ID},
+                {'$set': {'migrated': count, 'completed_at': datetime.utcnow()}}
+            )
+            logger.info("Migrated recent history", extra={'users': count})
+        except Exception:
+            logger.exception("Error migrating recent history")
     
-    except Exception as e:
-        print(f"Error migrating JSON data: {e}")
+    threading.Thread(target=run, name='recent-history-migration', daemon=True).start()
+
+# ============================================
+# MEDICINE NAME KEYS (Run once, cheap afterwards)
+# ============================================
+
+def backfill_medicine_name_keys():
+    """Give medicines stored before name_key one, so batch lookups find them"""
+    try:
+        from models.catalog import ensure_name_keys
+        ensure_name_keys(medicines_collection)
+    except Exception:
+        logger.exception("Error backfilling medicine name keys")
 
 # ============================================
 # RUN ON STARTUP
@@ -225,5 +394,17 @@ def migrate_from_json_if_needed():
 # Seed default medicines if needed
 seed_default_medicines()
 
+# Tag seeds from before source existed (before the refresher can see them)
+mark_seeded_medicines()
+
 # Migrate old JSON data if exists
-migrate_from_json_if_needed()
\ No newline at end of file
+migrate_from_json_if_needed()
+
+# Medicines MedicineModel wrote to the old default database
+migrate_legacy_database_medicines()
+
+# Backfill name_key on older medicines
+backfill_medicine_name_keys()
+
+# Capped recent history for users who searched before it existed
+migrate_recent_history_once()
\ No newline at end of file
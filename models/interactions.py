@@ -0,0 +1,178 @@
+"""
+Drug Interactions - Precomputed pairwise interaction index
+File: models/interactions.py
+
+Interactions come from a local JSON file (INTERACTIONS_FILE, by default
+drug_interactions.json in the project root):
+
+    {"aliases": {"advil": "ibuprofen", ...},
+     "interactions": [{"drugs": ["warfarin", "aspirin"], "severity": "major",
+                       "description": "..."}, ...]}
+
+The file is read once per process into a dict keyed by drug pair, plus a
+partners map per drug, so checking a whole medication list is one pass over
+the user's drugs with dict lookups and no database queries.
+
+A user's result (their medication names plus warnings) is cached under their
+medications_version, a token on the User_info document that changes whenever
+they save a medication or update the profile's medication list. A change
+makes the old entry unreachable in every worker, so results stay correct
+even with a per-process cache (CACHE_URL=memory://).
+"""
+
+from dataclasses import dataclass
+import json
+import logging
+import os
+import threading
+
+from models.medicine_model import normalize_medicine_name
+from utils.cache import get_cache
+
+logger = logging.getLogger(__name__)
+
+INTERACTIONS_FILE = os.getenv(
+    'INTERACTIONS_FILE',
+    os.path.join(os.path.dirname(__file__), '..', 'drug_interactions.json')
+)
+
+# Only bounds how long unreachable entries linger; a medications change
+# switches to a new key straight away
+INTERACTIONS_CACHE_TTL = int(os.getenv('INTERACTIONS_CACHE_TTL', '86400'))
+
+# Most serious first
+SEVERITIES = ('major', 'moderate', 'minor')
+
+
+@dataclass(frozen=True, slots=True)
+class Interaction:
+    """One interacting pair (drugs are canonical names, sorted)"""
+    drugs: tuple
+    severity: str
+    description: str
+
+# ============================================
+# INDEX
+# ============================================
+
+class InteractionIndex:
+    """Pair lookups over the interaction table"""
+
+    def __init__(self, interactions, aliases=None):
+        self.aliases = {normalize_medicine_name(name): normalize_medicine_name(drug)
+                        for name, drug in (aliases or {}).items()}
+        self.pairs = {}     # (drug, drug) sorted -> Interaction
+        self.partners = {}  # drug -> set of drugs it interacts with
+
+        for entry in interactions:
+            drugs = tuple(sorted({self.canonical(drug) for drug in entry['drugs']}))
+            severity = entry['severity']
+            if len(drugs) != 2:
+                raise ValueError(f"Interaction needs two different drugs: {entry['drugs']}")
+            if severity not in SEVERITIES:
+                raise ValueError(f"Unknown severity {severity!r} for {drugs}")
+
+            existing = self.pairs.get(drugs)
+            if existing and SEVERITIES.index(existing.severity) <= SEVERITIES.index(severity):
+                continue  # Listed twice: keep the more serious entry
+            self.pairs[drugs] = Interaction(drugs, severity, entry.get('description', ''))
+            self.partners.setdefault(drugs[0], set()).add(drugs[1])
+            self.partners.setdefault(drugs[1], set()).add(drugs[0])
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data.get('interactions', []), data.get('aliases'))
+
+    def canonical(self, name):
+        """Generic name for a brand/common name (normalized)"""
+        name = normalize_medicine_name(name)
+        return self.aliases.get(name, name)
+
+    def lookup(self, first, second):
+        """Interaction between two drugs, or None"""
+        first, second = self.canonical(first), self.canonical(second)
+        return self.pairs.get((first, second) if first < second else (second, first))
+
+    def check(self, medications):
+        """
+        All interactions within a medication list, most serious first
+
+        Args:
+            medications (iterable): Medicine names as the user entered them
+
+        Returns:
+            list: Interaction records
+        """
+        drugs = {self.canonical(name) for name in medications if name and name.strip()}
+        found = [
+            self.pairs[(drug, other)]
+            for drug in drugs
+            for other in self.partners.get(drug, ())
+            if drug < other and other in drugs
+        ]
+        found.sort(key=lambda interaction: (SEVERITIES.index(interaction.severity), interaction.drugs))
+        return found
+
+    def with_drug(self, name, medications):
+        """Interactions between one medicine and a medication list, most serious first"""
+        drug = self.canonical(name)
+        partners = self.partners.get(drug, set())
+        others = {self.canonical(other) for other in medications if other and other.strip()}
+        found = [self.pairs[(drug, other) if drug < other else (other, drug)]
+                 for other in others & partners]
+        found.sort(key=lambda interaction: (SEVERITIES.index(interaction.severity), interaction.drugs))
+        return found
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """The interaction index, loaded from INTERACTIONS_FILE on first use"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                try:
+                    _index = InteractionIndex.from_file(INTERACTIONS_FILE)
+                except FileNotFoundError:
+                    logger.warning("No interaction file, interaction checks are off",
+                                   extra={'path': INTERACTIONS_FILE})
+                    _index = InteractionIndex([])
+                logger.info("Interaction index loaded", extra={'pairs': len(_index.pairs)})
+    return _index
+
+# ============================================
+# PER-USER RESULTS
+# ============================================
+
+def _user_key(email, version):
+    return f'interactions:{email.strip().lower()}:{version}'
+
+
+def get_user_interactions(email, load_medications, version):
+    """
+    A user's medications and the interactions between them (cached)
+
+    Args:
+        email (str): User email
+        load_medications (callable): Returns the user's medication names;
+            only called when the result isn't cached
+        version (str): The user's medications_version, or None if they have
+            no profile yet (the result is then computed and not cached)
+
+    Returns:
+        dict: {'medications': [canonical names], 'warnings': [Interaction, ...]}
+    """
+    def compute():
+        index = get_index()
+        medications = sorted({index.canonical(name) for name in load_medications(email)
+                              if name and name.strip()})
+        return {'medications': medications, 'warnings': index.check(medications)}
+
+    if version is None:
+        return compute()
+    return get_cache().get_or_set(_user_key(email, version), compute, INTERACTIONS_CACHE_TTL)
@@ -4,19 +4,43 @@ Replaces JSON file storage with MongoDB database
 """
 from pymongo import MongoClient
 from bson import ObjectId
+from datetime import datetime, timedelta
 import os
+import threading
 from dotenv import load_dotenv
+from utils import page_cache
 
 load_dotenv()
 
+# Connection settings shared by every module that stores medicines
+# (models/database.py, models/user_collections.py, models/async_collections.py),
+# so the medicines, their name_key index and the reviews are in one database
+MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/')
+DATABASE_NAME = os.getenv('DATABASE_NAME', 'MedInfo')
+
+# Where MedicineModel kept medicines when DATABASE_NAME was unset, before the
+# default was shared (models/database.py copies them over once)
+LEGACY_DATABASE_NAME = 'medinfo_db'
+
+# Most names get_many() resolves in one call
+MEDICINE_BATCH_LIMIT = int(os.getenv('MEDICINE_BATCH_LIMIT', '50'))
+
+# Fields a client needs to show a medicine (no bookkeeping)
+MEDICINE_SUMMARY_PROJECTION = {
+    'name': 1, 'description': 1, 'advice': 1, 'warning': 1, 'pubmed_link': 1, 'name_key': 1
+}
+
+
+def normalize_medicine_name(medicine_name):
+    """Lookup key for a medicine name: trimmed, single spaces, lower case"""
+    return ' '.join(medicine_name.split()).lower()
+
+
 class MedicineModel:
     def __init__(self):
-        # Get MongoDB connection from environment variables
-        mongodb_uri = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/')
-        database_name = os.getenv('DATABASE_NAME', 'medinfo_db')
-        
-        self.client = MongoClient(mongodb_uri)
-        self.db = self.client[database_name]
+        # Same database as models/database.py (see DATABASE_NAME)
+        self.client = MongoClient(MONGODB_URI)
+        self.db = self.client[DATABASE_NAME]
         self.collection = self.db['Medicine']  # Your collection name
     
     def create_medicine(self, medicine_data):
@@ -34,7 +58,9 @@ class MedicineModel:
         Returns:
             str: ID of inserted medicine
         """
+        medicine_data['name_key'] = normalize_medicine_name(medicine_data.get('name', ''))
         result = self.collection.insert_one(medicine_data)
+        page_cache.invalidate(medicine_data.get('name', ''))
         return str(result.inserted_id)
     
     def get_all_medicines(self):
@@ -42,13 +68,9 @@ class MedicineModel:
         Get all medicines from database
         
         Returns:
-            list: All medicines with _id converted to string
+            list: All medicines
         """
-        medicines = list(self.collection.find({}))
-        # Convert ObjectId to string for JSON
-        for medicine in medicines:
-            medicine['_id'] = str(medicine['_id'])
-        return medicines
+        return list(self.collection.find({}))
     
     def get_medicine_by_name(self, medicine_name):
         """
@@ -60,12 +82,59 @@ class MedicineModel:
         Returns:
             dict: Medicine data or None if not found
         """
-        medicine = self.collection.find_one({
+        return self.collection.find_one({
             'name': {'$regex': f'^{medicine_name}$', '$options': 'i'}
         })
-        if medicine:
-            medicine['_id'] = str(medicine['_id'])
-        return medicine
+    
+    def get_medicine_by_key(self, medicine_name, projection=None):
+        """
+        Find a medicine by its normalized name (indexed, no regex)
+        
+        Args:
+            medicine_name (str): Name as typed or as in a URL (any case, '-' for spaces)
+            projection (dict): Fields to return (default: the whole document)
+            
+        Returns:
+            dict: Medicine data or None if not found
+        """
+        key = normalize_medicine_name(medicine_name.replace('-', ' '))
+        if not key:
+            return None
+        return self.collection.find_one({'name_key': key}, projection)
+    
+    def get_many(self, medicine_names, projection=None):
+        """
+        Find several medicines in one indexed query on name_key
+        
+        Args:
+            medicine_names (list): Names as typed or as in URLs (any case,
+                '-' for spaces); duplicates are resolved once
+            projection (dict): Fields to return (default MEDICINE_SUMMARY_PROJECTION)
+            
+        Returns:
+            tuple: (medicines in request order, names that weren't found)
+            
+        Raises:
+            ValueError: More than MEDICINE_BATCH_LIMIT distinct names
+        """
+        requested = {}
+        for medicine_name in medicine_names:
+            key = normalize_medicine_name(medicine_name.replace('-', ' '))
+            if key:
+                requested.setdefault(key, medicine_name.strip())
+        if len(requested) > MEDICINE_BATCH_LIMIT:
+            raise ValueError(f"At most {MEDICINE_BATCH_LIMIT} medicines per request")
+        if not requested:
+            return [], []
+        
+        projection = dict(projection or MEDICINE_SUMMARY_PROJECTION, name_key=1)
+        by_key = {
+            medicine['name_key']: medicine
+            for medicine in self.collection.find({'name_key': {'$in': list(requested)}}, projection)
+        }
+        medicines = [by_key[key] for key in requested if key in by_key]
+        missing = [name for key, name in requested.items() if key not in by_key]
+        return medicines, missing
     
     def get_medicine_by_id(self, medicine_id):
         """
@@ -78,10 +147,7 @@ class MedicineModel:
             dict: Medicine data or None
         """
         try:
-            medicine = self.collection.find_one({'_id': ObjectId(medicine_id)})
-            if medicine:
-                medicine['_id'] = str(medicine['_id'])
-            return medicine
+            return self.collection.find_one({'_id': ObjectId(medicine_id)})
         except:
             return None
     
@@ -99,11 +165,20 @@ class MedicineModel:
         try:
             # Remove _id from update data
             medicine_data.pop('_id', None)
-            result = self.collection.update_one(
+            if medicine_data.get('name'):
+                medicine_data['name_key'] = normalize_medicine_name(medicine_data['name'])
+            old = self.collection.find_one_and_update(
                 {'_id': ObjectId(medicine_id)},
-                {'$set': medicine_data}
+                {'$set': medicine_data},
+                projection={'name': 1}
             )
-            return result.modified_count > 0
+            if not old:
+                return False
+            # Drop cached pages under both the old and the new name
+            page_cache.invalidate(old.get('name', ''))
+            if medicine_data.get('name'):
+                page_cache.invalidate(medicine_data['name'])
+            return True
         except:
             return False
     
@@ -118,11 +193,64 @@ class MedicineModel:
             bool: True if deleted successfully
         """
         try:
-            result = self.collection.delete_one({'_id': ObjectId(medicine_id)})
-            return result.deleted_count > 0
+            old = self.collection.find_one_and_delete(
+                {'_id': ObjectId(medicine_id)},
+                projection={'name': 1}
+            )
+            if not old:
+                return False
+            page_cache.invalidate(old.get('name', ''))
+            return True
         except:
             return False
     
+    def claim_refresh(self, medicine_id, generated_at, seconds):
+        """
+        Mark a generated medicine as being refreshed, so only one worker
+        regenerates it
+        
+        Args:
+            medicine_id (str): MongoDB ID
+            generated_at (datetime): generated_at of the version being replaced
+            seconds (int): How long the claim holds if the refresh never finishes
+            
+        Returns:
+            bool: True if this caller got the claim
+        """
+        now = datetime.utcnow()
+        result = self.collection.update_one(
+            {
+                '_id': ObjectId(medicine_id),
+                'generated_at': generated_at,
+                'refresh_claimed_until': {'$not': {'$gt': now}}
+            },
+            {'$set': {'refresh_claimed_until': now + timedelta(seconds=seconds)}}
+        )
+        return result.modified_count == 1
+    
+    def replace_generated(self, medicine_id, generated_at, medicine_data):
+        """
+        Swap in a regenerated document, unless it changed in the meantime
+        
+        Args:
+            medicine_id (str): MongoDB ID
+            generated_at (datetime): generated_at of the version being replaced
+            medicine_data (dict): New medicine information
+            
+        Returns:
+            bool: True if the new version was swapped in
+        """
+        medicine_data.pop('_id', None)
+        medicine_data['name_key'] = normalize_medicine_name(medicine_data.get('name', ''))
+        result = self.collection.replace_one(
+            {'_id': ObjectId(medicine_id), 'generated_at': generated_at},
+            medicine_data
+        )
+        if result.modified_count != 1:
+            return False
+        page_cache.invalidate(medicine_data.get('name', ''))
+        return True
+    
     def search_medicines(self, search_term):
         """
         Search medicines by name (partial match)
@@ -133,12 +261,9 @@ class MedicineModel:
         Returns:
             list: Matching medicines
         """
-        medicines = list(self.collection.find({
+        return list(self.collection.find({
             'name': {'$regex': search_term, '$options': 'i'}
         }))
-        for medicine in medicines:
-            medicine['_id'] = str(medicine['_id'])
-        return medicines
     
     def medicine_exists(self, medicine_name):
         """
@@ -157,4 +282,18 @@ class MedicineModel:
     
     def close_connection(self):
         """Close MongoDB connection"""
-        self.client.close()
\ No newline at end of file
+        self.client.close()
+
+
+_shared_model = None
+_shared_model_lock = threading.Lock()
+
+
+def get_shared_medicine_model():
+    """One MedicineModel (one connection pool) for every route in the process"""
+    global _shared_model
+    if _shared_model is None:
+        with _shared_model_lock:
+            if _shared_model is None:
+                _shared_model = MedicineModel()
+    return _shared_model
@@ -0,0 +1,96 @@
+"""
+Records - Compact typed rows for list and page queries
+File: models/records.py
+
+Each record type names the fields a caller actually uses and carries the
+projection that fetches just those fields, so MongoDB sends fewer bytes,
+the driver decodes less BSON and each row is a small slotted object
+instead of a full dict. Templates read them like dicts (user.fullname),
+and jsonify / tojson encode them as JSON objects.
+
+    cursor = collection.find({'email': email}, ScheduledMed.PROJECTION)
+    schedule = [ScheduledMed.from_doc(doc) for doc in cursor]
+
+Measured with benchmarks/bench_records.py.
+"""
+
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import Any, ClassVar, Optional
+
+
+class _Record:
+    """from_doc() and PROJECTION shared by the record types"""
+
+    __slots__ = ()
+
+    PROJECTION: ClassVar[dict]
+
+    # (attribute, document key) pairs; 'id' is read from _id
+    _KEYS: ClassVar[tuple]
+
+    @classmethod
+    def _prepare(cls):
+        cls._KEYS = tuple((f.name, '_id' if f.name == 'id' else f.name) for f in fields(cls))
+        cls.PROJECTION = {key: 1 for _, key in cls._KEYS}
+        if '_id' not in cls.PROJECTION:
+            cls.PROJECTION['_id'] = 0
+
+    @classmethod
+    def from_doc(cls, doc):
+        """
+        Build a record from a (projected) document; missing fields use defaults,
+        so one legacy or partial document can't break a whole list
+        """
+        return cls(**{name: doc[key] for name, key in cls._KEYS if key in doc})
+
+
+@dataclass(frozen=True, slots=True)
+class UserProfile(_Record):
+    """User_info fields shown on the profile page and the profile form"""
+    email: str
+    fullname: Optional[str] = None
+    age: Optional[str] = None
+    weight: Optional[str] = None
+    height: Optional[str] = None
+    gender: Optional[str] = None
+    allergies: Optional[str] = None
+    medications: Optional[str] = None
+    smoker: Optional[str] = None
+    alcohol: Optional[str] = None
+    medical_conditions: Optional[str] = None
+
+
+@dataclass(frozen=True, slots=True)
+class SavedMed(_Record):
+    """One Saved_meds entry"""
+    medication: str = ''
+
+
+@dataclass(frozen=True, slots=True)
+class ScheduledMed(_Record):
+    """One Scheduled_meds entry (schedule_time is the ISO string from the form)"""
+    medication: str = ''
+    schedule_time: str = ''
+
+
+@dataclass(frozen=True, slots=True)
+class Favorite(_Record):
+    """One user_favorites entry"""
+    medicine_name: str = ''
+    added_at: Optional[datetime] = None
+
+
+@dataclass(frozen=True, slots=True)
+class Review(_Record):
+    """One user_reviews entry as shown under a medicine"""
+    id: Any = None
+    user_email: str = ''
+    medicine_name: str = ''
+    rating: int = 0
+    review_text: str = ''
+    created_at: Optional[datetime] = None
+
+
+for _record_type in (UserProfile, SavedMed, ScheduledMed, Favorite, Review):
+    _record_type._prepare()
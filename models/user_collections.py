@@ -3,20 +3,44 @@ User Collections - Search History, Favorites, and Reviews
 File: models/user_collections.py
 """
 
-from pymongo import MongoClient, DESCENDING
-from datetime import datetime
+from pymongo import MongoClient, DESCENDING, ReplaceOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from datetime import datetime, timedelta
 from bson import ObjectId
+import logging
 import os
 from dotenv import load_dotenv
+from models.medicine_model import DATABASE_NAME, MONGODB_URI
+from models.records import Favorite, Review
+from utils import page_cache
+from utils.cache import get_cache
+from utils.logging_setup import SAMPLED
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Average ratings are shared between workers through the cache for this long
+# (at most cache.LOCAL_CACHE_MAX_TTL on the per-process memory:// backend,
+# where other workers never see a review's invalidation)
+RATING_CACHE_TTL = int(os.getenv('RATING_CACHE_TTL', '300'))
+
+# Trending medicines: hourly view counters, kept for TRENDING_DAYS and
+# weighted down by half every TRENDING_HALF_LIFE_HOURS
+TRENDING_DAYS = int(os.getenv('TRENDING_DAYS', '7'))
+TRENDING_HALF_LIFE_HOURS = float(os.getenv('TRENDING_HALF_LIFE_HOURS', '24'))
+TRENDING_CACHE_TTL = int(os.getenv('TRENDING_CACHE_TTL', '300'))
+
+# Recent searches kept per user, and how long search detail is kept at all
+RECENT_HISTORY_SIZE = int(os.getenv('RECENT_HISTORY_SIZE', '20'))
+HISTORY_RETENTION_DAYS = int(os.getenv('HISTORY_RETENTION_DAYS', '90'))
+
 # ============================================
 # MONGODB CONNECTION (Same as database.py)
 # ============================================
 
-mongodb_uri = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/')
-database_name = os.getenv('DATABASE_NAME', 'MedInfo')
+mongodb_uri = MONGODB_URI
+database_name = DATABASE_NAME
 
 client = MongoClient(mongodb_uri)
 db = client[database_name]
@@ -28,24 +52,45 @@ db = client[database_name]
 search_history_collection = db['search_history']
 user_favorites_collection = db['user_favorites']
 user_reviews_collection = db['user_reviews']
+medicine_popularity_collection = db['medicine_popularity']
+recent_history_collection = db['user_recent_history']
 
-print(f"✅ Connected to new collections: search_history, user_favorites, user_reviews")
+logger.info("Connected to collections: search_history, user_favorites, user_reviews, "
+            "medicine_popularity, user_recent_history")
 
 # ============================================
 # CREATE INDEXES FOR BETTER PERFORMANCE
 # ============================================
 
+def ensure_ttl_index(collection, field, seconds):
+    """Create a TTL index, or change its expiry if it already exists"""
+    try:
+        collection.create_index(field, expireAfterSeconds=seconds)
+    except OperationFailure:
+        # Same key with a different expireAfterSeconds
+        db.command('collMod', collection.name,
+                   index={'keyPattern': {field: 1}, 'expireAfterSeconds': seconds})
+
+
 # Search History indexes
+search_history_collection.create_index([("user_email", 1), ("medicine_name", 1)])
 search_history_collection.create_index([("user_email", 1), ("timestamp", -1)])
 search_history_collection.create_index("medicine_name")
+ensure_ttl_index(search_history_collection, 'timestamp', HISTORY_RETENTION_DAYS * 86400)
+ensure_ttl_index(recent_history_collection, 'updated_at', HISTORY_RETENTION_DAYS * 86400)
 
 # Favorites indexes
 user_favorites_collection.create_index([("user_email", 1), ("medicine_name", 1)], unique=True)
+user_favorites_collection.create_index([("user_email", 1), ("added_at", -1)])
 
 # Reviews indexes
 user_reviews_collection.create_index([("user_email", 1), ("medicine_name", 1)])
 user_reviews_collection.create_index("medicine_name")
 
+# Popularity indexes (old hourly buckets are removed by the TTL index)
+medicine_popularity_collection.create_index("hour")
+medicine_popularity_collection.create_index("expires_at", expireAfterSeconds=0)
+
 # ============================================
 # SEARCH HISTORY FUNCTIONS
 # ============================================
@@ -55,74 +100,282 @@ def add_to_search_history(user_email, medicine_name):
     Add a medicine search to user's search history.
     If already searched, update timestamp and increment count.
     
+    The per-medicine detail lives in search_history (aged out after
+    HISTORY_RETENTION_DAYS); the capped recent list on the user's
+    user_recent_history document is what the pages read. Trending is
+    counted separately, for every visitor (record_medicine_view).
+    
     Args:
         user_email (str): User's email
         medicine_name (str): Medicine name searched
     
     Returns:
-        ObjectId: ID of the search entry
+        bool: True if recorded
     """
     try:
         medicine_name_lower = medicine_name.lower()
+        now = datetime.utcnow()
         
-        # Check if this medicine was already searched by this user
-        existing = search_history_collection.find_one({
-            'user_email': user_email,
-            'medicine_name': medicine_name_lower
-        })
+        search_history_collection.update_one(
+            {'user_email': user_email, 'medicine_name': medicine_name_lower},
+            {'$set': {'timestamp': now}, '$inc': {'search_count': 1}},
+            upsert=True
+        )
         
-        if existing:
-            # Update timestamp and increment search count
-            search_history_collection.update_one(
-                {'_id': existing['_id']},
-                {
-                    '$set': {'timestamp': datetime.utcnow()},
-                    '$inc': {'search_count': 1}
-                }
-            )
-            print(f"✅ Updated search history for {user_email}: {medicine_name}")
-            return existing['_id']
-        else:
-            # Insert new search entry
-            search_entry = {
-                'user_email': user_email,
-                'medicine_name': medicine_name_lower,
-                'timestamp': datetime.utcnow(),
-                'search_count': 1
-            }
-            result = search_history_collection.insert_one(search_entry)
-            print(f"✅ Added to search history for {user_email}: {medicine_name}")
-            return result.inserted_id
+        # Bump the entry if it is in the recent list, otherwise push it
+        for _ in range(2):
+            bump_filter, bump = recent_history_bump(user_email, medicine_name_lower, now)
+            if recent_history_collection.update_one(bump_filter, bump).matched_count:
+                break
+            push_filter, push = recent_history_push(user_email, medicine_name_lower, now)
+            try:
+                recent_history_collection.update_one(push_filter, push, upsert=True)
+                break
+            except DuplicateKeyError:
+                continue  # Added concurrently - bump it instead
+        
+        logger.info("Search history recorded", extra={'medicine': medicine_name_lower, **SAMPLED})
+        return True
     
-    except Exception as e:
-        print(f"❌ Error adding to search history: {e}")
-        return None
+    except Exception:
+        logger.exception("Error adding to search history")
+        return False
+
+
+def recent_history_bump(user_email, medicine_name, now):
+    """
+    Filter and update that refresh an entry already in the recent list
+    
+    Returns:
+        tuple: (filter, update) for update_one
+    """
+    return (
+        {'_id': user_email, 'items.medicine_name': medicine_name},
+        {
+            '$set': {'items.$.timestamp': now, 'updated_at': now},
+            '$inc': {'items.$.search_count': 1}
+        }
+    )
+
+
+def recent_history_push(user_email, medicine_name, now):
+    """
+    Filter and update that add a new entry, keeping the newest
+    RECENT_HISTORY_SIZE. The $ne guard makes the upsert fail with a
+    duplicate key instead of adding the medicine twice.
+    
+    Returns:
+        tuple: (filter, update) for an upserting update_one
+    """
+    return (
+        {'_id': user_email, 'items.medicine_name': {'$ne': medicine_name}},
+        {
+            '$push': {'items': {
+                '$each': [{'medicine_name': medicine_name, 'timestamp': now, 'search_count': 1}],
+                '$sort': {'timestamp': -1},
+                '$slice': RECENT_HISTORY_SIZE
+            }},
+            '$set': {'updated_at': now}
+        }
+    )
+
+
+# Fields of a search_history row that make up a recent history entry
+HISTORY_ITEM_PROJECTION = {'_id': 0, 'medicine_name': 1, 'timestamp': 1, 'search_count': 1}
+
+
+def recent_history_items(doc, limit):
+    """Newest-first entries from a user_recent_history document, within retention"""
+    if not doc:
+        return []
+    cutoff = datetime.utcnow() - timedelta(days=HISTORY_RETENTION_DAYS)
+    items = [item for item in doc.get('items', []) if item['timestamp'] >= cutoff]
+    # Bumped entries keep their slot until the next push re-sorts the array
+    items.sort(key=lambda item: item['timestamp'], reverse=True)
+    return items[:limit]
 
 
 def get_user_search_history(user_email, limit=10):
     """
     Get user's search history (most recent first).
     
+    Args:
+        user_email (str): User's email
+        limit (int): Maximum number of results (at most RECENT_HISTORY_SIZE)
+    
+    Users without a user_recent_history document yet (history from before
+    it existed, until migrate_recent_history has run) are read from the
+    search_history detail instead.
+    
+    Returns:
+        list: [{'medicine_name': str, 'timestamp': datetime, 'search_count': int}, ...]
+    """
+    try:
+        doc = recent_history_collection.find_one({'_id': user_email}, {'items': 1})
+        if doc is None:
+            cursor = search_history_collection.find({'user_email': user_email}, HISTORY_ITEM_PROJECTION)
+            return list(cursor.sort('timestamp', DESCENDING).limit(min(limit, RECENT_HISTORY_SIZE)))
+        return recent_history_items(doc, limit)
+    
+    except Exception:
+        logger.exception("Error getting search history")
+        return []
+
+
+def get_recent_searches(user_email, limit=5):
+    """
+    Compact recent search list for the homepage (only shown fields).
+    
     Args:
         user_email (str): User's email
         limit (int): Maximum number of results to return
     
     Returns:
-        list: List of search history entries
+        list: [{'medicine_name': str, 'search_count': int}, ...]
+    """
+    return [
+        {'medicine_name': item['medicine_name'], 'search_count': item['search_count']}
+        for item in get_user_search_history(user_email, limit)
+    ]
+
+
+def migrate_recent_history(batch_size=500):
+    """
+    Build user_recent_history documents from the search_history detail.
+    Safe to re-run: entries already on a user's document win over old detail.
+    
+    Args:
+        batch_size (int): Users written per bulk request
+    
+    Returns:
+        int: Number of users migrated
+    """
+    cursor = search_history_collection.aggregate([
+        {'$sort': {'user_email': 1, 'timestamp': -1}},
+        {'$group': {
+            '_id': '$user_email',
+            'items': {'$push': {
+                'medicine_name': '$medicine_name',
+                'timestamp': '$timestamp',
+                'search_count': '$search_count'
+            }}
+        }},
+        {'$project': {'items': {'$slice': ['$items', RECENT_HISTORY_SIZE]}}}
+    ], allowDiskUse=True)
+    
+    migrated = 0
+    batch = []
+    
+    def flush():
+        existing = {
+            doc['_id']: doc for doc in recent_history_collection.find(
+                {'_id': {'$in': [user['_id'] for user in batch]}}
+            )
+        }
+        requests = []
+        for user in batch:
+            merged = {item['medicine_name']: item for item in user['items']}
+            for item in existing.get(user['_id'], {}).get('items', []):
+                merged[item['medicine_name']] = item
+            items = sorted(merged.values(), key=lambda item: item['timestamp'], reverse=True)
+            items = items[:RECENT_HISTORY_SIZE]
+            requests.append(ReplaceOne(
+                {'_id': user['_id']},
+                {'items': items, 'updated_at': items[0]['timestamp']},
+                upsert=True
+            ))
+        recent_history_collection.bulk_write(requests, ordered=False)
+    
+    for user in cursor:
+        if not user['_id'] or not user['items']:
+            continue
+        batch.append(user)
+        if len(batch) >= batch_size:
+            flush()
+            migrated += len(batch)
+            batch = []
+    if batch:
+        flush()
+        migrated += len(batch)
+    
+    logger.info("Migrated recent history", extra={'users': migrated})
+    return migrated
+
+
+# ============================================
+# POPULARITY COUNTERS (TRENDING)
+# ============================================
+
+def popularity_bucket(medicine_name, now=None):
     """
+    Filter and update that count one view in the medicine's hourly bucket
+    
+    Returns:
+        tuple: (filter, update) for an upserting update_one
+    """
+    now = now or datetime.utcnow()
+    hour = now.replace(minute=0, second=0, microsecond=0)
+    return (
+        {'_id': f"{medicine_name}|{hour.isoformat()}"},
+        {
+            '$inc': {'views': 1},
+            '$setOnInsert': {
+                'medicine_name': medicine_name,
+                'hour': hour,
+                'expires_at': hour + timedelta(days=TRENDING_DAYS, hours=1)
+            }
+        }
+    )
+
+
+def record_medicine_view(medicine_name):
+    """Count one view of a medicine towards trending (any visitor, cached page or not)"""
     try:
-        history = list(search_history_collection.find(
-            {'user_email': user_email}
-        ).sort('timestamp', DESCENDING).limit(limit))
-        
-        # Convert ObjectId to string for JSON serialization
-        for item in history:
-            item['_id'] = str(item['_id'])
-        
-        return history
+        bucket_filter, update = popularity_bucket(medicine_name.lower())
+        medicine_popularity_collection.update_one(bucket_filter, update, upsert=True)
+    except Exception:
+        logger.exception("Error recording medicine view")
+
+
+def _compute_trending(limit):
+    """Top medicines by time-decayed views, read from the hourly buckets"""
+    now = datetime.utcnow()
+    half_life_ms = TRENDING_HALF_LIFE_HOURS * 3600 * 1000
+    trending = list(medicine_popularity_collection.aggregate([
+        {'$match': {'hour': {'$gte': now - timedelta(days=TRENDING_DAYS)}}},
+        {'$group': {
+            '_id': '$medicine_name',
+            'views': {'$sum': '$views'},
+            # views * 0.5 ^ (age / half life)
+            'score': {'$sum': {'$multiply': ['$views', {'$pow': [
+                0.5, {'$divide': [{'$subtract': [now, '$hour']}, half_life_ms]}
+            ]}]}}
+        }},
+        {'$sort': {'score': -1}},
+        {'$limit': limit},
+        {'$project': {'_id': 0, 'medicine_name': '$_id', 'views': 1, 'score': 1}}
+    ]))
+    for item in trending:
+        item['score'] = round(item['score'], 2)
+    return trending
+
+
+def get_trending_medicines(limit=5):
+    """
+    Most viewed medicines, recent views counting more (cached).
     
-    except Exception as e:
-        print(f"❌ Error getting search history: {e}")
+    Args:
+        limit (int): Maximum number of results to return
+    
+    Returns:
+        list: [{'medicine_name': str, 'views': int, 'score': float}, ...]
+    """
+    try:
+        return get_cache().get_or_set(
+            f'trending:{limit}', lambda: _compute_trending(limit), TRENDING_CACHE_TTL
+        )
+    except Exception:
+        logger.exception("Error getting trending medicines")
         return []
 
 
@@ -138,11 +391,12 @@ def clear_search_history(user_email):
     """
     try:
         result = search_history_collection.delete_many({'user_email': user_email})
-        print(f"✅ Cleared {result.deleted_count} search history entries for {user_email}")
+        recent_history_collection.delete_one({'_id': user_email})
+        logger.info("Cleared search history", extra={'deleted': result.deleted_count})
         return result.deleted_count
     
-    except Exception as e:
-        print(f"❌ Error clearing search history: {e}")
+    except Exception:
+        logger.exception("Error clearing search history")
         return 0
 
 
@@ -170,15 +424,15 @@ def add_to_favorites(user_email, medicine_name):
         
         # Try to insert (will fail if already exists due to unique index)
         user_favorites_collection.insert_one(favorite_entry)
-        print(f"✅ Added {medicine_name} to favorites for {user_email}")
+        logger.info("Favorite added", extra={'medicine': medicine_name.lower(), **SAMPLED})
         return True
     
     except Exception as e:
         # Duplicate key error means it's already in favorites
         if 'duplicate key' in str(e).lower():
-            print(f"ℹ️ {medicine_name} already in favorites for {user_email}")
+            logger.debug("Favorite already present", extra={'medicine': medicine_name.lower()})
             return True
-        print(f"❌ Error adding to favorites: {e}")
+        logger.exception("Error adding to favorites")
         return False
 
 
@@ -200,14 +454,14 @@ def remove_from_favorites(user_email, medicine_name):
         })
         
         if result.deleted_count > 0:
-            print(f"✅ Removed {medicine_name} from favorites for {user_email}")
+            logger.info("Favorite removed", extra={'medicine': medicine_name.lower(), **SAMPLED})
             return True
         else:
-            print(f"ℹ️ {medicine_name} not in favorites for {user_email}")
+            logger.debug("Favorite not present", extra={'medicine': medicine_name.lower()})
             return False
     
-    except Exception as e:
-        print(f"❌ Error removing from favorites: {e}")
+    except Exception:
+        logger.exception("Error removing from favorites")
         return False
 
 
@@ -219,21 +473,38 @@ def get_user_favorites(user_email):
         user_email (str): User's email
     
     Returns:
-        list: List of favorite medicines
+        list: Favorite records, newest first
     """
     try:
-        favorites = list(user_favorites_collection.find(
-            {'user_email': user_email}
-        ).sort('added_at', DESCENDING))
-        
-        # Convert ObjectId to string
-        for item in favorites:
-            item['_id'] = str(item['_id'])
-        
-        return favorites
+        cursor = user_favorites_collection.find(
+            {'user_email': user_email}, Favorite.PROJECTION
+        ).sort('added_at', DESCENDING)
+        return [Favorite.from_doc(doc) for doc in cursor]
     
-    except Exception as e:
-        print(f"❌ Error getting favorites: {e}")
+    except Exception:
+        logger.exception("Error getting favorites")
+        return []
+
+
+def get_favorite_names(user_email, limit=5):
+    """
+    Compact favorites list for the homepage (newest first, no _id).
+    
+    Args:
+        user_email (str): User's email
+        limit (int): Maximum number of results to return
+    
+    Returns:
+        list: [{'medicine_name': str}, ...]
+    """
+    try:
+        return list(user_favorites_collection.find(
+            {'user_email': user_email},
+            {'_id': 0, 'medicine_name': 1}
+        ).sort('added_at', DESCENDING).limit(limit))
+    
+    except Exception:
+        logger.exception("Error getting favorites")
         return []
 
 
@@ -255,8 +526,8 @@ def is_favorite(user_email, medicine_name):
         })
         return count > 0
     
-    except Exception as e:
-        print(f"❌ Error checking favorite: {e}")
+    except Exception:
+        logger.exception("Error checking favorite")
         return False
 
 
@@ -280,7 +551,7 @@ def add_review(user_email, medicine_name, rating, review_text):
     try:
         # Validate rating
         if not isinstance(rating, int) or rating < 1 or rating > 5:
-            print(f"❌ Invalid rating: {rating}. Must be 1-5")
+            logger.warning("Invalid rating %r, must be 1-5", rating)
             return None
         
         review_entry = {
@@ -293,11 +564,12 @@ def add_review(user_email, medicine_name, rating, review_text):
         }
         
         result = user_reviews_collection.insert_one(review_entry)
-        print(f"✅ Added review for {medicine_name} by {user_email}")
+        _invalidate_rating(medicine_name)
+        logger.info("Review added", extra={'medicine': medicine_name.lower()})
         return result.inserted_id
     
-    except Exception as e:
-        print(f"❌ Error adding review: {e}")
+    except Exception:
+        logger.exception("Error adding review")
         return None
 
 
@@ -318,52 +590,62 @@ def update_review(review_id, rating=None, review_text=None):
         
         if rating is not None:
             if not isinstance(rating, int) or rating < 1 or rating > 5:
-                print(f"❌ Invalid rating: {rating}")
+                logger.warning("Invalid rating %r", rating)
                 return False
             update_data['rating'] = rating
         
         if review_text is not None:
             update_data['review_text'] = review_text
         
-        result = user_reviews_collection.update_one(
+        review = user_reviews_collection.find_one_and_update(
             {'_id': ObjectId(review_id)},
-            {'$set': update_data}
+            {'$set': update_data},
+            projection={'medicine_name': 1}
         )
         
-        if result.modified_count > 0:
-            print(f"✅ Updated review {review_id}")
+        if review:
+            _invalidate_rating(review['medicine_name'])
+            logger.info("Review updated", extra={'review_id': review_id})
             return True
         else:
-            print(f"ℹ️ No changes made to review {review_id}")
+            logger.debug("Review not found for update", extra={'review_id': review_id})
             return False
     
-    except Exception as e:
-        print(f"❌ Error updating review: {e}")
+    except Exception:
+        logger.exception("Error updating review")
         return False
 
 
-def delete_review(review_id):
+def delete_review(review_id, user_email=None):
     """
     Delete a review.
     
     Args:
         review_id (str): Review ID
+        user_email (str): Only delete it if this user wrote it
     
     Returns:
         bool: True if deleted, False otherwise
     """
     try:
-        result = user_reviews_collection.delete_one({'_id': ObjectId(review_id)})
+        query = {'_id': ObjectId(review_id)}
+        if user_email is not None:
+            query['user_email'] = user_email
+        review = user_reviews_collection.find_one_and_delete(
+            query,
+            projection={'medicine_name': 1}
+        )
         
-        if result.deleted_count > 0:
-            print(f"✅ Deleted review {review_id}")
+        if review:
+            _invalidate_rating(review['medicine_name'])
+            logger.info("Review deleted", extra={'review_id': review_id})
             return True
         else:
-            print(f"ℹ️ Review {review_id} not found")
+            logger.debug("Review not found for delete", extra={'review_id': review_id})
             return False
     
-    except Exception as e:
-        print(f"❌ Error deleting review: {e}")
+    except Exception:
+        logger.exception("Error deleting review")
         return False
 
 
@@ -375,21 +657,16 @@ def get_medicine_reviews(medicine_name):
         medicine_name (str): Medicine name
     
     Returns:
-        list: List of reviews
+        list: Review records, newest first
     """
     try:
-        reviews = list(user_reviews_collection.find(
-            {'medicine_name': medicine_name.lower()}
-        ).sort('created_at', DESCENDING))
-        
-        # Convert ObjectId to string
-        for review in reviews:
-            review['_id'] = str(review['_id'])
-        
-        return reviews
+        cursor = user_reviews_collection.find(
+            {'medicine_name': medicine_name.lower()}, Review.PROJECTION
+        ).sort('created_at', DESCENDING)
+        return [Review.from_doc(doc) for doc in cursor]
     
-    except Exception as e:
-        print(f"❌ Error getting reviews: {e}")
+    except Exception:
+        logger.exception("Error getting reviews")
         return []
 
 
@@ -401,27 +678,28 @@ def get_user_reviews(user_email):
         user_email (str): User's email
     
     Returns:
-        list: List of user's reviews
+        list: Review records, newest first
     """
     try:
-        reviews = list(user_reviews_collection.find(
-            {'user_email': user_email}
-        ).sort('created_at', DESCENDING))
-        
-        # Convert ObjectId to string
-        for review in reviews:
-            review['_id'] = str(review['_id'])
-        
-        return reviews
+        cursor = user_reviews_collection.find(
+            {'user_email': user_email}, Review.PROJECTION
+        ).sort('created_at', DESCENDING)
+        return [Review.from_doc(doc) for doc in cursor]
     
-    except Exception as e:
-        print(f"❌ Error getting user reviews: {e}")
+    except Exception:
+        logger.exception("Error getting user reviews")
         return []
 
 
+def _invalidate_rating(medicine_name):
+    """Drop the cached page and average rating after a review change"""
+    page_cache.invalidate(medicine_name)
+    get_cache().delete(f'rating:{medicine_name.lower()}')
+
+
 def get_medicine_average_rating(medicine_name):
     """
-    Calculate average rating for a medicine.
+    Calculate average rating for a medicine (cached, see RATING_CACHE_TTL).
     
     Args:
         medicine_name (str): Medicine name
@@ -430,25 +708,78 @@ def get_medicine_average_rating(medicine_name):
         dict: {'average': float, 'count': int} or None if no reviews
     """
     try:
-        pipeline = [
-            {'$match': {'medicine_name': medicine_name.lower()}},
-            {'$group': {
-                '_id': None,
-                'average_rating': {'$avg': '$rating'},
-                'review_count': {'$sum': 1}
-            }}
-        ]
-        
-        result = list(user_reviews_collection.aggregate(pipeline))
-        
-        if result:
-            return {
-                'average': round(result[0]['average_rating'], 1),
-                'count': result[0]['review_count']
-            }
-        else:
-            return None
+        cache = get_cache()
+        return cache.get_or_set(
+            f'rating:{medicine_name.lower()}',
+            lambda: _compute_average_rating(medicine_name),
+            cache.bounded_ttl(RATING_CACHE_TTL)
+        )
+    except Exception:
+        logger.exception("Error calculating average rating")
+        return None
+
+
+def get_average_ratings(medicine_names):
+    """
+    Average ratings for several medicines: cached ones from the cache, the
+    rest from one $in aggregation (and cached for next time)
     
-    except Exception as e:
-        print(f"❌ Error calculating average rating: {e}")
-        return None
\ No newline at end of file
+    Args:
+        medicine_names (list): Medicine names
+    
+    Returns:
+        dict: lower-case name -> {'average': float, 'count': int} or None
+    """
+    names = list(dict.fromkeys(name.lower() for name in medicine_names))
+    if not names:
+        return {}
+    try:
+        cache = get_cache()
+        cached = cache.get_many([f'rating:{name}' for name in names])
+        ratings = {name: cached[f'rating:{name}'] for name in names if f'rating:{name}' in cached}
+        
+        missing = [name for name in names if name not in ratings]
+        if missing:
+            computed = dict.fromkeys(missing)
+            pipeline = [
+                {'$match': {'medicine_name': {'$in': missing}}},
+                {'$group': {
+                    '_id': '$medicine_name',
+                    'average_rating': {'$avg': '$rating'},
+                    'review_count': {'$sum': 1}
+                }}
+            ]
+            for row in user_reviews_collection.aggregate(pipeline):
+                computed[row['_id']] = {
+                    'average': round(row['average_rating'], 1),
+                    'count': row['review_count']
+                }
+            cache.set_many({f'rating:{name}': value for name, value in computed.items()},
+                           cache.bounded_ttl(RATING_CACHE_TTL))
+            ratings.update(computed)
+        return ratings
+    
+    except Exception:
+        logger.exception("Error calculating average ratings")
+        return {}
+
+
+def _compute_average_rating(medicine_name):
+    """Average rating straight from MongoDB"""
+    pipeline = [
+        {'$match': {'medicine_name': medicine_name.lower()}},
+        {'$group': {
+            '_id': None,
+            'average_rating': {'$avg': '$rating'},
+            'review_count': {'$sum': 1}
+        }}
+    ]
+    
+    result = list(user_reviews_collection.aggregate(pipeline))
+    
+    if result:
+        return {
+            'average': round(result[0]['average_rating'], 1),
+            'count': result[0]['review_count']
+        }
+    return None
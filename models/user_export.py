@@ -0,0 +1,225 @@
+"""
+User Data Export - Everything we hold about one user
+File: models/user_export.py
+
+Collects a user's documents from every collection that stores them and
+streams them out as one JSON document or a ZIP with one NDJSON file per
+collection. Documents are read through server-side cursors and encoded one
+at a time, so memory per export stays at about one cursor batch whatever
+the user's history size.
+
+Password hashes are never exported.
+"""
+
+from bson import json_util
+from bson.json_util import RELAXED_JSON_OPTIONS
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+import json
+import logging
+import os
+import re
+import zipfile
+
+from models import user_collections
+from models.user_model import DB
+
+logger = logging.getLogger(__name__)
+
+# Documents per cursor round trip
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '500'))
+
+# Sections of an export: (name, database, collection, field holding the
+# email, fields left out). 'users' is the MedInfo database behind DB(),
+# 'app' the one behind user_collections.
+EXPORT_SOURCES = [
+    ('profile', 'users', 'User_info', 'email', ()),
+    ('login', 'users', 'Login_info', 'email', ('password',)),
+    ('saved_medications', 'users', 'Saved_meds', 'email', ()),
+    ('scheduled_medications', 'users', 'Scheduled_meds', 'email', ()),
+    ('search_history', 'app', 'search_history', 'user_email', ()),
+    ('recent_history', 'app', 'user_recent_history', '_id', ()),
+    ('favorites', 'app', 'user_favorites', 'user_email', ()),
+    ('reviews', 'app', 'user_reviews', 'user_email', ()),
+]
+
+
+def _encode(document):
+    return json_util.dumps(document, json_options=RELAXED_JSON_OPTIONS)
+
+
+def iter_user_documents(email, users_db):
+    """
+    Yield (section, cursor) for every export section
+
+    Args:
+        email (str): User's email (already normalised)
+        users_db: The MedInfo database from DB()
+    """
+    databases = {'users': users_db, 'app': user_collections.db}
+    for section, database, collection, field, excluded in EXPORT_SOURCES:
+        projection = {name: 0 for name in excluded} or None
+        cursor = databases[database][collection].find(
+            {field: email}, projection, batch_size=EXPORT_BATCH_SIZE
+        )
+        yield section, cursor
+
+
+class _UsersDatabase:
+    """
+    The MedInfo database behind DB(), opened for one export (or a whole
+    bulk run when one is passed in)
+    """
+
+    def __init__(self, users_db=None):
+        self.wrapper = None if users_db is not None else DB()
+        self.db = users_db if users_db is not None else self.wrapper.client['MedInfo']
+
+    def __enter__(self):
+        return self.db
+
+    def __exit__(self, *exc):
+        if self.wrapper is not None:
+            self.wrapper.close()
+
+
+def stream_json(email, users_db=None):
+    """
+    Generate a user's export as chunks of one JSON document
+
+        {"email": ..., "exported_at": ..., "collections": {"profile": [...], ...}}
+    """
+    email = email.strip().lower()
+    with _UsersDatabase(users_db) as users_db:
+        yield '{"email": %s, "exported_at": %s, "collections": {' % (
+            json.dumps(email), json.dumps(datetime.utcnow().isoformat() + 'Z'))
+        for index, (section, cursor) in enumerate(iter_user_documents(email, users_db)):
+            yield ('' if index == 0 else ', ') + json.dumps(section) + ': ['
+            for count, document in enumerate(cursor):
+                yield (', ' if count else '') + _encode(document)
+            yield ']'
+        yield '}}\n'
+
+
+class _ChunkBuffer:
+    """Write-only file object that zipfile writes into and we drain"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def stream_zip(email, users_db=None):
+    """
+    Generate a user's export as ZIP bytes: <section>.ndjson per collection
+    plus a small export.json manifest
+    """
+    email = email.strip().lower()
+    buffer = _ChunkBuffer()
+    counts = {}
+    with _UsersDatabase(users_db) as users_db:
+        # An unseekable target makes zipfile stream entries with data descriptors
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for section, cursor in iter_user_documents(email, users_db):
+                counts[section] = 0
+                with archive.open(f'{section}.ndjson', 'w') as entry:
+                    for document in cursor:
+                        entry.write(_encode(document).encode('utf-8') + b'\n')
+                        counts[section] += 1
+                        if buffer.chunks:
+                            yield buffer.drain()
+                yield buffer.drain()
+            archive.writestr('export.json', json.dumps({
+                'email': email,
+                'exported_at': datetime.utcnow().isoformat() + 'Z',
+                'counts': counts,
+            }, indent=2))
+        yield buffer.drain()
+
+
+STREAMS = {'json': stream_json, 'zip': stream_zip}
+
+
+def write_user_export(email, out_dir, export_format='zip', users_db=None):
+    """
+    Write one user's export to <out_dir>/<email>.<format>
+
+    Returns:
+        str: Path of the file written
+    """
+    filename = re.sub(r'[^A-Za-z0-9@._+-]', '_', email.strip().lower())
+    path = os.path.join(out_dir, f'{filename}.{export_format}')
+    mode = 'wb' if export_format == 'zip' else 'w'
+    encoding = None if export_format == 'zip' else 'utf-8'
+    with open(path, mode, encoding=encoding) as f:
+        for chunk in STREAMS[export_format](email, users_db):
+            f.write(chunk)
+    return path
+
+
+def iter_all_emails():
+    """Stream every user's email from User_info"""
+    with _UsersDatabase() as users_db:
+        for user in users_db['User_info'].find({}, {'email': 1, '_id': 0}, batch_size=EXPORT_BATCH_SIZE):
+            if user.get('email'):
+                yield user['email']
+
+
+def export_users(emails, out_dir, export_format='zip', workers=4, progress=None):
+    """
+    Export many users in parallel, one file each
+
+    At most workers * 2 exports are queued at a time, so the email source
+    is consumed lazily and memory stays bounded however many users there are.
+
+    Args:
+        emails (iterable): User emails
+        out_dir (str): Directory for the files (created if missing)
+        export_format (str): 'zip' or 'json'
+        workers (int): Exports running at once
+        progress (callable): Called with (email, path or None) per user
+
+    Returns:
+        dict: {'exported': int, 'failed': int}
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    result = {'exported': 0, 'failed': 0}
+    pending = {}
+
+    def collect(done):
+        for future in done:
+            email = pending.pop(future)
+            try:
+                path = future.result()
+                result['exported'] += 1
+            except Exception:
+                logger.exception("Error exporting user data")
+                path = None
+                result['failed'] += 1
+            if progress:
+                progress(email, path)
+
+    # One client (and connection pool) shared by all the workers
+    with _UsersDatabase() as users_db, \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix='user-export') as executor:
+        for email in emails:
+            if len(pending) >= workers * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            future = executor.submit(write_user_export, email, out_dir, export_format, users_db)
+            pending[future] = email
+        collect(wait(pending).done)
+
+    logger.info("Exported user data", extra={'out_dir': out_dir, **result})
+    return result
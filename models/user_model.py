@@ -2,6 +2,11 @@ from pymongo import MongoClient
 from dotenv import load_dotenv
 import hashlib
 import os
+import threading
+import uuid
+
+from models import interactions
+from models.records import SavedMed, ScheduledMed, UserProfile
 
 load_dotenv()
 
@@ -19,10 +24,29 @@ class UserModel:
     def get_user_by_email(self, email):
         return self.collection.find_one({"email": email.strip().lower()})
 
+    def get_profile(self, email):
+        """Profile fields only, as a UserProfile (None if there is no profile)"""
+        doc = self.collection.find_one({"email": email.strip().lower()}, UserProfile.PROJECTION)
+        return UserProfile.from_doc(doc) if doc else None
+
     def update_user(self, email, update_data):
         email = email.strip().lower()
+        if "medications" in update_data:
+            update_data = dict(update_data, medications_version=uuid.uuid4().hex)
         return self.collection.update_one({"email": email}, {"$set": update_data})
 
+    def bump_medications_version(self, email):
+        """Mark the user's medications as changed (cached interactions key on this)"""
+        return self.collection.update_one(
+            {"email": email.strip().lower()},
+            {"$set": {"medications_version": uuid.uuid4().hex}}
+        )
+
+    def get_medications_version(self, email):
+        """Current medications_version; '0' before the first change, None without a profile"""
+        doc = self.collection.find_one({"email": email.strip().lower()}, {"_id": 0, "medications_version": 1})
+        return None if doc is None else doc.get("medications_version", "0")
+
 
 # ------------------------
 # LOGIN MODEL
@@ -59,17 +83,30 @@ class LoginModel:
 # SAVED MEDICATION MODEL
 # ------------------------
 class SavedMedsModel:
-    def __init__(self, collection):
+    def __init__(self, collection, users=None):
         self.collection = collection
+        self.users = users  # UserModel whose medications_version is bumped on save
 
     def save_medication(self, email, medication):
         email = email.strip().lower()
         entry = {"email": email, "medication": medication}
-        return self.collection.insert_one(entry).inserted_id
+        inserted_id = self.collection.insert_one(entry).inserted_id
+        if self.users is not None:
+            self.users.bump_medications_version(email)
+        return inserted_id
+
+    def has_medication(self, email, medication):
+        """Check if a medication is already saved for a user"""
+        email = email.strip().lower()
+        return self.collection.count_documents(
+            {"email": email, "medication": medication}, limit=1
+        ) > 0
+
     def get_meds_by_email(self, email):
-        """Fetch all saved medicines for a given user email"""
+        """Fetch all saved medicines for a given user email, as SavedMed records"""
         email = email.strip().lower()
-        return list(self.collection.find({"email": email}))
+        cursor = self.collection.find({"email": email}, SavedMed.PROJECTION)
+        return [SavedMed.from_doc(doc) for doc in cursor]
 
 
 # ------------------------
@@ -89,8 +126,10 @@ class ScheduledMedsModel:
         return self.collection.insert_one(entry).inserted_id
 
     def get_schedule_by_email(self, email):
+        """Fetch a user's medicine schedule, as ScheduledMed records"""
         email = email.strip().lower()
-        return list(self.collection.find({"email": email}))
+        cursor = self.collection.find({"email": email}, ScheduledMed.PROJECTION)
+        return [ScheduledMed.from_doc(doc) for doc in cursor]
 
 
 # ------------------------
@@ -107,7 +146,7 @@ class DB:
 
         self.users = UserModel(db["User_info"])
         self.logins = LoginModel(db["Login_info"])
-        self.saved_meds = SavedMedsModel(db["Saved_meds"])
+        self.saved_meds = SavedMedsModel(db["Saved_meds"], self.users)
         self.scheduled_meds = ScheduledMedsModel(db["Scheduled_meds"])
 
     def authenticate_user(self, email, password):
@@ -116,5 +155,32 @@ class DB:
     def get_user_by_email(self, email):
         return self.users.get_user_by_email(email)
 
+    def get_medication_names(self, email):
+        """Every medication a user listed: profile field plus Saved_meds"""
+        email = email.strip().lower()
+        profile = self.users.collection.find_one({"email": email}, {"_id": 0, "medications": 1}) or {}
+        names = [m.strip() for m in (profile.get("medications") or "").split(",") if m.strip()]
+        names.extend(med.medication for med in self.saved_meds.get_meds_by_email(email))
+        return names
+
+    def get_user_interactions(self, email):
+        """A user's medications and the interactions between them (see models/interactions.py)"""
+        return interactions.get_user_interactions(
+            email, self.get_medication_names, self.users.get_medications_version(email))
+
     def close(self):
-        self.client.close()
\ No newline at end of file
+        self.client.close()
+
+
+_shared_db = None
+_shared_db_lock = threading.Lock()
+
+
+def get_shared_db():
+    """One DB kept open for the process, for reads on hot routes (don't close() it)"""
+    global _shared_db
+    if _shared_db is None:
+        with _shared_db_lock:
+            if _shared_db is None:
+                _shared_db = DB()
+    return _shared_db
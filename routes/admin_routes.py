@@ -0,0 +1,34 @@
+"""
+Admin Routes - Operational Reports
+File: routes/admin_routes.py
+"""
+
+from flask import Blueprint, jsonify, request, session
+from utils.slow_queries import slow_query_report, SLOW_QUERY_MS, SLOW_QUERY_EXPLAIN_SAMPLE
+import os
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+# Comma separated list of emails allowed to see admin pages
+ADMIN_EMAILS = {
+    email.strip().lower()
+    for email in os.getenv('ADMIN_EMAILS', '').split(',')
+    if email.strip()
+}
+
+
+@admin_bp.before_request
+def require_admin():
+    if session.get('email', '').lower() not in ADMIN_EMAILS:
+        return jsonify({'error': 'Admin access required'}), 403
+
+
+@admin_bp.route('/slow-queries')
+def slow_queries():
+    """Slow MongoDB commands grouped by collection, route and query shape"""
+    limit = min(request.args.get('limit', 50, type=int), 500)
+    return jsonify({
+        'threshold_ms': SLOW_QUERY_MS,
+        'explain_sample_rate': SLOW_QUERY_EXPLAIN_SAMPLE,
+        'queries': slow_query_report(limit)
+    })
@@ -0,0 +1,250 @@
+"""
+API v1 Routes - Bearer-token JSON API for mobile and other non-browser clients
+File: routes/api_v1.py
+
+Get a token with POST /api/v1/auth/token {"email": ..., "password": ...} and
+send it as "Authorization: Bearer <token>" on every other call. Tokens last
+JWT_EXPIRATION_HOURS and can be revoked early with POST /api/v1/auth/revoke.
+No session cookie is needed.
+"""
+
+from flask import Blueprint, g, jsonify, request
+from functools import wraps
+import logging
+
+from models.records import ScheduledMed
+from models.user_collections import (
+    add_to_favorites,
+    remove_from_favorites,
+    get_user_favorites,
+    add_review,
+    delete_review,
+    get_user_reviews,
+    get_medicine_reviews,
+    get_medicine_average_rating,
+)
+from models.user_model import DB
+from routes.medicine_routes import medicine_model
+from utils import rate_limit, security
+
+logger = logging.getLogger(__name__)
+
+api_v1_bp = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+
+def _error(message, status):
+    response = jsonify({'success': False, 'message': message})
+    response.status_code = status
+    if status == 401:
+        response.headers['WWW-Authenticate'] = 'Bearer'
+    return response
+
+
+def _body():
+    """JSON body, falling back to form fields"""
+    return request.get_json(silent=True) or request.form
+
+
+def _public_review(review):
+    """A review as other users may see it: the reviewer's email is cut to its local part"""
+    return {
+        'id': review.id,
+        'reviewer': review.user_email.split('@')[0],
+        'medicine_name': review.medicine_name,
+        'rating': review.rating,
+        'review_text': review.review_text,
+        'created_at': review.created_at
+    }
+
+
+def token_required(view):
+    """Decorator: check the bearer token and put its payload/email on g"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not token:
+            return _error('Bearer token required', 401)
+        payload = security.verify_token(token.strip())
+        if not payload or not payload.get('email'):
+            return _error('Invalid or expired token', 401)
+        g.api_token = payload
+        g.api_email = payload['email']
+        return view(*args, **kwargs)
+    return wrapper
+
+# ============================================
+# AUTH
+# ============================================
+
+@api_v1_bp.route('/auth/token', methods=['POST'])
+@rate_limit.rate_limited('login')
+def issue_token():
+    """Exchange email and password for a bearer token"""
+    body = _body()
+    email = (body.get('email') or '').strip().lower()
+    password = body.get('password') or ''
+    if not email or not password:
+        return _error('Email and password required', 400)
+
+    db = DB()
+    user = db.logins.authenticate(email, password)
+    db.close()
+    if not user:
+        return _error('Invalid email or password', 401)
+
+    logger.info("API token issued")
+    return jsonify({
+        'success': True,
+        'token': security.generate_token(user['email']),
+        'token_type': 'Bearer',
+        'expires_in': security.JWT_EXPIRATION_HOURS * 3600
+    })
+
+
+@api_v1_bp.route('/auth/revoke', methods=['POST'])
+@token_required
+def revoke_token():
+    """Revoke the token used for this call"""
+    security.revoke_token(g.api_token)
+    return jsonify({'success': True})
+
+# ============================================
+# MEDICINES
+# ============================================
+
+@api_v1_bp.route('/medicines')
+@token_required
+def get_medicines():
+    """Several stored medicines at once: ?names=aspirin,ibuprofen"""
+    names = [name for name in request.args.get('names', '').split(',') if name.strip()]
+    if not names:
+        return _error('names required', 400)
+    try:
+        medicines, missing = medicine_model.get_many(names)
+    except ValueError as e:
+        return _error(str(e), 400)
+    return jsonify({'success': True, 'medicines': medicines, 'missing': missing})
+
+
+@api_v1_bp.route('/medicines/<name>')
+@token_required
+def get_medicine(name):
+    """A stored medicine (no AI generation through the API)"""
+    medicine = medicine_model.get_medicine_by_key(name)
+    if not medicine:
+        return _error('Medicine not found', 404)
+    medicine.pop('refresh_claimed_until', None)
+    return jsonify({'success': True, 'medicine': medicine})
+
+
+@api_v1_bp.route('/medicines/<name>/reviews')
+@token_required
+def get_medicine_reviews_api(name):
+    name = name.replace('-', ' ').strip()
+    return jsonify({
+        'success': True,
+        'reviews': [_public_review(review) for review in get_medicine_reviews(name)],
+        'rating': get_medicine_average_rating(name)
+    })
+
+# ============================================
+# FAVORITES
+# ============================================
+
+@api_v1_bp.route('/favorites')
+@token_required
+def list_favorites():
+    return jsonify({'success': True, 'favorites': get_user_favorites(g.api_email)})
+
+
+@api_v1_bp.route('/favorites', methods=['POST'])
+@token_required
+def add_favorite():
+    medicine_name = (_body().get('medicine_name') or '').strip()
+    if not medicine_name:
+        return _error('Medicine name required', 400)
+    if not add_to_favorites(g.api_email, medicine_name):
+        return _error('Failed to add to favorites', 500)
+    return jsonify({'success': True}), 201
+
+
+@api_v1_bp.route('/favorites/<name>', methods=['DELETE'])
+@token_required
+def remove_favorite(name):
+    if not remove_from_favorites(g.api_email, name):
+        return _error('Favorite not found', 404)
+    return jsonify({'success': True})
+
+# ============================================
+# REVIEWS
+# ============================================
+
+@api_v1_bp.route('/reviews')
+@token_required
+def list_reviews():
+    """Reviews written by the token's user"""
+    return jsonify({'success': True, 'reviews': get_user_reviews(g.api_email)})
+
+
+@api_v1_bp.route('/reviews', methods=['POST'])
+@token_required
+@rate_limit.rate_limited('review')
+def create_review():
+    body = _body()
+    medicine_name = (body.get('medicine_name') or '').strip()
+    review_text = (body.get('review_text') or '').strip()
+    try:
+        rating = int(body.get('rating'))
+    except (TypeError, ValueError):
+        rating = None
+
+    if not medicine_name or rating is None:
+        return _error('Medicine name and rating required', 400)
+    if rating < 1 or rating > 5:
+        return _error('Rating must be between 1 and 5', 400)
+    if not review_text:
+        return _error('Please write a review', 400)
+
+    review_id = add_review(g.api_email, medicine_name, rating, review_text)
+    if not review_id:
+        return _error('Failed to add review', 500)
+    return jsonify({'success': True, 'review_id': review_id}), 201
+
+
+@api_v1_bp.route('/reviews/<review_id>', methods=['DELETE'])
+@token_required
+def remove_review(review_id):
+    """Delete one of the token user's own reviews"""
+    if not delete_review(review_id, user_email=g.api_email):
+        return _error('Review not found', 404)
+    return jsonify({'success': True})
+
+# ============================================
+# SCHEDULES
+# ============================================
+
+@api_v1_bp.route('/schedules')
+@token_required
+def list_schedules():
+    db = DB()
+    schedule = db.scheduled_meds.get_schedule_by_email(g.api_email)
+    db.close()
+    return jsonify({'success': True, 'schedule': schedule})
+
+
+@api_v1_bp.route('/schedules', methods=['POST'])
+@token_required
+def create_schedule():
+    body = _body()
+    medication = (body.get('medication') or '').strip()
+    schedule_time = (body.get('schedule_time') or '').strip()  # ISO string, as from the form
+    if not medication or not schedule_time:
+        return _error('Medication name and time are required', 400)
+
+    db = DB()
+    db.scheduled_meds.schedule_medication(g.api_email, medication, schedule_time)
+    db.close()
+    return jsonify({
+        'success': True,
+        'schedule': ScheduledMed(medication=medication, schedule_time=schedule_time)
+    }), 201
@@ -5,7 +5,12 @@ File: routes/auth_routes.py
 
 from flask import Blueprint, render_template, request, jsonify, redirect, session, url_for
 from models.user_model import DB, LoginModel
-from utils.helpers import validate_reset_token, invalidate_reset_token, update_user_password
+from utils.helpers import validate_reset_token, consume_reset_token
+from utils import rate_limit
+from utils.session_store import rotate_session
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Create Blueprint
 auth_bp = Blueprint('auth', __name__)
@@ -64,6 +69,7 @@ def signup_submit():
     user_model.create_user(user_doc)
 
     db.close()
+    rotate_session(session)
     session['user_id'] = email
     session['email'] = email
     session['fullname'] = fullname
@@ -99,6 +105,13 @@ def login_submit():
     if errors:
         return render_template('login.html', errors=errors, email=email)
 
+    # Checking a password is deliberately slow, so cap attempts per client
+    retry_after = rate_limit.check('login')
+    if retry_after:
+        errors.append('Too many login attempts. Please try again later.')
+        return (render_template('login.html', errors=errors, email=email),
+                429, {'Retry-After': str(retry_after)})
+
     # Use MongoDB
     db = DB()
     login_model = db.logins
@@ -109,14 +122,15 @@ def login_submit():
         errors.append("Invalid email or password")
         return render_template('login.html', errors=errors, email=email)
 
-    # Login successful → store in session
+    # Login successful → new session ID, then store in session
+    rotate_session(session)
     session['user_id'] = str(user["_id"])
     session['username'] = user.get('fullname', '')
     session['email'] = user['email']
 
     if remember:
         session.permanent = True
-    print(f"User logged in: {email}")
+    logger.info("User logged in")
 
     return redirect('/')
 @auth_bp.route('/logout', methods=['POST'])
@@ -126,7 +140,7 @@ def logout():
         return jsonify({'success': False, 'error': 'Not logged in'}), 401
     
     session.clear()
-    print("User logged out")
+    logger.info("User logged out")
     return redirect('/')
 
 @auth_bp.route('/api/auth/status', methods=['GET'])
@@ -182,10 +196,6 @@ def reset_password_submit(token):
     
     
     errors = []
-    email = validate_reset_token(token)
-    if not email:
-        return jsonify({'success': False, 'error': 'Invalid or expired token'}), 400
-    
     new_password = request.form.get('new_password', '').strip()
     confirm_password = request.form.get('confirm_password', '').strip()
 
@@ -195,12 +205,16 @@ def reset_password_submit(token):
         errors.append("Passwords do not match")
     
     if errors:
-        # render the same page with errors
+        # render the same page with errors (the token stays usable)
         return render_template('set_new_password.html', token=token, errors=errors)
 
+    # Check and use up the token in one step, so a link only ever works once
+    email = consume_reset_token(token)
+    if not email:
+        return jsonify({'success': False, 'error': 'Invalid or expired token'}), 400
+
     # update password
     update_user_password(email, new_password)
-    invalidate_reset_token(token)
 
     # redirect to login page
     return redirect(url_for('auth.login_page'))
\ No newline at end of file
@@ -15,18 +15,10 @@ def calendar_page():
     db = DB()
     scheduled_meds_model = db.scheduled_meds
     
-    # Fetch schedule for this user by email
-    raw_schedule = scheduled_meds_model.get_schedule_by_email(email)
+    # Fetch schedule for this user by email (ScheduledMed records, tojson-ready)
+    schedule = scheduled_meds_model.get_schedule_by_email(email)
     db.close()
     
-    # Convert to plain dicts for JS
-    schedule = []
-    for med in raw_schedule:
-        schedule.append({
-            "medication": med.get("medication", ""),
-            "schedule_time": med.get("schedule_time", "")
-        })
-    
     return render_template('calendar.html', schedule=schedule)
 
 @calendar_bp.route('/schedule/add', methods=['GET', 'POST'])
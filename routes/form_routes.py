@@ -14,7 +14,7 @@ def form_page():
 
     db = DB()
     user_model = db.users
-    user = user_model.get_user_by_email(session['email'])
+    user = user_model.get_profile(session['email'])
     db.close()
 
     return render_template('form.html', user=user)
@@ -0,0 +1,55 @@
+"""
+Health Routes - Liveness and Readiness Checks
+File: routes/health_routes.py
+"""
+
+from flask import Blueprint, jsonify
+from models.database import client
+from utils.ai_service import lm_pool
+import os
+import time
+
+health_bp = Blueprint('health', __name__)
+
+# Fail readiness when LM Studio is down (otherwise it is only reported)
+READYZ_REQUIRE_LM = os.getenv('READYZ_REQUIRE_LM', '0') == '1'
+
+
+def _timed(check):
+    """Run a check and return (ok, latency in ms)"""
+    start = time.perf_counter()
+    try:
+        ok = bool(check())
+    except Exception:
+        ok = False
+    return ok, round((time.perf_counter() - start) * 1000, 1)
+
+
+@health_bp.route('/healthz')
+def healthz():
+    """Liveness: the worker is up and answering requests"""
+    return jsonify({'status': 'ok'})
+
+
+@health_bp.route('/readyz')
+def readyz():
+    """Readiness: MongoDB (and optionally at least one LM backend) are reachable"""
+    mongo_ok, mongo_ms = _timed(lambda: client.admin.command('ping'))
+
+    # Probing also ejects/reinstates backends in this worker's pool
+    lm_pool.probe_all()
+    lm_ok = lm_pool.any_healthy()
+
+    ready = mongo_ok and (lm_ok or not READYZ_REQUIRE_LM)
+
+    return jsonify({
+        'status': 'ready' if ready else 'unavailable',
+        'checks': {
+            'mongodb': {'ok': mongo_ok, 'latency_ms': mongo_ms},
+            'lm_studio': {
+                'ok': lm_ok,
+                'required': READYZ_REQUIRE_LM,
+                'backends': lm_pool.status()
+            }
+        }
+    }), 200 if ready else 503
@@ -4,14 +4,21 @@ File: routes/medicine_routes.py
 """
 
 from flask import Blueprint, render_template, request, jsonify, redirect, session
-from models.medicine_model import MedicineModel
+from models import interactions
+from models.medicine_model import get_shared_medicine_model
+from models.user_model import DB, get_shared_db
 from utils.helpers import get_current_user
 from utils.ai_service import generate_medicine_info
+from utils import ai_refresh, metrics, page_cache, rate_limit
+from concurrent.futures import ThreadPoolExecutor
+from pymongo.errors import DuplicateKeyError
+import logging
 import threading
 
 # ✅ NEW: Import user collections functions
 from models.user_collections import (
     add_to_search_history, 
+    record_medicine_view,
     get_user_search_history,
     add_to_favorites,
     remove_from_favorites,
@@ -20,26 +27,86 @@ from models.user_collections import (
     add_review,
     get_medicine_reviews,
     get_medicine_average_rating,
-    delete_review
+    delete_review,
+    get_recent_searches,
+    get_favorite_names,
+    get_trending_medicines
 )
 
 medicine_bp = Blueprint('medicine', __name__)
 
+logger = logging.getLogger(__name__)
+
 # Initialize MongoDB model
-medicine_model = MedicineModel()
+medicine_model = get_shared_medicine_model()
 
 # Track which medicines are being generated
 ai_status = {}
 
+# Runs the independent homepage queries side by side
+home_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='home')
+
 # ============================================
 # HOMEPAGE
 # ============================================
 
+def get_home_data(user_email=None):
+    """
+    Everything the homepage shows, fetched concurrently
+    
+    Args:
+        user_email (str): Logged-in user's email, or None for visitors
+        
+    Returns:
+        dict: {'history': [...], 'favorites': [...], 'trending': [...]}
+    """
+    trending = home_executor.submit(get_trending_medicines)
+    if not user_email:
+        return {'history': [], 'favorites': [], 'trending': trending.result()}
+    
+    history = home_executor.submit(get_recent_searches, user_email)
+    favorites = home_executor.submit(get_favorite_names, user_email)
+    return {
+        'history': history.result(),
+        'favorites': favorites.result(),
+        'trending': trending.result()
+    }
+
+
 @medicine_bp.route('/')
 @medicine_bp.route('/homepage')
 def homepage():
     user_info = get_current_user()
-    return render_template('homepage.html', user=user_info)
+    # Inline the data so the page needs no follow-up requests
+    home_data = get_home_data(session.get('email'))
+    return render_template('homepage.html', user=user_info, home=home_data)
+
+
+@medicine_bp.route('/api/trending')
+def trending_api():
+    """Most viewed medicines lately (time-decayed, cached)"""
+    limit = min(request.args.get('limit', 10, type=int), 50)
+    return jsonify({'success': True, 'trending': get_trending_medicines(limit)})
+
+
+@medicine_bp.route('/api/home')
+def home_api():
+    """Homepage data in one payload (history, favorites, trending)"""
+    home_data = get_home_data(session.get('email'))
+    return jsonify({'success': True, 'logged_in': 'email' in session, **home_data})
+
+
+@medicine_bp.route('/api/medicines')
+def medicines_batch_api():
+    """Several stored medicines in one call: /api/medicines?names=aspirin,ibuprofen"""
+    names = [name for name in request.args.get('names', '').split(',') if name.strip()]
+    if not names:
+        return jsonify({'success': False, 'message': 'names required'}), 400
+    try:
+        medicines, missing = medicine_model.get_many(names)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({'success': True, 'medicines': medicines, 'missing': missing})
 
 @medicine_bp.route('/search', methods=['POST'])
 def search_medicine():
@@ -63,74 +130,131 @@ def medicine_details(name):
         user_email = session.get('email')
         add_to_search_history(user_email, medicine_name)
     
+    # Anonymous visitors all see the same page, so serve it from the cache
+    is_anonymous = 'email' not in session and 'user_id' not in session
+    if is_anonymous:
+        cached_page = page_cache.get_page(medicine_name)
+        if cached_page is not None:
+            record_medicine_view(medicine_name)
+            return cached_page
+        page_version = page_cache.get_version(medicine_name)
+    
     # Check if medicine exists in MongoDB
     medicine_data = medicine_model.get_medicine_by_name(medicine_name)
     
     if medicine_data:
-        # Medicine found! Show it
+        # Medicine found! Show it (and regenerate it in the background if outdated)
+        record_medicine_view(medicine_name)
+        ai_refresh.schedule_refresh(medicine_data)
         user_info = get_current_user()
         
         # ✅ NEW: Check if medicine is in user's favorites
         is_favorited = False
+        interaction_warnings = []
         if 'email' in session:
             is_favorited = is_favorite(session.get('email'), medicine_name)
+            user_interactions = load_user_interactions(session['email'])
+            interaction_warnings = interactions.get_index().with_drug(
+                medicine_data['name'], user_interactions['medications'])
         
         # ✅ NEW: Get reviews for this medicine
         reviews = get_medicine_reviews(medicine_name)
         rating_data = get_medicine_average_rating(medicine_name)
         
-        return render_template(
+        html = render_template(
             'medicine.html', 
             medicine=medicine_data, 
             user=user_info,
             is_favorited=is_favorited,
             reviews=reviews,
+            interaction_warnings=interaction_warnings,
             average_rating=rating_data['average'] if rating_data else 0,
             review_count=rating_data['count'] if rating_data else 0
         )
+        
+        if is_anonymous:
+            page_cache.set_page(medicine_name, html, page_version)
+        
+        return html
     
     # Medicine not found - need AI to generate it
     status = ai_status.get(medicine_name, 'new')
 
     if status == 'new':
-        # First time - start AI generation
+        # First time - start AI generation, if this client and the LM
+        # servers have room for another one
+        retry_after = rate_limit.check('ai')
+        lease_id = None if retry_after else rate_limit.acquire_generation_slot()
+        if lease_id is None:
+            return loading_page(
+                name,
+                '🤖 Too many medicines are being generated right now. Trying again shortly...',
+                retry_after or rate_limit.LM_SLOT_RETRY_AFTER
+            )
+
         ai_status[medicine_name] = 'working'
-        thread = threading.Thread(target=generate_ai_info, args=(medicine_name,))
+        thread = threading.Thread(target=generate_ai_info, args=(medicine_name, lease_id))
         thread.daemon = True
         thread.start()
 
     # Show loading message
+    return loading_page(name, '🤖 AI is generating information... Please wait 1-3 minutes.')
+
+
+def load_user_interactions(email):
+    """A user's medications and their interactions (cached per medications version)"""
+    return get_shared_db().get_user_interactions(email)
+
+
+def loading_page(name, description, retry_after=None):
+    """
+    Placeholder medicine page that refreshes itself while AI works
+
+    With retry_after it is sent as a 429 (generation refused for now)
+    """
     loading_data = {
         'name': name.replace('-', ' ').title(),
-        'description': '🤖 AI is generating information... Please wait 1-3 minutes.',
+        'description': description,
         'advice': '⏳ Page will refresh automatically every 10 seconds.',
         'warning': '💡 Make sure LM Studio is running!',
         'pubmed_link': f'https://pubmed.ncbi.nlm.nih.gov/?term={name.replace("-", "+")}'
     }
 
     user_info = get_current_user()
-    return render_template('medicine.html', 
+    html = render_template('medicine.html', 
                         medicine=loading_data, 
                         user=user_info,
                         is_favorited=False,
                         reviews=[],
                         average_rating=0,
                         review_count=0)
+    if retry_after is None:
+        return html
+    return html, 429, {'Retry-After': str(retry_after)}
 
 # Background function to generate medicine info
-def generate_ai_info(medicine_name):
-    print(f"🤖 Starting AI for: {medicine_name}")
+def generate_ai_info(medicine_name, lease_id=None):
+    logger.info("Starting AI generation", extra={'medicine': medicine_name})
     
     # Call AI
-    medicine_data = generate_medicine_info(medicine_name)
+    try:
+        with metrics.AI_GENERATIONS_IN_PROGRESS.track_inprogress():
+            medicine_data = generate_medicine_info(medicine_name)
+    finally:
+        if lease_id:
+            rate_limit.release_generation_slot(lease_id)
     
     if medicine_data:
-        print(f"✅ AI done for: {medicine_name}")
+        logger.info("AI generation done", extra={'medicine': medicine_name})
         # Save to MongoDB instead of JSON
-        medicine_model.create_medicine(medicine_data)
+        try:
+            medicine_model.create_medicine(medicine_data)
+        except DuplicateKeyError:
+            # Another worker stored it first (or the LM named a medicine we have)
+            logger.info("Medicine already stored", extra={'medicine': medicine_name})
         ai_status[medicine_name] = 'done'
     else:
-        print(f"❌ AI failed for: {medicine_name}")
+        logger.warning("AI generation failed", extra={'medicine': medicine_name})
         ai_status[medicine_name] = 'failed'
 
 # ============================================
@@ -139,7 +263,7 @@ def generate_ai_info(medicine_name):
 
 @medicine_bp.route('/api/profile/add-medicine', methods=['POST'])
 def add_medicine_to_profile():
-    if 'user_id' not in session:
+    if 'email' not in session:
         return jsonify({'success': False, 'error': 'Please login first'}), 401
     
     medicine_name = request.form.get('medicine_name', '').strip().lower()
@@ -150,14 +274,16 @@ def add_medicine_to_profile():
     if not medicine_data:
         return jsonify({'success': False, 'error': 'Medicine not found'}), 404
     
-    if 'saved_medicines' not in session:
-        session['saved_medicines'] = []
+    # Saved medicines live in the Saved_meds collection, not the session
+    db = DB()
+    saved_meds_model = db.saved_meds
     
-    if medicine_name in session['saved_medicines']:
+    if saved_meds_model.has_medication(session['email'], medicine_name):
+        db.close()
         return jsonify({'success': False, 'message': 'Already saved'}), 400
     
-    session['saved_medicines'].append(medicine_name)
-    session.modified = True
+    saved_meds_model.save_medication(session['email'], medicine_name)
+    db.close()
     
     return jsonify({
         'success': True,
@@ -225,6 +351,7 @@ def get_favorites_api():
 # ============================================
 
 @medicine_bp.route('/review/add', methods=['POST'])
+@rate_limit.rate_limited('review')
 def add_medicine_review():
     """Add a review for a medicine"""
     if 'email' not in session:
@@ -3,11 +3,75 @@ Profile Routes - User Profile Page
 File: routes/profile_routes.py
 """
 
-from flask import Blueprint, render_template, request, jsonify, redirect, session
+from flask import Blueprint, Response, render_template, request, jsonify, redirect, session, stream_with_context
 from models.user_model import DB
+from models import user_export
+from models.medicine_model import MEDICINE_BATCH_LIMIT, get_shared_medicine_model, normalize_medicine_name
+from models.user_collections import get_average_ratings
+from utils import ai_refresh, rate_limit
+import os
 
 profile_bp = Blueprint('profile', __name__)
 
+# Most unknown saved medicines one profile view queues for generation
+# (the view spends one 'ai' rate limit token for all of them)
+GENERATIONS_PER_VIEW = int(os.getenv('PROFILE_GENERATIONS_PER_VIEW', '3'))
+
+
+def _lookup_key(name):
+    """name_key a saved name is looked up by (same as medicine_model.get_many)"""
+    return normalize_medicine_name(name.replace('-', ' '))
+
+
+def load_saved_medicines(email, saved_meds_model):
+    """
+    Saved medications with their catalog summary and rating
+    
+    Takes a fixed number of queries however many medications are saved:
+    the saved list, one batched medicine lookup (per MEDICINE_BATCH_LIMIT
+    names) and one rating aggregation. Names with no medicine yet are
+    queued for background generation: at most GENERATIONS_PER_VIEW per
+    view, for one token of the user's 'ai' rate limit. A name that was
+    already tried isn't retried until ai_refresh.GENERATION_RETRY_SECONDS
+    have passed.
+    
+    Returns:
+        list: [{'medication': str, 'medicine': dict or None,
+                'rating': dict or None, 'pending': bool}, ...]
+    """
+    saved = saved_meds_model.get_meds_by_email(email)
+    names = list(dict.fromkeys(med.medication for med in saved if med.medication.strip()))
+    
+    medicine_model = get_shared_medicine_model()
+    medicines = {}
+    missing = []
+    for start in range(0, len(names), MEDICINE_BATCH_LIMIT):
+        found, not_found = medicine_model.get_many(names[start:start + MEDICINE_BATCH_LIMIT])
+        medicines.update((medicine['name_key'], medicine) for medicine in found)
+        missing.extend(not_found)
+    
+    statuses = ai_refresh.generation_statuses(missing) if missing else {}
+    untried = [name for name in missing if name not in statuses][:GENERATIONS_PER_VIEW]
+    if untried and not rate_limit.check('ai'):
+        for name in untried:
+            if ai_refresh.schedule_generation(name):
+                statuses[name] = 'queued'
+    pending = {_lookup_key(name) for name in missing if statuses.get(name) == 'queued'}
+    
+    ratings = get_average_ratings([medicine['name'] for medicine in medicines.values()])
+    
+    saved_medicines = []
+    for name in names:
+        medicine = medicines.get(_lookup_key(name))
+        saved_medicines.append({
+            'medication': name,
+            'medicine': medicine,
+            'rating': ratings.get(medicine['name'].lower()) if medicine else None,
+            'pending': medicine is None and _lookup_key(name) in pending
+        })
+    return saved_medicines
+
+
 @profile_bp.route('/profile_page', methods=['GET', 'POST'])
 def profile_page():
     if 'email' not in session:
@@ -19,7 +83,7 @@ def profile_page():
     saved_meds_model = db.saved_meds
 
     # Fetch user data
-    user = user_model.get_user_by_email(email)
+    user = user_model.get_profile(email)
 
     if request.method == 'POST':
         # Collect updated form data
@@ -45,14 +109,37 @@ def profile_page():
                 saved_meds_model.save_medication(email, med)
 
         # Refresh user object
-        user = user_model.get_user_by_email(email)
+        user = user_model.get_profile(email)
         db.close()
         return jsonify({"success": True, "message": "Profile updated", "user": user})
 
     # GET request → display profile
-    # Fetch saved medicines for this user
-    raw_meds = saved_meds_model.get_meds_by_email(email)
-    saved_meds_list = [{"medication": med.get("medication", "")} for med in raw_meds]
+    # Saved medicines with their descriptions and ratings
+    saved_meds_list = load_saved_medicines(email, saved_meds_model)
+    interaction_warnings = db.get_user_interactions(email)['warnings']
 
     db.close()
-    return render_template('profile_page.html', user=user, saved_medicines=saved_meds_list)
\ No newline at end of file
+    return render_template('profile_page.html', user=user, saved_medicines=saved_meds_list,
+                           interaction_warnings=interaction_warnings)
+
+@profile_bp.route('/profile/export')
+@rate_limit.rate_limited('export')
+def export_profile_data():
+    """Download everything stored about the logged-in user (?format=zip|json)"""
+    if 'email' not in session:
+        return redirect('/login')
+
+    export_format = request.args.get('format', 'zip')
+    if export_format not in user_export.STREAMS:
+        return jsonify({'success': False, 'message': 'format must be zip or json'}), 400
+
+    email = session['email']
+    mimetype = 'application/zip' if export_format == 'zip' else 'application/json'
+    return Response(
+        stream_with_context(user_export.STREAMS[export_format](email)),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': f'attachment; filename="medinfo-export.{export_format}"',
+            'Cache-Control': 'no-store'
+        }
+    )
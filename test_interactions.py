@@ -0,0 +1,80 @@
+"""
+Test Drug Interaction Index
+Run this to check models/interactions.py (no database needed)
+"""
+
+from models.interactions import INTERACTIONS_FILE, InteractionIndex
+import sys
+
+failures = 0
+
+
+def check(label, condition):
+    global failures
+    if condition:
+        print(f"✅ {label}")
+    else:
+        failures += 1
+        print(f"❌ {label}")
+
+
+def raises(build):
+    try:
+        build()
+    except ValueError:
+        return True
+    return False
+
+
+print("=" * 50)
+print("🧪 TESTING DRUG INTERACTION INDEX")
+print("=" * 50)
+
+print("\n1️⃣ Building an index...")
+index = InteractionIndex(
+    [
+        {'drugs': ['Warfarin', 'aspirin'], 'severity': 'major', 'description': 'Bleeding'},
+        {'drugs': ['aspirin', 'ibuprofen'], 'severity': 'minor', 'description': 'Listed twice'},
+        {'drugs': ['Ibuprofen', 'Aspirin'], 'severity': 'moderate', 'description': 'Stomach'},
+        {'drugs': ['lisinopril', 'ibuprofen'], 'severity': 'moderate', 'description': 'Kidneys'},
+    ],
+    aliases={'Advil': 'ibuprofen', 'Coumadin': 'Warfarin'}
+)
+check("duplicate pairs are stored once", len(index.pairs) == 3)
+check("the more serious duplicate wins", index.lookup('aspirin', 'ibuprofen').severity == 'moderate')
+check("a pair needs two different drugs",
+      raises(lambda: InteractionIndex([{'drugs': ['aspirin', 'Aspirin'], 'severity': 'major'}])))
+check("unknown severities are rejected",
+      raises(lambda: InteractionIndex([{'drugs': ['a', 'b'], 'severity': 'severe'}])))
+
+print("\n2️⃣ Lookups...")
+check("aliases, case and spacing resolve to the generic name",
+      index.canonical('  ADVIL ') == 'ibuprofen')
+check("lookup works in either order", index.lookup('coumadin', 'Aspirin') is index.lookup('aspirin', 'warfarin'))
+check("no interaction gives None", index.lookup('warfarin', 'lisinopril') is None)
+
+print("\n3️⃣ Checking medication lists...")
+found = index.check(['Coumadin', 'aspirin', 'Advil', 'lisinopril', 'unknownzol', '', '  '])
+check("every pair in the list, most serious first",
+      [interaction.drugs for interaction in found]
+      == [('aspirin', 'warfarin'), ('aspirin', 'ibuprofen'), ('ibuprofen', 'lisinopril')])
+check("a brand and its generic don't interact with themselves", index.check(['Advil', 'ibuprofen']) == [])
+check("with_drug only returns pairs with that medicine",
+      [interaction.drugs for interaction in index.with_drug('Advil', ['aspirin', 'Lisinopril', 'warfarin'])]
+      == [('aspirin', 'ibuprofen'), ('ibuprofen', 'lisinopril')])
+
+print("\n4️⃣ Loading the shipped interaction file...")
+try:
+    shipped = InteractionIndex.from_file(INTERACTIONS_FILE)
+    check(f"{len(shipped.pairs)} pairs loaded", len(shipped.pairs) > 0)
+    check("brand names in the file resolve", shipped.lookup('Coumadin', 'Advil') is not None)
+except Exception as e:
+    failures += 1
+    print(f"❌ Loading {INTERACTIONS_FILE} failed: {e}")
+
+print("\n" + "=" * 50)
+print("🏁 TEST COMPLETE" if not failures else f"💥 {failures} CHECK(S) FAILED")
+print("=" * 50)
+
+if failures:
+    sys.exit(1)
@@ -0,0 +1,82 @@
+"""
+Test JSON Provider
+Run this to check that MongoDB documents encode the same with and without orjson
+"""
+
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from datetime import datetime, timedelta, timezone
+from flask import Flask
+from utils import json_provider
+from utils.json_provider import MongoJSONProvider
+import json
+import sys
+
+failures = 0
+
+
+def check(label, condition):
+    global failures
+    if condition:
+        print(f"✅ {label}")
+    else:
+        failures += 1
+        print(f"❌ {label}")
+
+
+def dumps_without_orjson(provider, obj, **kwargs):
+    """Encode through the stdlib fallback"""
+    saved, json_provider.orjson = json_provider.orjson, None
+    try:
+        return provider.dumps(obj, **kwargs)
+    finally:
+        json_provider.orjson = saved
+
+
+app = Flask(__name__)
+provider = app.json = MongoJSONProvider(app)
+
+object_id = ObjectId('65f0c0ffee0000000000beef')
+document = {
+    '_id': object_id,
+    'name': 'Aspirin',
+    'created_at': datetime(2026, 1, 31, 9, 15),
+    'updated_at': datetime(2026, 1, 31, 11, 15, tzinfo=timezone(timedelta(hours=2))),
+    'price': Decimal128('12.50'),
+    'tags': ['pain', 'fever'],
+    'rating': {'average': 4.5, 'count': 2},
+}
+
+print("=" * 50)
+print("🧪 TESTING JSON PROVIDER")
+print("=" * 50)
+
+print(f"\n1️⃣ Encoding a MongoDB document (orjson {'installed' if json_provider.orjson else 'not installed'})...")
+decoded = json.loads(provider.dumps(document))
+check("ObjectId becomes its hex string", decoded['_id'] == str(object_id))
+check("naive datetimes are UTC with a Z", decoded['created_at'] == '2026-01-31T09:15:00Z')
+check("aware datetimes keep their offset", decoded['updated_at'] == '2026-01-31T11:15:00+02:00')
+check("Decimal128 becomes a string", decoded['price'] == '12.50')
+check("key order follows the document", list(decoded) == list(document))
+
+print("\n2️⃣ Same output either way...")
+check("with and without orjson decode the same",
+      decoded == json.loads(dumps_without_orjson(provider, document)))
+check("sort_keys is honoured",
+      list(json.loads(provider.dumps(document, sort_keys=True))) == sorted(document))
+check("integers over 64 bits fall back to the stdlib",
+      json.loads(provider.dumps({'big': 2 ** 70})) == {'big': 2 ** 70})
+check("loads reads what dumps wrote", provider.loads(provider.dumps(document)) == decoded)
+
+print("\n3️⃣ Inside Flask...")
+with app.app_context():
+    from flask import jsonify
+    response = jsonify(document)
+    check("jsonify uses the provider", json.loads(response.get_data(as_text=True)) == decoded)
+
+print("\n" + "=" * 50)
+print("🏁 TEST COMPLETE" if not failures else f"💥 {failures} CHECK(S) FAILED")
+print("=" * 50)
+
+if failures:
+    sys.exit(1)
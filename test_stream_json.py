@@ -0,0 +1,102 @@
+"""
+Test Streaming JSON Validation
+Run this to check utils/stream_json.py without an LM server
+"""
+
+from utils.stream_json import MAX_PREAMBLE_CHARS, MedicineStreamParser, StreamAbort
+import json
+import sys
+
+failures = 0
+
+
+def check(label, condition):
+    global failures
+    if condition:
+        print(f"✅ {label}")
+    else:
+        failures += 1
+        print(f"❌ {label}")
+
+
+def parse(chunks, **kwargs):
+    """Feed chunks one by one; (result or None, abort reason or None)"""
+    parser = MedicineStreamParser(**kwargs)
+    try:
+        for chunk in chunks:
+            if parser.feed(chunk):
+                break
+        return parser.result(), None
+    except StreamAbort as e:
+        return None, e.reason
+
+
+def every_split(text):
+    """The text cut in two at every position, then one character at a time"""
+    for cut in range(len(text) + 1):
+        yield [text[:cut], text[cut:]]
+    yield list(text)
+
+
+medicine = {
+    'name': 'Aspirin',
+    'description': 'Eases "pain" \\ fever\nand swelling. Café \U0001F48A',
+    'advice': ['Take with water', 'Take after meals'],
+    'warning': 'Not for children',
+    'pubmed_link': 'https://pubmed.ncbi.nlm.nih.gov/?term=aspirin'
+}
+answer = json.dumps(medicine)
+expected = dict(medicine, advice='Take with water\nTake after meals')
+
+print("=" * 50)
+print("🧪 TESTING STREAMED ANSWER VALIDATION")
+print("=" * 50)
+
+print("\n1️⃣ Chunk boundaries (escapes split anywhere)...")
+results = [parse(chunks) for chunks in every_split(answer)]
+check("every split parses to the same fields", all(result == (expected, None) for result in results))
+escaped = json.dumps(medicine, ensure_ascii=True)
+results = [parse(chunks) for chunks in every_split(escaped)]
+check("\\uXXXX escapes and surrogate pairs split anywhere", all(result == (expected, None) for result in results))
+
+print("\n2️⃣ Preamble and fences...")
+check("```json fence and lead-in are tolerated",
+      parse(['Here is the JSON:\n```json\n', answer, '\n```\nHope this helps!'])[0] == expected)
+check("long prose before the object aborts",
+      parse(['x' * (MAX_PREAMBLE_CHARS + 1) + answer])[1] == 'preamble')
+
+print("\n3️⃣ Budgets...")
+check("an overlong field aborts as too_long",
+      parse([answer.replace('Not for children', 'x' * 2001)])[1] == 'too_long')
+check("the whole answer over max_chars aborts as too_large",
+      parse([answer], max_chars=50)[1] == 'too_large')
+check("an overlong unused field aborts as too_long",
+      parse([answer[:-1] + ', "notes": "' + 'x' * 1001 + '"}'])[1] == 'too_long')
+
+print("\n4️⃣ Types and structure...")
+check("a required field holding an object aborts as bad_type",
+      parse([answer.replace('"Not for children"', '{"text": "x"}')])[1] == 'bad_type')
+check("a list in a string-only field aborts as bad_type",
+      parse([answer.replace('"Aspirin"', '["Aspirin"]')])[1] == 'bad_type')
+check("missing required fields abort at the closing brace",
+      parse(['{"name": "Aspirin"}'])[1] == 'missing_fields')
+check("an answer that never closes is incomplete",
+      parse([answer[:-1]])[1] == 'incomplete')
+check("broken structure aborts as malformed",
+      parse([answer.replace('", "advice"', '" "advice"')])[1] == 'malformed')
+
+print("\n5️⃣ Unused fields are skipped whatever they hold...")
+extras = (', "sources": [1, {"a": [2, "]}\\""]}, null], "meta": {"x": {"y": "}"}},'
+          ' "score": -1.5e3, "ok": true, "none": null, "notes": "a \\" b"}')
+with_extras = answer[:-1] + extras
+results = [parse(chunks) for chunks in every_split(with_extras)]
+check("arrays, nested objects and scalars in any split", all(result == (expected, None) for result in results))
+check("unused fields before the required ones",
+      parse(['{"meta": {"k": [1, 2]}, ' + answer[1:]])[0] == expected)
+
+print("\n" + "=" * 50)
+print("🏁 TEST COMPLETE" if not failures else f"💥 {failures} CHECK(S) FAILED")
+print("=" * 50)
+
+if failures:
+    sys.exit(1)
@@ -0,0 +1,242 @@
+"""
+AI Content Refresh - Stale-while-revalidate for generated medicines
+File: utils/ai_refresh.py
+
+Generated medicine documents record when and how they were produced
+(generated_at, prompt_version, model). When a page shows a document that is
+older than MEDICINE_MAX_AGE_DAYS or came from an older prompt, the page is
+still served as is and the medicine is queued for regeneration.
+
+A single background thread per process works through the queue at low
+priority: it only starts a generation when REFRESH_RESERVED_SLOTS generation
+slots stay free for users, claims the document so other workers skip it, and
+swaps the new version in only if the old one is still current. Seeded and
+imported medicines (source='seed' or 'catalog') are curated and never
+regenerated.
+
+The same worker also generates medicines that are referenced somewhere (a
+saved medication on a profile) but don't exist yet, see schedule_generation().
+Each name is attempted at most once per GENERATION_RETRY_SECONDS (the
+attempt is remembered in the shared cache, failures included), and the
+result is stored under the name that was asked for so it is found next time.
+"""
+
+from datetime import datetime, timedelta
+import logging
+import os
+import queue
+import threading
+import time
+
+from pymongo.errors import DuplicateKeyError
+
+from models.medicine_model import normalize_medicine_name
+from utils import rate_limit
+from utils.ai_service import PROMPT_VERSION, generate_medicine_info
+from utils.cache import get_cache
+
+logger = logging.getLogger(__name__)
+
+REFRESH_ENABLED = os.getenv('AI_REFRESH_ENABLED', 'true').lower() == 'true'
+MEDICINE_MAX_AGE_DAYS = int(os.getenv('MEDICINE_MAX_AGE_DAYS', '90'))
+REFRESH_QUEUE_SIZE = int(os.getenv('AI_REFRESH_QUEUE_SIZE', '100'))
+REFRESH_RESERVED_SLOTS = int(os.getenv('AI_REFRESH_RESERVED_SLOTS', '2'))
+
+# Medicines that didn't come from the LM
+CURATED_SOURCES = ('seed', 'catalog')
+
+# How long a generation attempt for a missing medicine (queued, failed or
+# done) stops new attempts for the same name
+GENERATION_RETRY_SECONDS = int(os.getenv('AI_GENERATION_RETRY_SECONDS', '86400'))
+
+# How long a claim keeps other workers away if this one dies mid-refresh
+REFRESH_CLAIM_SECONDS = 600
+
+# How often to look for a free generation slot while the LM servers are busy
+REFRESH_POLL_SECONDS = 10
+
+_queue = queue.Queue(maxsize=REFRESH_QUEUE_SIZE)
+_queued = set()
+_lock = threading.Lock()
+_worker_started = False
+_medicine_model = None
+
+
+def is_stale(medicine):
+    """True if a generated medicine should be regenerated"""
+    if medicine.get('source') in CURATED_SOURCES:
+        return False
+    if medicine.get('prompt_version') != PROMPT_VERSION:
+        return True
+    generated_at = medicine.get('generated_at')
+    return generated_at is None or generated_at < datetime.utcnow() - timedelta(days=MEDICINE_MAX_AGE_DAYS)
+
+
+def schedule_refresh(medicine):
+    """
+    Queue a medicine for background regeneration if it is stale
+
+    Never blocks: if the queue is full the medicine is picked up on a later view.
+
+    Args:
+        medicine (dict): Medicine document that is about to be served
+    """
+    if not REFRESH_ENABLED or not is_stale(medicine):
+        return
+    _enqueue(medicine['name'])
+
+
+def _attempt_key(name):
+    return 'generation:' + normalize_medicine_name(name)
+
+
+def generation_statuses(names):
+    """
+    Recent generation attempts for missing medicines, in one cache round trip
+
+    Returns:
+        dict: name -> 'queued' or 'failed' (names never attempted are left out)
+    """
+    keys = {name: _attempt_key(name) for name in names}
+    found = get_cache().get_many(list(keys.values()))
+    return {name: found[key] for name, key in keys.items() if key in found}
+
+
+def schedule_generation(name):
+    """
+    Queue a medicine that isn't in the database yet for background generation
+
+    Never blocks, like schedule_refresh(). A name already attempted in the
+    last GENERATION_RETRY_SECONDS is skipped.
+
+    Args:
+        name (str): Medicine name as the user wrote it
+
+    Returns:
+        bool: True if it was queued
+    """
+    name = ' '.join(name.split())
+    if not REFRESH_ENABLED or not name:
+        return False
+    key = _attempt_key(name)
+    if not get_cache().add(key, 'queued', GENERATION_RETRY_SECONDS):
+        return False
+    if not _enqueue(name):
+        get_cache().delete(key)
+        return False
+    return True
+
+
+def _enqueue(name):
+    """Put a name on the queue; False if the queue is full"""
+    with _lock:
+        if name in _queued:
+            return True
+        try:
+            _queue.put_nowait(name)
+        except queue.Full:
+            return False
+        _queued.add(name)
+    _start_worker()
+    return True
+
+
+def refresh_medicine(name):
+    """
+    Regenerate one medicine and swap it in (or generate it if it is missing)
+
+    Returns:
+        bool: True if a new version was stored
+    """
+    global _medicine_model
+    if _medicine_model is None:
+        from models.medicine_model import MedicineModel
+        _medicine_model = MedicineModel()
+
+    medicine = _medicine_model.get_medicine_by_key(name)
+    if medicine is None:
+        return _generate_missing(name)
+    if not is_stale(medicine):
+        return False
+
+    # Wait until users leave room on the LM servers
+    lease_id = rate_limit.acquire_generation_slot(reserve=REFRESH_RESERVED_SLOTS)
+    while lease_id is None:
+        time.sleep(REFRESH_POLL_SECONDS)
+        lease_id = rate_limit.acquire_generation_slot(reserve=REFRESH_RESERVED_SLOTS)
+
+    try:
+        generated_at = medicine.get('generated_at')
+        if not _medicine_model.claim_refresh(medicine['_id'], generated_at, REFRESH_CLAIM_SECONDS):
+            return False  # Another worker is on it
+        new_medicine = generate_medicine_info(medicine['name'])
+    finally:
+        rate_limit.release_generation_slot(lease_id)
+
+    if not new_medicine:
+        return False  # The claim runs out and a later view tries again
+
+    # Keep the stored name so existing links and reviews still match
+    new_medicine['name'] = medicine['name']
+    swapped = _medicine_model.replace_generated(medicine['_id'], generated_at, new_medicine)
+    if swapped:
+        logger.info("Refreshed medicine", extra={'medicine': name, 'prompt_version': PROMPT_VERSION})
+    return swapped
+
+
+def _generate_missing(name):
+    """Generate a medicine nobody has opened yet and store it if still missing"""
+    lease_id = rate_limit.acquire_generation_slot(reserve=REFRESH_RESERVED_SLOTS)
+    while lease_id is None:
+        time.sleep(REFRESH_POLL_SECONDS)
+        lease_id = rate_limit.acquire_generation_slot(reserve=REFRESH_RESERVED_SLOTS)
+
+    try:
+        new_medicine = generate_medicine_info(name)
+    finally:
+        rate_limit.release_generation_slot(lease_id)
+
+    if not new_medicine:
+        get_cache().set(_attempt_key(name), 'failed', GENERATION_RETRY_SECONDS)
+        return False
+
+    # A visitor may have opened the page (and generated it) meanwhile
+    if _medicine_model.get_medicine_by_key(name, {'_id': 1}) is not None:
+        return False
+
+    # Store it under the name that was asked for (the LM may answer a brand
+    # name with the generic one), so the saved medication finds it next time;
+    # lookups read '-' as a space, so the stored name does too
+    requested = ' '.join(name.replace('-', ' ').split())
+    if normalize_medicine_name(new_medicine.get('name', '')) != requested.lower():
+        new_medicine['name'] = requested
+    try:
+        _medicine_model.create_medicine(new_medicine)
+    except DuplicateKeyError:
+        return False
+    get_cache().delete(_attempt_key(name))
+    logger.info("Generated missing medicine", extra={'medicine': name})
+    return True
+
+
+def _worker():
+    while True:
+        name = _queue.get()
+        try:
+            refresh_medicine(name)
+        except Exception:
+            logger.exception("Error refreshing medicine")
+        finally:
+            with _lock:
+                _queued.discard(name)
+
+
+def _start_worker():
+    global _worker_started
+    if _worker_started:
+        return
+    with _lock:
+        if _worker_started:
+            return
+        _worker_started = True
+    threading.Thread(target=_worker, name='ai-refresh', daemon=True).start()
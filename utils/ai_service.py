@@ -6,19 +6,61 @@ Author: Dominik Szewczyk
 
 import requests
 import json
+import logging
+import os
+from datetime import datetime
+from utils import metrics
+from utils.lm_pool import LMBackendPool
+from utils.stream_json import MedicineStreamParser, StreamAbort
+
+logger = logging.getLogger(__name__)
 
 # LM Studio Configuration
-LM_STUDIO_URL = "http://localhost:1234/v1/chat/completions"
+LM_STUDIO_URL = os.getenv('LM_STUDIO_URL', "http://localhost:1234/v1/chat/completions")
+LM_STUDIO_TIMEOUT = 180
+LM_MODEL = os.getenv('LM_MODEL', 'local-model')
 
-def generate_medicine_info(medicine_name):
+# Bump whenever the prompt changes: documents from older prompts get refreshed
+PROMPT_VERSION = 2
+
+# Extra attempts, with a repair prompt, after an answer is aborted as invalid
+LM_REPAIR_ATTEMPTS = int(os.getenv('LM_REPAIR_ATTEMPTS', '1'))
+
+# Longest one generate_medicine_info() call can take: waiting for a backend,
+# then every attempt running up to the request timeout
+LM_GENERATION_MAX_SECONDS = LM_STUDIO_TIMEOUT * (2 + LM_REPAIR_ATTEMPTS)
+
+SYSTEM_PROMPT = "You are a helpful pharmacy assistant. Explain medicines in very simple terms that a 16-year-old can understand. Use short sentences, simple words, and bullet points. Always respond with valid JSON only."
+
+# Follow-up sent after an invalid answer; {problem} comes from REPAIR_HINTS
+REPAIR_PROMPT = "That answer could not be used because {problem}. Reply again with ONLY the JSON object in the format asked for: every field a plain string, advice and warning as short bullet points, and the description about 50 words."
+
+REPAIR_HINTS = {
+    'preamble': 'it did not start with the JSON object',
+    'malformed': 'it was not valid JSON ({detail})',
+    'bad_type': 'a field had the wrong type ({detail})',
+    'too_long': 'the "{detail}" field was far too long',
+    'too_large': 'it was far too long',
+    'missing_fields': 'it was missing these fields: {detail}',
+    'incomplete': 'it stopped before the JSON object was finished',
+}
+
+# How much of the rejected answer is shown back to the model
+REPAIR_CONTEXT_CHARS = 2000
+
+
+def build_medicine_request(medicine_name, stream=False, repair=None):
     """
-    Use LM Studio AI to generate medicine information
+    Build the LM Studio chat completion payload for a medicine
     
     Args:
         medicine_name (str): Name of the medicine to research
+        stream (bool): Ask for the answer as server-sent events
+        repair (StreamAbort): Rejected previous attempt; its partial answer
+            and a repair prompt are added to the conversation
         
     Returns:
-        dict: Medicine information or None if failed
+        dict: JSON body for the chat completions endpoint
     """
     
     # Create simple, clear prompt for AI
@@ -52,135 +94,373 @@ EXAMPLE of correct format:
 
 Each bullet point should be one clear, short sentence. Focus on the most important practical information found on trusted medical websites."""
     
+    messages = [
+        {
+            "role": "system",
+            "content": SYSTEM_PROMPT
+        },
+        {
+            "role": "user",
+            "content": prompt
+        }
+    ]
+    if repair is not None:
+        problem = REPAIR_HINTS.get(repair.reason, '{detail}').format(detail=repair.detail)
+        messages.append({"role": "assistant", "content": repair.partial[:REPAIR_CONTEXT_CHARS]})
+        messages.append({"role": "user", "content": REPAIR_PROMPT.format(problem=problem)})
+    
+    return {
+        "model": LM_MODEL,
+        "messages": messages,
+        "temperature": 0.7,
+        "max_tokens": 1000,
+        "stream": stream,
+    }
+
+
+def add_generation_info(medicine_info, completion):
+    """
+    Record how a medicine document was produced, so it can be refreshed later
+    
+    Args:
+        medicine_info (dict): Parsed medicine information
+        completion (dict): Chat completion response from LM Studio
+        
+    Returns:
+        dict: medicine_info with source, generated_at, prompt_version and model
+    """
+    medicine_info['source'] = 'ai'
+    medicine_info['generated_at'] = datetime.utcnow()
+    medicine_info['prompt_version'] = PROMPT_VERSION
+    medicine_info['model'] = completion.get('model') or LM_MODEL
+    return medicine_info
+
+
+class CompletionStream:
+    """
+    Reads a streamed chat completion line by line into a MedicineStreamParser
+    
+    feed_line() returns True once the answer is complete (or the stream
+    ended), so the caller can close the response and stop the generation.
+    A StreamAbort raised while reading carries the text received so far in
+    .partial and is counted in the LM metrics.
+    """
+    
+    def __init__(self):
+        self.parser = MedicineStreamParser()
+        self.pieces = []
+        self.tokens = 0
+        self.model = None
+        self.usage = None
+    
+    @property
+    def text(self):
+        return ''.join(self.pieces)
+    
+    def feed_line(self, line):
+        if not line or not line.startswith('data:'):
+            return False  # Blank separators, comments, keep-alives
+        payload = line[5:].strip()
+        if payload == '[DONE]':
+            return True
+        
+        chunk = json.loads(payload)
+        self.model = chunk.get('model') or self.model
+        self.usage = chunk.get('usage') or self.usage
+        choices = chunk.get('choices') or [{}]
+        content = (choices[0].get('delta') or {}).get('content')
+        if not content:
+            return False
+        
+        self.tokens += 1  # One content delta per generated token
+        self.pieces.append(content)
+        try:
+            return self.parser.feed(content)
+        except StreamAbort as abort:
+            raise self._aborted(abort)
+    
+    def finish(self):
+        """
+        The validated medicine, once the stream is over
+        
+        Returns:
+            dict: Medicine information
+        
+        Raises:
+            StreamAbort: The answer was incomplete
+        """
+        try:
+            medicine_info = self.parser.result()
+        except StreamAbort as abort:
+            raise self._aborted(abort)
+        metrics.record_lm_usage(self.usage or {'completion_tokens': self.tokens})
+        return clean_medicine_info(medicine_info)
+    
+    def _aborted(self, abort):
+        abort.partial = self.text
+        metrics.record_lm_abort(abort.reason, self.tokens)
+        return abort
+
+
+def _complete_response(data):
+    """Medicine from a whole (non-streamed) completion; StreamAbort if invalid"""
+    metrics.record_lm_usage(data.get('usage'))
+    ai_response = data['choices'][0]['message']['content']
+    parser = MedicineStreamParser()
     try:
-        print(f"🤖 Calling LM Studio for: {medicine_name}")
+        parser.feed(ai_response)
+        return clean_medicine_info(parser.result())
+    except StreamAbort as abort:
+        abort.partial = ai_response
+        raise
+
+
+def _stream_attempt(backend, medicine_name, repair=None):
+    """
+    One streamed generation, validated as the tokens arrive
+    
+    Returns:
+        tuple: (HTTP status, medicine dict or None on an HTTP error, model name)
+    
+    Raises:
+        StreamAbort: The answer was invalid; the stream has been closed
+    """
+    with requests.post(
+        backend.url,
+        json=build_medicine_request(medicine_name, stream=True, repair=repair),
+        timeout=LM_STUDIO_TIMEOUT,
+        stream=True
+    ) as response:
+        if response.status_code != 200:
+            logger.error("LM Studio API error", extra={'status': response.status_code, 'body': response.text[:200]})
+            return response.status_code, None, None
         
-        # Call LM Studio API
-        response = requests.post(
-            LM_STUDIO_URL,
-            json={
-                "model": "local-model",
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "You are a helpful pharmacy assistant. Explain medicines in very simple terms that a 16-year-old can understand. Use short sentences, simple words, and bullet points. Always respond with valid JSON only."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "temperature": 0.7,
-                "max_tokens": 1000,
-            },
-            timeout=180
-        )
+        if not response.headers.get('Content-Type', '').startswith('text/event-stream'):
+            # Server doesn't stream: the whole completion in one reply
+            data = response.json()
+            return 200, _complete_response(data), data.get('model')
+        
+        response.encoding = 'utf-8'  # Server-sent events are always UTF-8
+        stream = CompletionStream()
+        for line in response.iter_lines(decode_unicode=True):
+            if stream.feed_line(line):
+                break
+        # Leaving the block closes the connection, which stops the generation
+        return 200, stream.finish(), stream.model
+
+
+async def _stream_attempt_async(client, backend, medicine_name, repair=None):
+    """Async version of _stream_attempt (httpx)"""
+    async with client.stream(
+        'POST',
+        backend.url,
+        json=build_medicine_request(medicine_name, stream=True, repair=repair)
+    ) as response:
+        if response.status_code != 200:
+            await response.aread()
+            logger.error("LM Studio API error", extra={'status': response.status_code, 'body': response.text[:200]})
+            return response.status_code, None, None
         
-        if response.status_code == 200:
+        if not response.headers.get('Content-Type', '').startswith('text/event-stream'):
+            await response.aread()
             data = response.json()
-            ai_response = data['choices'][0]['message']['content']
-            
-            print(f"📥 AI Response received (length: {len(ai_response)} chars)")
-            
-            # Parse JSON from response
-            medicine_info = parse_medicine_json(ai_response)
-            
-            if medicine_info:
-                print(f"✅ Successfully parsed medicine info")
-                print(f"📦 Type: {type(medicine_info)}")
-                print(f"📝 Keys: {list(medicine_info.keys())}")
-                print(f"🏥 Name: {medicine_info.get('name')}")
-                return medicine_info
+            return 200, _complete_response(data), data.get('model')
+        
+        stream = CompletionStream()
+        async for line in response.aiter_lines():
+            if stream.feed_line(line):
+                break
+        return 200, stream.finish(), stream.model
+
+
+def _log_abort(medicine_name, abort, attempt):
+    logger.warning("Invalid AI answer aborted", extra={
+        'medicine': medicine_name,
+        'reason': abort.reason,
+        'detail': abort.detail,
+        'attempt': attempt,
+        'chars': len(abort.partial)
+    })
+
+
+def generate_medicine_info(medicine_name):
+    """
+    Use LM Studio AI to generate medicine information
+    
+    Args:
+        medicine_name (str): Name of the medicine to research
+        
+    Returns:
+        dict: Medicine information or None if failed
+    """
+    
+    # Wait for a free slot on the least busy healthy backend
+    backend = lm_pool.acquire(timeout=LM_STUDIO_TIMEOUT)
+    if backend is None:
+        logger.error("No LM backend available", extra={'medicine': medicine_name})
+        metrics.record_lm_failure('no_backend')
+        return None
+    
+    backend_ok = False
+    try:
+        logger.info("Calling LM Studio", extra={'medicine': medicine_name, 'backend': backend.url})
+        
+        # Stream the answer, cancelling and retrying with a repair prompt
+        # as soon as it can't be valid
+        repair = None
+        with metrics.LM_REQUEST_SECONDS.time():
+            for attempt in range(LM_REPAIR_ATTEMPTS + 1):
+                try:
+                    status, medicine_info, model = _stream_attempt(backend, medicine_name, repair)
+                    break
+                except StreamAbort as abort:
+                    _log_abort(medicine_name, abort, attempt)
+                    repair = abort
             else:
-                print("❌ Failed to parse AI response as JSON")
+                backend_ok = True
+                metrics.record_lm_failure('parse_error')
                 return None
-        else:
-            print(f"❌ LM Studio API error: {response.status_code}")
-            print(f"Response: {response.text}")
+        backend_ok = status < 500
+        
+        if medicine_info is None:
+            metrics.record_lm_failure('http_error')
             return None
+        
+        logger.info("AI response received", extra={'medicine': medicine_name, 'attempts': attempt + 1})
+        return add_generation_info(medicine_info, {'model': model})
             
     except requests.exceptions.ConnectionError:
-        print("❌ Error: Cannot connect to LM Studio. Make sure it's running on http://localhost:1234")
+        logger.error("Cannot connect to LM Studio", extra={'backend': backend.url})
+        metrics.record_lm_failure('connection_error')
         return None
     except requests.exceptions.Timeout:
-        print("❌ Error: LM Studio request timed out")
+        logger.error("LM Studio request timed out", extra={'backend': backend.url})
+        metrics.record_lm_failure('timeout')
         return None
-    except Exception as e:
-        print(f"❌ Error calling LM Studio: {str(e)}")
+    except Exception:
+        logger.exception("Error calling LM Studio")
+        metrics.record_lm_failure('exception')
         return None
+    finally:
+        lm_pool.release(backend, backend_ok)
 
 
-def parse_medicine_json(ai_response):
+async def generate_medicine_info_async(medicine_name):
     """
-    Parse JSON from AI response (handles markdown code blocks)
+    Async version of generate_medicine_info for the ASGI serving mode.
+    Waiting on LM Studio doesn't hold a thread, only a coroutine.
     
     Args:
-        ai_response (str): Raw response from AI
+        medicine_name (str): Name of the medicine to research
         
     Returns:
-        dict: Parsed medicine info or None
+        dict: Medicine information or None if failed
     """
+    import asyncio
+    import httpx
+    
+    # Poll for a free backend slot without blocking the event loop
+    backend = lm_pool.try_acquire()
+    waited = 0.0
+    while backend is None and waited < LM_STUDIO_TIMEOUT:
+        await asyncio.sleep(0.25)
+        waited += 0.25
+        backend = lm_pool.try_acquire()
+    if backend is None:
+        logger.error("No LM backend available", extra={'medicine': medicine_name})
+        metrics.record_lm_failure('no_backend')
+        return None
+    
+    backend_ok = False
     try:
-        # Remove markdown code blocks if present
-        cleaned = ai_response.strip()
-        
-        # Remove ```json and ``` if present
-        if cleaned.startswith('```json'):
-            cleaned = cleaned[7:]
-        elif cleaned.startswith('```'):
-            cleaned = cleaned[3:]
-            
-        if cleaned.endswith('```'):
-            cleaned = cleaned[:-3]
-        
-        cleaned = cleaned.strip()
-        
-        print(f"🧹 Cleaned response (first 200 chars): {cleaned[:200]}...")
-        
-        # Parse JSON
-        medicine_info = json.loads(cleaned)
+        logger.info("Calling LM Studio (async)", extra={'medicine': medicine_name, 'backend': backend.url})
         
-        # Validate required fields
-        required_fields = ['name', 'description', 'advice', 'warning', 'pubmed_link']
-        missing_fields = [f for f in required_fields if f not in medicine_info]
+        repair = None
+        with metrics.LM_REQUEST_SECONDS.time():
+            async with httpx.AsyncClient(timeout=LM_STUDIO_TIMEOUT) as client:
+                for attempt in range(LM_REPAIR_ATTEMPTS + 1):
+                    try:
+                        status, medicine_info, model = await _stream_attempt_async(
+                            client, backend, medicine_name, repair)
+                        break
+                    except StreamAbort as abort:
+                        _log_abort(medicine_name, abort, attempt)
+                        repair = abort
+                else:
+                    backend_ok = True
+                    metrics.record_lm_failure('parse_error')
+                    return None
+        backend_ok = status < 500
         
-        if missing_fields:
-            print(f"❌ Missing required fields: {missing_fields}")
+        if medicine_info is None:
+            metrics.record_lm_failure('http_error')
             return None
+        return add_generation_info(medicine_info, {'model': model})
+    
+    except httpx.ConnectError:
+        logger.error("Cannot connect to LM Studio", extra={'backend': backend.url})
+        metrics.record_lm_failure('connection_error')
+        return None
+    except httpx.TimeoutException:
+        logger.error("LM Studio request timed out", extra={'backend': backend.url})
+        metrics.record_lm_failure('timeout')
+        return None
+    except Exception:
+        logger.exception("Error calling LM Studio")
+        metrics.record_lm_failure('exception')
+        return None
+    finally:
+        lm_pool.release(backend, backend_ok)
+
+
+def clean_medicine_info(medicine_info):
+    """
+    Tidy list-looking text in advice/warning ("['a', 'b']" written as a string)
+    
+    Args:
+        medicine_info (dict): Validated medicine fields
         
-        # Convert arrays to text with line breaks if needed
-        if isinstance(medicine_info['advice'], list):
-            medicine_info['advice'] = '\n'.join(medicine_info['advice'])
-        
-        if isinstance(medicine_info['warning'], list):
-            medicine_info['warning'] = '\n'.join(medicine_info['warning'])
-        
-        # Clean up quotes and brackets
-        medicine_info['advice'] = medicine_info['advice'].replace("['", "").replace("']", "").replace("', '", "\n")
-        medicine_info['warning'] = medicine_info['warning'].replace("['", "").replace("']", "").replace("', '", "\n")
+    Returns:
+        dict: medicine_info, cleaned in place
+    """
+    for field in ('advice', 'warning'):
+        medicine_info[field] = medicine_info[field].replace("['", "").replace("']", "").replace("', '", "\n")
+    return medicine_info
+
+
+def parse_medicine_json(ai_response):
+    """
+    Parse and validate a complete AI response (``` fences are tolerated)
+    
+    Args:
+        ai_response (str): Raw response from AI
         
-        print(f"✅ Parsed successfully! Type: {type(medicine_info)}")
-        return medicine_info
-            
-    except json.JSONDecodeError as e:
-        print(f"❌ JSON parse error: {e}")
-        print(f"Raw AI response: {ai_response[:500]}...")
-        return None
-    except Exception as e:
-        print(f"❌ Unexpected error in parse_medicine_json: {e}")
+    Returns:
+        dict: Parsed medicine info or None
+    """
+    parser = MedicineStreamParser()
+    try:
+        parser.feed(ai_response)
+        return clean_medicine_info(parser.result())
+    except StreamAbort as e:
+        logger.warning("AI response rejected: %s", e, extra={'reason': e.reason, 'chars': len(ai_response)})
+        logger.debug("Raw AI response start", extra={'raw': ai_response[:200]})
         return None
 
 
-def test_lm_studio_connection():
+def test_lm_studio_connection(url=None):
     """
     Test if LM Studio is running and accessible
     
+    Args:
+        url (str): Chat completions URL, defaults to LM_STUDIO_URL
+    
     Returns:
         bool: True if LM Studio is accessible
     """
     try:
         response = requests.post(
-            LM_STUDIO_URL,
+            url or LM_STUDIO_URL,
             json={
                 "model": "local-model",
                 "messages": [
@@ -195,6 +475,32 @@ def test_lm_studio_connection():
         return False
 
 
+def ping_lm_studio(timeout=2, url=None):
+    """
+    Cheap reachability check for LM Studio (lists models, no generation)
+    
+    Args:
+        timeout (float): Seconds to wait for a response
+        url (str): Chat completions URL, defaults to LM_STUDIO_URL
+    
+    Returns:
+        bool: True if LM Studio answered with 200
+    """
+    models_url = (url or LM_STUDIO_URL).replace('/chat/completions', '/models')
+    try:
+        response = requests.get(models_url, timeout=timeout)
+        return response.status_code == 200
+    except requests.exceptions.RequestException:
+        return False
+
+
+# Pool of model servers (LM_BACKENDS), health checked with the cheap ping
+lm_pool = LMBackendPool.from_env(
+    LM_STUDIO_URL,
+    probe=lambda url: ping_lm_studio(url=url)
+)
+
+
 # For testing purposes
 if __name__ == "__main__":
     print("🧪 Testing LM Studio connection...")
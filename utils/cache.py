@@ -0,0 +1,485 @@
+"""
+Shared Cache - One cache API over interchangeable backends
+File: utils/cache.py
+
+Pick the backend with CACHE_URL:
+
+    memory://                   in-process LRU (default, not shared between workers)
+    memory://?max_entries=5000
+    redis://localhost:6379/0    Redis or any Redis-compatible server (needs `redis`)
+    sqlite:///medinfo-cache.db  file on local disk, shared by all workers on one box
+    sqlite:////var/cache/medinfo.db  (four slashes for an absolute path)
+
+Every backend supports get/set/delete/ttl/incr/add, batch get_many/set_many
+and get_or_set, which recomputes a missing value only once: one thread per
+process takes a local lock, and one process per key takes a short-lived
+`lock:` entry in the cache itself while everyone else waits for its result.
+
+Redis and SQLite values are pickled; only store our own data in them.
+
+memory:// is per process: a write in one worker can't invalidate another
+worker's copy. Data that writes make stale should be stored with
+bounded_ttl(), which caps the TTL at LOCAL_CACHE_MAX_TTL on such a backend.
+Run several workers with a redis:// or sqlite:// CACHE_URL.
+"""
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlparse
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CACHE_URL = os.getenv('CACHE_URL', 'memory://')
+
+# How long a single-flight lock lives if its owner dies while computing
+LOCK_SECONDS = 30
+
+# How long other callers wait for the lock owner before computing themselves
+LOCK_WAIT_SECONDS = 10
+
+# Longest a per-process backend keeps data another worker may invalidate
+LOCAL_CACHE_MAX_TTL = int(os.getenv('LOCAL_CACHE_MAX_TTL', '60'))
+
+_MISSING = object()
+
+
+class BaseCache(ABC):
+    """Shared API; backends implement the abstract storage methods"""
+
+    # Whether every worker sees the same entries (and the same invalidations)
+    shared = True
+
+    def __init__(self):
+        # Striped locks: threads computing the same key in this process queue up
+        self._flight_locks = [threading.Lock() for _ in range(64)]
+
+    # ---- storage, implemented by each backend ----
+
+    @abstractmethod
+    def get(self, key, default=None):
+        """Value stored under key, or default if missing/expired"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def set(self, key, value, ttl=None):
+        """Store value, expiring after ttl seconds (None keeps it until evicted)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def add(self, key, value, ttl=None):
+        """Store value only if key is absent; returns True if it was stored"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, key):
+        raise NotImplementedError
+
+    @abstractmethod
+    def ttl(self, key):
+        """Seconds until key expires, -1 if it never does, None if it doesn't exist"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def incr(self, key, amount=1):
+        """Atomically add to an integer counter (created at 0) and return it"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def clear(self):
+        raise NotImplementedError
+
+    # ---- batch operations (backends override with one round trip) ----
+
+    def get_many(self, keys):
+        """Dict of key -> value for the keys that are present"""
+        found = {}
+        for key in keys:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                found[key] = value
+        return found
+
+    def set_many(self, mapping, ttl=None):
+        for key, value in mapping.items():
+            self.set(key, value, ttl)
+
+    def bounded_ttl(self, ttl):
+        """
+        TTL for data that writes invalidate: as asked on a shared backend,
+        at most LOCAL_CACHE_MAX_TTL on a per-process one (other workers never
+        see the invalidation, so this is how stale their copy can get)
+        """
+        if self.shared:
+            return ttl
+        return LOCAL_CACHE_MAX_TTL if ttl is None else min(ttl, LOCAL_CACHE_MAX_TTL)
+
+    # ---- stampede protection ----
+
+    def get_or_set(self, key, compute, ttl=None):
+        """
+        Return the cached value, computing and storing it once if missing
+
+        Args:
+            key (str): Cache key
+            compute (callable): Builds the value (called at most once per key
+                across all workers while the value is missing)
+            ttl (float): Expiry in seconds for the computed value
+
+        Returns:
+            The cached or freshly computed value
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._flight_locks[hash(key) % len(self._flight_locks)]:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+
+            lock_key = 'lock:' + key
+            if self.add(lock_key, 1, LOCK_SECONDS):
+                try:
+                    value = compute()
+                    self.set(key, value, ttl)
+                    return value
+                finally:
+                    self.delete(lock_key)
+
+            # Another process is computing it - wait for its result
+            deadline = time.monotonic() + LOCK_WAIT_SECONDS
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                value = self.get(key, _MISSING)
+                if value is not _MISSING:
+                    return value
+
+            logger.warning("Gave up waiting for cache recompute", extra={'key': key})
+            value = compute()
+            self.set(key, value, ttl)
+            return value
+
+# ============================================
+# IN-PROCESS LRU
+# ============================================
+
+class MemoryCache(BaseCache):
+    """LRU dict with per-key expiry. Values are stored as is, don't mutate them."""
+
+    shared = False  # Each worker process has its own
+
+    def __init__(self, max_entries=1024):
+        super().__init__()
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # key -> (expires_at or None, value)
+        self._lock = threading.Lock()
+
+    def _live(self, key, now):
+        """Entry for key if present and not expired (caller holds the lock)"""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] is not None and entry[0] <= now:
+            del self._data[key]
+            return None
+        return entry
+
+    def _store(self, key, value, ttl):
+        self._data[key] = (None if ttl is None else time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._live(key, time.monotonic())
+            if entry is None:
+                return default
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._live(key, now)
+                if entry is not None:
+                    found[key] = entry[1]
+        return found
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def add(self, key, value, ttl=None):
+        with self._lock:
+            if self._live(key, time.monotonic()) is not None:
+                return False
+            self._store(key, value, ttl)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def ttl(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._live(key, now)
+        if entry is None:
+            return None
+        return -1 if entry[0] is None else entry[0] - now
+
+    def incr(self, key, amount=1):
+        with self._lock:
+            entry = self._live(key, time.monotonic())
+            value = (entry[1] if entry else 0) + amount
+            self._data[key] = (entry[0] if entry else None, value)
+            self._data.move_to_end(key)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+# ============================================
+# REDIS
+# ============================================
+
+def _dumps(value):
+    return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _loads(data):
+    # incr() stores plain integers, everything else is a pickle
+    if isinstance(data, int):
+        return data
+    if data[:1] == b'\x80':
+        return pickle.loads(data)
+    return int(data)
+
+
+class RedisCache(BaseCache):
+    """Redis (or compatible) server shared by every worker and host"""
+
+    def __init__(self, url, prefix='medinfo:'):
+        super().__init__()
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_URL points at Redis but the 'redis' package is not installed")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def _key(self, key):
+        return self.prefix + key
+
+    def get(self, key, default=None):
+        data = self.client.get(self._key(key))
+        return default if data is None else _loads(data)
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self.client.mget([self._key(key) for key in keys])
+        return {key: _loads(data) for key, data in zip(keys, values) if data is not None}
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self._key(key), _dumps(value), px=None if ttl is None else int(ttl * 1000))
+
+    def set_many(self, mapping, ttl=None):
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in mapping.items():
+            pipe.set(self._key(key), _dumps(value), px=None if ttl is None else int(ttl * 1000))
+        pipe.execute()
+
+    def add(self, key, value, ttl=None):
+        return bool(self.client.set(
+            self._key(key), _dumps(value), nx=True,
+            px=None if ttl is None else int(ttl * 1000)
+        ))
+
+    def delete(self, key):
+        self.client.delete(self._key(key))
+
+    def ttl(self, key):
+        millis = self.client.pttl(self._key(key))
+        if millis == -2:
+            return None
+        return -1 if millis == -1 else millis / 1000
+
+    def incr(self, key, amount=1):
+        return self.client.incrby(self._key(key), amount)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+# ============================================
+# SQLITE FILE
+# ============================================
+
+class SQLiteCache(BaseCache):
+    """Single-file cache shared by all processes on one machine"""
+
+    # Sweep expired rows every this many writes
+    PURGE_EVERY = 100
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        with self._conn() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB, expires_at REAL)'
+            )
+
+    def _conn(self):
+        """One connection per thread (sqlite3 connections can't be shared)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _maybe_purge(self, conn):
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            conn.execute('DELETE FROM cache WHERE expires_at <= ?', (time.time(),))
+
+    @staticmethod
+    def _expiry(ttl):
+        return None if ttl is None else time.time() + ttl
+
+    def get(self, key, default=None):
+        row = self._conn().execute(
+            'SELECT value FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)',
+            (key, time.time())
+        ).fetchone()
+        return default if row is None else _loads(row[0])
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        rows = self._conn().execute(
+            f'SELECT key, value FROM cache WHERE key IN ({",".join("?" * len(keys))}) '
+            'AND (expires_at IS NULL OR expires_at > ?)',
+            (*keys, time.time())
+        ).fetchall()
+        return {key: _loads(value) for key, value in rows}
+
+    def set(self, key, value, ttl=None):
+        conn = self._conn()
+        conn.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)',
+            (key, _dumps(value), self._expiry(ttl))
+        )
+        self._maybe_purge(conn)
+
+    def set_many(self, mapping, ttl=None):
+        conn = self._conn()
+        expires_at = self._expiry(ttl)
+        conn.execute('BEGIN')
+        try:
+            conn.executemany(
+                'INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)',
+                [(key, _dumps(value), expires_at) for key, value in mapping.items()]
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def add(self, key, value, ttl=None):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM cache WHERE key = ? AND expires_at <= ?', (key, time.time()))
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO cache (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, _dumps(value), self._expiry(ttl))
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return cursor.rowcount == 1
+
+    def delete(self, key):
+        self._conn().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def ttl(self, key):
+        row = self._conn().execute(
+            'SELECT expires_at FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)',
+            (key, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        return -1 if row[0] is None else row[0] - time.time()
+
+    def incr(self, key, amount=1):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT value, expires_at FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)',
+                (key, time.time())
+            ).fetchone()
+            value = (_loads(row[0]) if row else 0) + amount
+            # Counters are stored as plain integers, like Redis INCR, which
+            # also keeps the key's expiry (a new counter never expires)
+            conn.execute(
+                'INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, value, row[1] if row else None)
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return value
+
+    def clear(self):
+        self._conn().execute('DELETE FROM cache')
+
+# ============================================
+# CONFIGURED CACHE
+# ============================================
+
+def from_url(url):
+    """Build a cache backend from a CACHE_URL style string"""
+    parsed = urlparse(url)
+    if parsed.scheme == 'memory':
+        options = parse_qs(parsed.query)
+        return MemoryCache(int(options.get('max_entries', ['1024'])[0]))
+    if parsed.scheme in ('redis', 'rediss', 'unix'):
+        return RedisCache(url)
+    if parsed.scheme == 'sqlite':
+        return SQLiteCache(parsed.path[1:])
+    raise ValueError(f"Unsupported CACHE_URL: {url}")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """The process-wide cache configured by CACHE_URL"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = from_url(CACHE_URL)
+    return _cache
@@ -2,11 +2,17 @@
 Helper Functions and Utilities
 File: utils/helpers.py
 """
+import logging
 import os
-from flask import session
+from flask import current_app, has_app_context, session
 from models.database import RESET_TOKENS, USERS_DATABASE
 from datetime import datetime, timedelta
 
+logger = logging.getLogger(__name__)
+
+# How long a password reset link works
+RESET_TOKEN_MINUTES = int(os.getenv('RESET_TOKEN_MINUTES', '30'))
+
 # ============================================
 # USER SESSION HELPERS
 # ============================================
@@ -26,40 +32,35 @@ def get_current_user():
 # PASSWORD RESET TOKEN HELPERS
 # ============================================
 def generate_reset_token(email):
-    """Generate a secure reset token using os.urandom"""
+    """Generate a secure reset token using os.urandom (only its hash is stored)"""
     token = os.urandom(32).hex()  # 64-char hex token
     RESET_TOKENS[token] = {
         "email": email,
-        "expires": datetime.now() + timedelta(minutes=30)
+        "expires": datetime.utcnow() + timedelta(minutes=RESET_TOKEN_MINUTES)
     }
     return token
 
 def send_reset_email(email, token):
-    """Simulate sending a password reset email"""
+    """Simulate sending a password reset email (the link itself is never logged in production)"""
     reset_link = f"http://example.com/reset_password?token={token}"
-    print(f"Sending password reset email to {email}")
-    print(f"Reset link: {reset_link}")
+    logger.info("Sending password reset email (simulated)",
+                extra={'expires_in_minutes': RESET_TOKEN_MINUTES})
+    if has_app_context() and current_app.debug:
+        logger.debug("Simulated reset link", extra={'reset_link': reset_link})
     
 def validate_reset_token(token):
-    """Check if reset token is valid and not expired"""
+    """Return the email for a valid, unexpired reset token (None otherwise)"""
     token_data = RESET_TOKENS.get(token)
-    if not token_data:
-        return None
-    
-    # Check if token is expired
-    expires = token_data.get('expires')
-    if expires and datetime.now() > expires:
-        # Token expired, remove it
-        del RESET_TOKENS[token]
-        return None
-    
-    # Token is valid, return associated email
-    return token_data.get('email')
+    return token_data.get('email') if token_data else None
+
+def consume_reset_token(token):
+    """Validate and use up a reset token in one step; returns the email or None"""
+    token_data = RESET_TOKENS.pop(token)
+    return token_data.get('email') if token_data else None
 
 def invalidate_reset_token(token):
     """Remove token after use"""
-    if token in RESET_TOKENS:
-        del RESET_TOKENS[token]
+    del RESET_TOKENS[token]
 
 # ============================================
 # USER DATABASE HELPERS
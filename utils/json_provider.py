@@ -0,0 +1,71 @@
+"""
+JSON Provider - Fast JSON for jsonify, tojson and the ASGI handlers
+File: utils/json_provider.py
+
+Documents straight from MongoDB can be returned as they are:
+
+    ObjectId    -> "65f0c0ffee..." (hex string)
+    datetime    -> "2026-01-31T09:15:00Z" (naive datetimes are UTC here;
+                   other offsets are kept, "2026-01-31T11:15:00+02:00")
+    Decimal128  -> "12.50" (string, like decimal.Decimal)
+
+orjson does the encoding when it is installed; otherwise the stdlib json
+module is used with the same conversions, so output is the same either way.
+"""
+
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from datetime import datetime, timezone
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
+# dumps() arguments orjson can honour; anything else goes to the stdlib
+_ORJSON_KWARGS = {'indent', 'separators', 'sort_keys', 'ensure_ascii', 'default'}
+
+
+def mongo_default(o):
+    """Encode the BSON and datetime values json can't handle by itself"""
+    if isinstance(o, ObjectId):
+        return str(o)
+    if isinstance(o, datetime):
+        # Same as orjson with OPT_NAIVE_UTC | OPT_UTC_Z
+        if o.tzinfo is None:
+            o = o.replace(tzinfo=timezone.utc)
+        return o.isoformat().replace('+00:00', 'Z')
+    if isinstance(o, Decimal128):
+        return str(o.to_decimal())
+    return DefaultJSONProvider.default(o)
+
+
+class MongoJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that understands MongoDB documents"""
+
+    default = staticmethod(mongo_default)
+
+    # Key order follows the document; sorting every response costs time
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and kwargs.keys() <= _ORJSON_KWARGS:
+            option = ORJSON_OPTIONS
+            if kwargs.get('indent'):
+                option |= orjson.OPT_INDENT_2
+            if kwargs.get('sort_keys', self.sort_keys):
+                option |= orjson.OPT_SORT_KEYS
+            try:
+                return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option).decode()
+            except TypeError:
+                pass  # Integers over 64 bits, non-string keys... the stdlib copes
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
@@ -0,0 +1,210 @@
+"""
+LM Backend Pool - Load balancing across OpenAI-compatible servers
+File: utils/lm_pool.py
+
+Configure one or more chat completion endpoints with LM_BACKENDS, each with
+an optional concurrency limit after a '|':
+
+    LM_BACKENDS="http://gpu1:1234/v1/chat/completions|2,http://gpu2:1234/v1/chat/completions|4"
+
+Requests go to the healthy backend with the fewest outstanding requests
+(relative to its limit). A backend is ejected after LM_EJECT_AFTER
+consecutive failures or a failed health probe, and reinstated once a probe
+succeeds after LM_EJECT_SECONDS.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+LM_BACKEND_CONCURRENCY = int(os.getenv('LM_BACKEND_CONCURRENCY', '2'))
+LM_PROBE_INTERVAL = float(os.getenv('LM_PROBE_INTERVAL', '15'))
+LM_EJECT_AFTER = int(os.getenv('LM_EJECT_AFTER', '3'))
+LM_EJECT_SECONDS = float(os.getenv('LM_EJECT_SECONDS', '30'))
+
+
+class LMBackend:
+    """One model server and its live routing state"""
+
+    def __init__(self, url, max_concurrency):
+        self.url = url
+        self.max_concurrency = max_concurrency
+        self.outstanding = 0
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.probe_latency_ms = None
+
+    def available(self, now):
+        return self.healthy and now >= self.ejected_until and self.outstanding < self.max_concurrency
+
+    def status(self):
+        return {
+            'url': self.url,
+            'healthy': self.healthy,
+            'ejected': time.monotonic() < self.ejected_until,
+            'outstanding': self.outstanding,
+            'max_concurrency': self.max_concurrency,
+            'probe_latency_ms': self.probe_latency_ms,
+        }
+
+
+class LMBackendPool:
+    """Least-outstanding-requests router with health probes and ejection"""
+
+    def __init__(self, backends, probe):
+        """
+        Args:
+            backends (list): LMBackend objects
+            probe (callable): probe(url) -> bool, used by the health checker
+        """
+        self.backends = backends
+        self.probe = probe
+        self._condition = threading.Condition()
+        self._checker_started = False
+
+    @classmethod
+    def from_env(cls, default_url, probe):
+        """Build the pool from LM_BACKENDS, falling back to a single default_url"""
+        backends = []
+        for entry in os.getenv('LM_BACKENDS', default_url).split(','):
+            entry = entry.strip()
+            if not entry:
+                continue
+            url, _, limit = entry.partition('|')
+            backends.append(LMBackend(url.strip(), int(limit or LM_BACKEND_CONCURRENCY)))
+        return cls(backends, probe)
+
+    # ============================================
+    # ROUTING
+    # ============================================
+
+    def _pick(self):
+        """Choose a backend (caller holds the lock) and reserve a slot on it"""
+        now = time.monotonic()
+        candidates = [b for b in self.backends if b.available(now)]
+        if not candidates:
+            return None
+        lowest = min(b.outstanding / b.max_concurrency for b in candidates)
+        backend = random.choice([
+            b for b in candidates if b.outstanding / b.max_concurrency == lowest
+        ])
+        backend.outstanding += 1
+        metrics.LM_BACKEND_OUTSTANDING.labels(backend.url).inc()
+        return backend
+
+    def try_acquire(self):
+        """
+        Reserve a slot on the best backend without waiting
+
+        Returns:
+            LMBackend: Backend to use (call release() afterwards) or None
+        """
+        self.start_health_checks()
+        with self._condition:
+            return self._pick()
+
+    def acquire(self, timeout=None):
+        """
+        Reserve a slot on the best backend, waiting for capacity if needed
+
+        Args:
+            timeout (float): Seconds to wait, None waits forever
+
+        Returns:
+            LMBackend: Backend to use (call release() afterwards) or None on timeout
+        """
+        self.start_health_checks()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                backend = self._pick()
+                if backend is not None:
+                    return backend
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                # Wake up periodically in case an ejection period runs out
+                self._condition.wait(min(remaining or 1.0, 1.0))
+
+    def release(self, backend, ok):
+        """
+        Return a slot and record whether the request reached the backend
+
+        Args:
+            backend (LMBackend): Backend returned by acquire()
+            ok (bool): False for connection errors, timeouts and 5xx answers
+        """
+        with self._condition:
+            backend.outstanding -= 1
+            metrics.LM_BACKEND_OUTSTANDING.labels(backend.url).dec()
+            if ok:
+                backend.consecutive_failures = 0
+            else:
+                backend.consecutive_failures += 1
+                if backend.consecutive_failures >= LM_EJECT_AFTER:
+                    self._eject(backend)
+            self._condition.notify_all()
+
+    def _eject(self, backend):
+        logger.warning("Ejecting LM backend", extra={'backend': backend.url, 'seconds': LM_EJECT_SECONDS})
+        backend.healthy = False
+        backend.ejected_until = time.monotonic() + LM_EJECT_SECONDS
+        metrics.LM_BACKEND_HEALTHY.labels(backend.url).set(0)
+
+    # ============================================
+    # HEALTH CHECKS
+    # ============================================
+
+    def probe_all(self):
+        """Probe every backend once, ejecting or reinstating as needed"""
+        for backend in self.backends:
+            start = time.perf_counter()
+            ok = self.probe(backend.url)
+            latency_ms = round((time.perf_counter() - start) * 1000, 1)
+
+            with self._condition:
+                backend.probe_latency_ms = latency_ms
+                if not ok:
+                    if backend.healthy:
+                        self._eject(backend)
+                elif not backend.healthy and time.monotonic() >= backend.ejected_until:
+                    logger.info("Reinstating LM backend", extra={'backend': backend.url})
+                    backend.healthy = True
+                    backend.consecutive_failures = 0
+                    metrics.LM_BACKEND_HEALTHY.labels(backend.url).set(1)
+                    self._condition.notify_all()
+
+    def _health_loop(self):
+        while True:
+            try:
+                self.probe_all()
+            except Exception:
+                logger.exception("LM health check error")
+            time.sleep(LM_PROBE_INTERVAL)
+
+    def start_health_checks(self):
+        """Start the background prober (once per process, on first use)"""
+        if self._checker_started:
+            return
+        with self._condition:
+            if self._checker_started:
+                return
+            self._checker_started = True
+        for backend in self.backends:
+            metrics.LM_BACKEND_HEALTHY.labels(backend.url).set(1)
+        threading.Thread(target=self._health_loop, name='lm-health', daemon=True).start()
+
+    def any_healthy(self):
+        now = time.monotonic()
+        return any(b.healthy and now >= b.ejected_until for b in self.backends)
+
+    def status(self):
+        with self._condition:
+            return [backend.status() for backend in self.backends]
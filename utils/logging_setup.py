@@ -0,0 +1,149 @@
+"""
+Structured Logging - JSON logs written by a background thread
+File: utils/logging_setup.py
+
+Every module logs through `logging.getLogger(__name__)`. Records are put on a
+queue by the request thread and formatted/written as one JSON object per
+line by a listener thread, so a slow stdout or log collector never blocks a
+request. If the queue is full, records are dropped and counted.
+
+Environment:
+    LOG_LEVEL       root level (default INFO)
+    LOG_LEVELS      per-module levels, e.g. "models.user_collections=WARNING,utils.ai_service=DEBUG"
+    LOG_SAMPLE_RATE share of high-volume events that are kept (default 0.1)
+    LOG_QUEUE_SIZE  records buffered before dropping (default 10000)
+
+High-volume call sites pass `extra=SAMPLED` to be sampled at LOG_SAMPLE_RATE.
+"""
+
+from flask import g, has_request_context, request
+from logging.handlers import QueueHandler, QueueListener
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import time
+import uuid
+
+LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', '0.1'))
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+# Pass as extra= on high-volume events to keep only a sample of them
+SAMPLED = {'sample_rate': LOG_SAMPLE_RATE}
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the standard fields plus any extra= fields"""
+
+    converter = time.gmtime
+
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key != 'sample_rate':
+                entry[key] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class RequestContextFilter(logging.Filter):
+    """Tag records with the current request ID (runs in the calling thread)"""
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = getattr(g, 'request_id', None)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep records that carry a sample_rate only with that probability"""
+
+    def filter(self, record):
+        rate = getattr(record, 'sample_rate', None)
+        return rate is None or random.random() < rate
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks: when the queue is full the record is dropped"""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+    def prepare(self, record):
+        # Render exceptions here, the traceback objects can't cross threads safely
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _parse_levels(spec):
+    """'a.b=WARNING,c=DEBUG' -> {'a.b': 'WARNING', 'c': 'DEBUG'}"""
+    levels = {}
+    for part in spec.split(','):
+        if '=' in part:
+            name, level = part.split('=', 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging():
+    """Install the queue handler on the root logger (safe to call more than once)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    queue_handler = DroppingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    queue_handler.addFilter(SamplingFilter())
+    queue_handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+    for name, level in _parse_levels(os.getenv('LOG_LEVELS', '')).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = QueueListener(queue_handler.queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def assign_request_id():
+    """Set g.request_id from X-Request-ID (if sent) or a new random ID"""
+    g.request_id = request.headers.get('X-Request-ID', '')[:64] or uuid.uuid4().hex
+
+
+def init_app(app):
+    """Assign every request an ID (or reuse X-Request-ID) and echo it back"""
+    app.before_request(assign_request_id)
+
+    @app.after_request
+    def add_request_id_header(response):
+        request_id = getattr(g, 'request_id', None)
+        if request_id:
+            response.headers['X-Request-ID'] = request_id
+        return response
@@ -0,0 +1,216 @@
+"""
+Metrics - Prometheus instrumentation
+File: utils/metrics.py
+
+Exposes /metrics with:
+- request latency histograms and status counters per blueprint/route
+- MongoDB command durations by collection and operation (pymongo CommandListener)
+- LM Studio latency, token counts, failure reasons and mid-stream aborts
+- AI generations in progress and cache hit/miss counters
+- requests rejected by the rate limiter
+
+Under gunicorn set PROMETHEUS_MULTIPROC_DIR to an empty, writable directory
+so the numbers from all workers are combined.
+
+IMPORTANT: import this module before any MongoClient is created, pymongo
+only attaches global listeners to clients created after registration.
+"""
+
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram,
+    generate_latest, multiprocess, REGISTRY
+)
+from pymongo import monitoring
+import os
+import time
+
+# ============================================
+# METRIC DEFINITIONS
+# ============================================
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'medinfo_http_request_duration_seconds',
+    'Time spent handling a request',
+    ['blueprint', 'endpoint', 'method']
+)
+HTTP_REQUESTS_TOTAL = Counter(
+    'medinfo_http_requests_total',
+    'Requests handled, by response status',
+    ['blueprint', 'endpoint', 'method', 'status']
+)
+
+MONGO_COMMAND_SECONDS = Histogram(
+    'medinfo_mongo_command_duration_seconds',
+    'MongoDB command round trip time',
+    ['collection', 'command'],
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5)
+)
+MONGO_COMMAND_FAILURES = Counter(
+    'medinfo_mongo_command_failures_total',
+    'MongoDB commands that returned an error',
+    ['collection', 'command']
+)
+
+LM_REQUEST_SECONDS = Histogram(
+    'medinfo_lm_request_duration_seconds',
+    'LM Studio generation time',
+    buckets=(1, 2.5, 5, 10, 20, 30, 60, 90, 120, 180)
+)
+LM_TOKENS = Counter(
+    'medinfo_lm_tokens_total',
+    'Tokens reported by LM Studio',
+    ['kind']
+)
+LM_FAILURES = Counter(
+    'medinfo_lm_failures_total',
+    'Failed LM Studio generations',
+    ['reason']
+)
+LM_STREAM_ABORTS = Counter(
+    'medinfo_lm_stream_aborts_total',
+    'Streamed generations cancelled part way because the answer was invalid',
+    ['reason']
+)
+
+LM_BACKEND_OUTSTANDING = Gauge(
+    'medinfo_lm_backend_outstanding_requests',
+    'Requests in flight per LM backend',
+    ['backend'],
+    multiprocess_mode='livesum'
+)
+LM_BACKEND_HEALTHY = Gauge(
+    'medinfo_lm_backend_healthy',
+    'Whether an LM backend is in rotation (1) or ejected (0)',
+    ['backend'],
+    multiprocess_mode='livemin'
+)
+
+AI_GENERATIONS_IN_PROGRESS = Gauge(
+    'medinfo_ai_generations_in_progress',
+    'Medicine generations currently waiting on LM Studio',
+    multiprocess_mode='livesum'
+)
+
+CACHE_REQUESTS = Counter(
+    'medinfo_cache_requests_total',
+    'Cache lookups, by result (hit/miss)',
+    ['cache', 'result']
+)
+
+RATE_LIMITED = Counter(
+    'medinfo_rate_limited_total',
+    'Requests turned away with a 429, by route class',
+    ['route_class']
+)
+
+
+def record_cache(cache_name, hit):
+    """Count a cache hit or miss"""
+    CACHE_REQUESTS.labels(cache_name, 'hit' if hit else 'miss').inc()
+
+
+def record_lm_failure(reason):
+    """Count a failed LM Studio generation"""
+    LM_FAILURES.labels(reason).inc()
+
+
+def record_lm_abort(reason, completion_tokens):
+    """Count a generation cancelled mid-stream and the tokens spent on it"""
+    LM_STREAM_ABORTS.labels(reason).inc()
+    LM_TOKENS.labels('aborted').inc(completion_tokens)
+
+
+def record_lm_usage(usage):
+    """Count tokens from the 'usage' block of a chat completion"""
+    if not usage:
+        return
+    LM_TOKENS.labels('prompt').inc(usage.get('prompt_tokens', 0))
+    LM_TOKENS.labels('completion').inc(usage.get('completion_tokens', 0))
+
+
+def record_request(blueprint, endpoint, method, status, seconds):
+    """Record one handled request (also used by the ASGI handlers)"""
+    HTTP_REQUEST_SECONDS.labels(blueprint, endpoint, method).observe(seconds)
+    HTTP_REQUESTS_TOTAL.labels(blueprint, endpoint, method, str(status)).inc()
+
+# ============================================
+# MONGODB COMMAND LISTENER
+# ============================================
+
+# Commands whose first value is not a collection name
+_NO_COLLECTION_COMMANDS = {'ping', 'hello', 'ismaster', 'isMaster', 'buildInfo',
+                           'endSessions', 'saslStart', 'saslContinue', 'listDatabases'}
+
+
+def command_collection(event):
+    """Work out which collection a CommandStartedEvent targets"""
+    if event.command_name == 'getMore':
+        return str(event.command.get('collection', 'unknown'))
+    if event.command_name in _NO_COLLECTION_COMMANDS:
+        return 'none'
+    value = event.command.get(event.command_name)
+    return value if isinstance(value, str) else 'none'
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Times every MongoDB command by collection and operation"""
+
+    def __init__(self):
+        self._pending = {}  # request_id -> collection
+
+    def started(self, event):
+        self._pending[event.request_id] = command_collection(event)
+
+    def succeeded(self, event):
+        collection = self._pending.pop(event.request_id, 'unknown')
+        MONGO_COMMAND_SECONDS.labels(collection, event.command_name).observe(
+            event.duration_micros / 1_000_000
+        )
+
+    def failed(self, event):
+        collection = self._pending.pop(event.request_id, 'unknown')
+        MONGO_COMMAND_SECONDS.labels(collection, event.command_name).observe(
+            event.duration_micros / 1_000_000
+        )
+        MONGO_COMMAND_FAILURES.labels(collection, event.command_name).inc()
+
+
+monitoring.register(MongoCommandMetrics())
+
+# ============================================
+# FLASK INTEGRATION
+# ============================================
+
+def _registry():
+    """Registry to export: merged across workers in multiprocess mode"""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def init_app(app):
+    """Register request timing hooks and the /metrics endpoint"""
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            record_request(
+                request.blueprint or 'app',
+                request.endpoint or 'unmatched',
+                request.method,
+                response.status_code,
+                time.perf_counter() - started
+            )
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(generate_latest(_registry()), mimetype=CONTENT_TYPE_LATEST)
@@ -0,0 +1,87 @@
+"""
+Rendered Page Cache - Anonymous Medicine Pages
+File: utils/page_cache.py
+
+Keeps the rendered HTML of /medicine/<name> for visitors without a session,
+in the shared cache (utils/cache.py) so every worker can serve it.
+Entries are keyed by medicine name plus a version token. Any review write
+or medicine update replaces the token, so old HTML is never served again and
+simply expires (or falls out of the LRU).
+
+With the per-process memory:// backend a new version only reaches the
+worker that made the write, so pages are kept for at most
+cache.LOCAL_CACHE_MAX_TTL there instead of PAGE_CACHE_TTL.
+"""
+
+import os
+import uuid
+
+from utils import metrics
+from utils.cache import get_cache
+
+# How long a rendered page is kept
+PAGE_CACHE_TTL = int(os.getenv('PAGE_CACHE_TTL', '3600'))
+
+
+def _key_name(medicine_name):
+    """Normalise a medicine name the same way reviews and favorites store it"""
+    return medicine_name.strip().lower()
+
+
+def _version_key(name):
+    return f'page_version:{name}'
+
+
+def get_version(medicine_name):
+    """Current content/review version of a medicine"""
+    cache = get_cache()
+    key = _version_key(_key_name(medicine_name))
+    version = cache.get(key)
+    if version is None:
+        # First use (or evicted): start a fresh version no old page can match
+        cache.add(key, uuid.uuid4().hex)
+        version = cache.get(key)
+    return version
+
+
+def get_page(medicine_name):
+    """
+    Get cached HTML for a medicine page
+
+    Args:
+        medicine_name (str): Medicine name
+
+    Returns:
+        str: Rendered HTML or None if not cached
+    """
+    name = _key_name(medicine_name)
+    html = get_cache().get(f'page:{name}:{get_version(name)}')
+    metrics.record_cache('medicine_page', html is not None)
+    return html
+
+
+def set_page(medicine_name, html, version):
+    """
+    Store rendered HTML for a medicine page
+
+    Args:
+        medicine_name (str): Medicine name
+        html (str): Rendered page
+        version (str): Version read before the page data was fetched
+    """
+    name = _key_name(medicine_name)
+    # Data changed while we were rendering - don't cache stale HTML
+    if get_version(name) != version:
+        return
+    cache = get_cache()
+    cache.set(f'page:{name}:{version}', html, cache.bounded_ttl(PAGE_CACHE_TTL))
+
+
+def invalidate(medicine_name):
+    """Give a medicine a new version so its cached page is no longer used"""
+    cache = get_cache()
+    name = _key_name(medicine_name)
+    old_version = cache.get(_version_key(name))
+    cache.set(_version_key(name), uuid.uuid4().hex)
+    if old_version is not None:
+        cache.delete(f'page:{name}:{old_version}')
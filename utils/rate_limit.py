@@ -0,0 +1,232 @@
+"""
+Rate Limiting - Token buckets and an LM generation cap shared by all workers
+File: utils/rate_limit.py
+
+Expensive endpoints are grouped into route classes. Each class has its own
+token bucket per client (the logged-in user, otherwise the IP address):
+
+    ai      starting an AI generation for an unknown medicine
+    review  posting a review
+    login   login attempts
+    export  downloading a copy of your own data
+
+Buckets live in the `rate_limits` collection and are refilled and spent in
+one atomic update, so limits hold across gunicorn workers. Limits are
+"capacity/seconds": RATE_LIMIT_AI="5/300" allows a burst of 5 generations,
+refilled at 5 per 300 seconds.
+
+On top of that, at most LM_MAX_GENERATIONS generations run at once across
+all workers. Each running generation holds a lease in `lm_generation_slots`
+that expires by itself if its worker dies.
+
+If MongoDB can't be reached the limiter lets requests through rather than
+turning a database hiccup into an outage.
+"""
+
+from flask import g, jsonify, request, session
+from functools import wraps
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+import logging
+import math
+import os
+import uuid
+
+from utils import metrics
+from utils.ai_service import LM_GENERATION_MAX_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Turns off the per-client buckets (the generation cap always applies)
+RATE_LIMITS_ENABLED = os.getenv('RATE_LIMITS_ENABLED', 'true').lower() == 'true'
+
+DEFAULT_LIMITS = {
+    'ai': '5/300',
+    'review': '10/60',
+    'login': '10/300',
+    'export': '3/3600',
+}
+
+# Global cap on generations in flight, and how long a lease lives if its
+# worker never releases it: longer than the slowest possible generation
+# (backend wait plus every repair attempt), so a lease can't lapse while
+# its generation is still running
+LM_MAX_GENERATIONS = int(os.getenv('LM_MAX_GENERATIONS', '4'))
+LM_SLOT_LEASE_SECONDS = max(
+    int(os.getenv('LM_SLOT_LEASE_SECONDS', '0')),
+    LM_GENERATION_MAX_SECONDS + 60
+)
+
+# Retry-After sent when every generation slot is taken
+LM_SLOT_RETRY_AFTER = 15
+
+
+def _parse_limit(spec):
+    """'5/300' -> (5.0, 300.0)"""
+    capacity, _, seconds = spec.partition('/')
+    return float(capacity), float(seconds)
+
+
+LIMITS = {
+    route_class: _parse_limit(os.getenv(f'RATE_LIMIT_{route_class.upper()}', default))
+    for route_class, default in DEFAULT_LIMITS.items()
+}
+
+_indexes_ready = False
+
+
+def _db():
+    """Shared database (imported lazily so this module has no import-time connection)"""
+    global _indexes_ready
+    from models.database import db
+    if not _indexes_ready:
+        db['rate_limits'].create_index('expires_at', expireAfterSeconds=0)
+        _indexes_ready = True
+    return db
+
+# ============================================
+# TOKEN BUCKETS
+# ============================================
+
+def client_key():
+    """Who a request counts against: the logged-in or token user, otherwise the IP"""
+    email = session.get('email') or g.get('api_email')
+    if email:
+        return 'user:' + email
+    return 'ip:' + (request.remote_addr or 'unknown')
+
+
+def consume(route_class, key):
+    """
+    Take one token from a client's bucket
+
+    Args:
+        route_class (str): One of LIMITS
+        key (str): Client key, see client_key()
+
+    Returns:
+        int: 0 if the request may proceed, otherwise seconds until it may retry
+    """
+    capacity, period = LIMITS[route_class]
+    rate = capacity / period  # tokens per second
+
+    # Refill for the time since the last request (server clock, so all
+    # workers agree), capped at the bucket size
+    refilled = {'$min': [capacity, {'$add': [
+        {'$ifNull': ['$tokens', capacity]},
+        {'$multiply': [rate, {'$divide': [
+            {'$subtract': ['$$NOW', {'$ifNull': ['$updated_at', '$$NOW']}]}, 1000
+        ]}]}
+    ]}]}
+    has_token = {'$gte': ['$tokens', 1]}
+
+    try:
+        bucket = _db()['rate_limits'].find_one_and_update(
+            {'_id': f'{route_class}:{key}'},
+            [
+                {'$set': {'tokens': refilled, 'updated_at': '$$NOW'}},
+                {'$set': {
+                    'allowed': has_token,
+                    'tokens': {'$cond': [has_token, {'$subtract': ['$tokens', 1]}, '$tokens']},
+                    # A bucket left alone this long is full again, so it can go
+                    'expires_at': {'$add': ['$$NOW', int(period * 1000)]},
+                }},
+            ],
+            projection={'allowed': 1, 'tokens': 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except Exception:
+        logger.warning("Rate limiter unavailable, allowing request", exc_info=True)
+        return 0
+
+    if bucket['allowed']:
+        return 0
+    return max(1, math.ceil((1 - bucket['tokens']) / rate))
+
+
+def check(route_class):
+    """
+    Spend a token for the current request
+
+    Returns:
+        int: 0 if allowed, otherwise the Retry-After value in seconds
+    """
+    if not RATE_LIMITS_ENABLED:
+        return 0
+    retry_after = consume(route_class, client_key())
+    if retry_after:
+        metrics.RATE_LIMITED.labels(route_class).inc()
+        logger.info("Rate limited", extra={'route_class': route_class, 'retry_after': retry_after})
+    return retry_after
+
+
+def too_many_requests(retry_after, message='Too many requests, please try again later'):
+    """429 JSON response with a Retry-After header"""
+    response = jsonify({'success': False, 'message': message})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+def rate_limited(route_class):
+    """Decorator: answer 429 instead of running the view when over the limit"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            retry_after = check(route_class)
+            if retry_after:
+                return too_many_requests(retry_after)
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# ============================================
+# GLOBAL LM GENERATION SLOTS
+# ============================================
+
+def acquire_generation_slot(reserve=0):
+    """
+    Reserve one of the LM_MAX_GENERATIONS generation slots
+
+    Args:
+        reserve (int): Only take a slot if this many would still be free
+            afterwards (background work leaves room for users)
+
+    Returns:
+        str: Lease ID to pass to release_generation_slot(), or None if all
+        slots are taken
+    """
+    lease_id = uuid.uuid4().hex
+    live_leases = {'$filter': {
+        'input': {'$ifNull': ['$leases', []]},
+        'cond': {'$gt': ['$$this.expires_at', '$$NOW']}
+    }}
+    try:
+        # Only matches while fewer than the cap are live. If the document
+        # exists but is full, the upsert collides on _id instead.
+        _db()['lm_generation_slots'].update_one(
+            {'_id': 'global', '$expr': {'$lt': [{'$size': live_leases}, LM_MAX_GENERATIONS - reserve]}},
+            [{'$set': {'leases': {'$concatArrays': [live_leases, [{
+                'id': lease_id,
+                'expires_at': {'$add': ['$$NOW', LM_SLOT_LEASE_SECONDS * 1000]}
+            }]]}}}],
+            upsert=True
+        )
+    except DuplicateKeyError:
+        metrics.RATE_LIMITED.labels('lm_slots').inc()
+        return None
+    except Exception:
+        logger.warning("Generation slots unavailable, allowing generation", exc_info=True)
+    return lease_id
+
+
+def release_generation_slot(lease_id):
+    """Give a generation slot back"""
+    try:
+        _db()['lm_generation_slots'].update_one(
+            {'_id': 'global'},
+            {'$pull': {'leases': {'id': lease_id}}}
+        )
+    except Exception:
+        logger.warning("Could not release generation slot", exc_info=True)
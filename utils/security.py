@@ -1,21 +1,56 @@
 """
 Security utilities for password hashing and JWT tokens
 File: utils/security.py
+
+API tokens (see routes/api_v1.py) are verified once and then remembered in
+a small LRU keyed by the token string, so a client repeating the same
+token skips the HMAC check and decoding until the token expires.
+Revocation works through a denylist of token IDs (jti) in the
+revoked_tokens collection. Entries expire with the token they revoke, so
+the list stays small, and each worker re-reads it every
+DENYLIST_REFRESH_SECONDS.
 """
 
 import bcrypt
 import jwt
+from collections import OrderedDict
 from datetime import datetime, timedelta
+import logging
 import os
+import threading
+import time
+import uuid
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Get secret key from environment
-SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-change-this')
+logger = logging.getLogger(__name__)
+
+# Get secret key from environment (there is deliberately no default: a
+# public fallback key would let anyone sign API tokens)
+SECRET_KEY = os.getenv('SECRET_KEY')
+PLACEHOLDER_SECRET_KEYS = ('', 'your-secret-key-change-this', 'change-me')
 JWT_ALGORITHM = 'HS256'
 JWT_EXPIRATION_HOURS = 24
 
+# Verified tokens remembered per process
+VERIFIED_TOKEN_CACHE_SIZE = int(os.getenv('VERIFIED_TOKEN_CACHE_SIZE', '2048'))
+
+# How stale a worker's copy of the denylist may get
+DENYLIST_REFRESH_SECONDS = float(os.getenv('DENYLIST_REFRESH_SECONDS', '30'))
+
+
+def require_secret_key(secret_key=SECRET_KEY):
+    """
+    The key that signs sessions and API tokens
+    
+    Raises:
+        RuntimeError: SECRET_KEY is unset or still a placeholder
+    """
+    if not secret_key or secret_key.strip() in PLACEHOLDER_SECRET_KEYS:
+        raise RuntimeError("SECRET_KEY is not set; refusing to sign or verify tokens")
+    return secret_key
+
 # ============================================
 # PASSWORD HASHING WITH BCRYPT
 # ============================================
@@ -50,7 +85,7 @@ def verify_password(password, hashed_password):
     try:
         return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
     except Exception as e:
-        print(f"Error verifying password: {e}")
+        logger.warning("Error verifying password: %s", e)
         return False
 
 
@@ -67,14 +102,18 @@ def generate_token(user_email):
     
     Returns:
         str: JWT token
+    
+    Raises:
+        RuntimeError: SECRET_KEY is unset or a placeholder
     """
     payload = {
         'email': user_email,
         'exp': datetime.utcnow() + timedelta(hours=JWT_EXPIRATION_HOURS),
-        'iat': datetime.utcnow()
+        'iat': datetime.utcnow(),
+        'jti': uuid.uuid4().hex
     }
     
-    token = jwt.encode(payload, SECRET_KEY, algorithm=JWT_ALGORITHM)
+    token = jwt.encode(payload, require_secret_key(), algorithm=JWT_ALGORITHM)
     return token
 
 
@@ -86,17 +125,112 @@ def verify_token(token):
         token (str): JWT token
     
     Returns:
-        dict: Decoded payload if valid, None if invalid
+        dict: Decoded payload if valid, None if invalid, expired or revoked
+    
+    Raises:
+        RuntimeError: SECRET_KEY is unset or a placeholder
     """
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[JWT_ALGORITHM])
-        return payload
-    except jwt.ExpiredSignatureError:
-        print("Token has expired")
-        return None
-    except jwt.InvalidTokenError:
-        print("Invalid token")
+    payload = _verified_tokens.get(token)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, require_secret_key(), algorithms=[JWT_ALGORITHM])
+        except jwt.ExpiredSignatureError:
+            logger.debug("Token has expired")
+            return None
+        except jwt.InvalidTokenError:
+            logger.debug("Invalid token")
+            return None
+        _verified_tokens.put(token, payload)
+
+    if payload.get('jti') in _denylist.current():
+        logger.debug("Token has been revoked")
         return None
+    return payload
+
+
+def revoke_token(payload):
+    """
+    Revoke a token everywhere (other workers notice within DENYLIST_REFRESH_SECONDS)
+    
+    Args:
+        payload (dict): Payload returned by verify_token()
+    """
+    jti = payload.get('jti')
+    if not jti:
+        return  # Tokens from before jti can only expire
+    _denylist.add(jti, datetime.utcfromtimestamp(payload['exp']))
+
+
+class _VerifiedTokenCache:
+    """LRU of token -> payload for tokens whose signature already checked out"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            payload = self._entries.get(token)
+            if payload is None:
+                return None
+            if payload['exp'] <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return payload
+
+    def put(self, token, payload):
+        with self._lock:
+            self._entries[token] = payload
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class _Denylist:
+    """Revoked token IDs, stored in MongoDB and mirrored in each process"""
+
+    def __init__(self):
+        self._jtis = frozenset()
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._collection = None
+
+    def _revoked_tokens(self):
+        if self._collection is None:
+            from models.database import db
+            collection = db['revoked_tokens']
+            collection.create_index('expires_at', expireAfterSeconds=0)
+            self._collection = collection
+        return self._collection
+
+    def current(self):
+        """Revoked jtis, re-read when the local copy is older than the refresh interval"""
+        if time.monotonic() - self._loaded_at < DENYLIST_REFRESH_SECONDS:
+            return self._jtis
+        with self._lock:
+            if time.monotonic() - self._loaded_at >= DENYLIST_REFRESH_SECONDS:
+                try:
+                    self._jtis = frozenset(
+                        doc['_id'] for doc in self._revoked_tokens().find({}, {'_id': 1})
+                    )
+                except Exception:
+                    logger.warning("Could not refresh token denylist", exc_info=True)
+                # On failure keep the old copy and retry after the interval
+                self._loaded_at = time.monotonic()
+        return self._jtis
+
+    def add(self, jti, expires_at):
+        self._revoked_tokens().update_one(
+            {'_id': jti}, {'$set': {'expires_at': expires_at}}, upsert=True
+        )
+        with self._lock:
+            self._jtis = self._jtis | {jti}
+
+
+_verified_tokens = _VerifiedTokenCache(VERIFIED_TOKEN_CACHE_SIZE)
+_denylist = _Denylist()
 
 
 # ============================================
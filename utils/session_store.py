@@ -0,0 +1,159 @@
+"""
+Server-Side Sessions - MongoDB Session Storage
+File: utils/session_store.py
+
+The cookie only carries an opaque random session ID. Session data lives in
+the `sessions` collection (expired documents are removed by a TTL index) and
+recently used sessions are kept in the shared cache (utils/cache.py) so most
+requests don't need a database round trip.
+
+Call rotate_session() whenever a request logs a user in: the data moves to a
+fresh session ID and the old one is deleted, so an ID planted in a victim's
+browser before login (session fixation) is worthless afterwards.
+"""
+
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+from datetime import datetime, timedelta
+import os
+import secrets
+
+from utils import metrics
+from utils.cache import get_cache
+
+# How long a session may be served from the cache before re-reading MongoDB
+SESSION_CACHE_TTL = float(os.getenv('SESSION_CACHE_TTL', '5'))
+
+# Only push the expiry forward when it is this far out of date
+SESSION_REFRESH_SECONDS = int(os.getenv('SESSION_REFRESH_SECONDS', '3600'))
+
+
+def _new_sid():
+    return secrets.token_urlsafe(32)
+
+
+def rotate_session(session):
+    """Give the session a fresh ID after a login (no-op for cookie sessions)"""
+    rotate = getattr(session, 'rotate', None)
+    if rotate is not None:
+        rotate()
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session dict that remembers its ID and whether it was changed"""
+
+    def __init__(self, initial=None, sid=None, new=False, expires_at=None):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.expires_at = expires_at
+        self.modified = False
+        self.previous_sid = None
+
+    def rotate(self):
+        """Move the data to a fresh session ID; the old one is deleted on save"""
+        if not self.new and self.previous_sid is None:
+            self.previous_sid = self.sid
+        self.sid = _new_sid()
+        self.new = True
+        self.modified = True
+
+
+class MongoSessionInterface(SessionInterface):
+    """Flask session interface that stores session data in MongoDB"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.collection.create_index('expires_at', expireAfterSeconds=0)
+
+    # ============================================
+    # HOT CACHE
+    # ============================================
+
+    def _cache_get(self, sid):
+        entry = get_cache().get('session:' + sid)
+        if entry is None:
+            return None
+        data, expires_at = entry
+        return dict(data), expires_at
+
+    def _cache_set(self, sid, data, expires_at):
+        get_cache().set('session:' + sid, (dict(data), expires_at), SESSION_CACHE_TTL)
+
+    def _cache_delete(self, sid):
+        get_cache().delete('session:' + sid)
+
+    # ============================================
+    # SESSION INTERFACE
+    # ============================================
+
+    def _new_session(self):
+        return ServerSideSession(sid=_new_sid(), new=True)
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if not sid:
+            return self._new_session()
+
+        cached = self._cache_get(sid)
+        metrics.record_cache('session', cached is not None)
+        if cached is not None:
+            data, expires_at = cached
+            if expires_at > datetime.utcnow():
+                return ServerSideSession(data, sid=sid, expires_at=expires_at)
+
+        doc = self.collection.find_one({'_id': sid})
+        if not doc or doc['expires_at'] <= datetime.utcnow():
+            return self._new_session()
+
+        self._cache_set(sid, doc['data'], doc['expires_at'])
+        return ServerSideSession(doc['data'], sid=sid, expires_at=doc['expires_at'])
+
+    def save_session(self, app, session, response):
+        cookie_name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        # Rotated (login) - the old ID must stop working
+        if session.previous_sid:
+            self.collection.delete_one({'_id': session.previous_sid})
+            self._cache_delete(session.previous_sid)
+            session.previous_sid = None
+
+        # Session was emptied (logout) - remove it everywhere
+        if not session:
+            if not session.new and session.modified:
+                self.collection.delete_one({'_id': session.sid})
+                self._cache_delete(session.sid)
+                response.delete_cookie(cookie_name, domain=domain, path=path)
+            return
+
+        expires_at = datetime.utcnow() + app.permanent_session_lifetime
+        needs_refresh = (
+            session.expires_at is None or
+            expires_at - session.expires_at > timedelta(seconds=SESSION_REFRESH_SECONDS)
+        )
+
+        if session.modified or session.new or needs_refresh:
+            self.collection.update_one(
+                {'_id': session.sid},
+                {'$set': {'data': dict(session), 'expires_at': expires_at}},
+                upsert=True
+            )
+            self._cache_set(session.sid, session, expires_at)
+        elif not self.should_set_cookie(app, session):
+            return
+
+        response.set_cookie(
+            cookie_name,
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
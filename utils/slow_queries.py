@@ -0,0 +1,319 @@
+"""
+Slow Query Log - MongoDB command monitoring with sampled explain plans
+File: utils/slow_queries.py
+
+Every MongoDB command slower than SLOW_QUERY_MS is recorded together with
+the Flask endpoint that issued it. For a sample of them the command is
+re-run as explain("executionStats") so collection scans, docs examined vs
+returned and index usage can be reviewed at /admin/slow-queries.
+
+Recording and explaining happen on a background thread; the listener itself
+only does a timing check and a queue put. The explain runs on whichever of
+our clients (MONGODB_URI for medicines, MONGO_URI for the user collections)
+is connected to the server that ran the command.
+
+IMPORTANT: like utils/metrics.py this must be imported before any
+MongoClient is created.
+"""
+
+from flask import has_request_context, request
+from pymongo import monitoring
+from datetime import datetime
+import logging
+import os
+import queue
+import random
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Commands slower than this (milliseconds) are logged
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '100'))
+
+# Fraction of slow commands that also get an explain plan
+SLOW_QUERY_EXPLAIN_SAMPLE = float(os.getenv('SLOW_QUERY_EXPLAIN_SAMPLE', '0.2'))
+
+# Size of the capped collection that stores the log
+SLOW_QUERY_LOG_BYTES = int(os.getenv('SLOW_QUERY_LOG_BYTES', str(16 * 1024 * 1024)))
+
+SLOW_QUERIES_COLLECTION = 'slow_queries'
+
+# Commands MongoDB can explain
+EXPLAINABLE_COMMANDS = {'find', 'aggregate', 'count', 'distinct', 'update', 'delete', 'findAndModify'}
+
+# Fields added by the driver that must not be sent back inside explain
+_DRIVER_FIELDS = {'lsid', '$db', '$clusterTime', '$readPreference', 'txnNumber',
+                  'autocommit', 'startTransaction', 'readConcern', 'writeConcern'}
+
+# Commands we never log (our own explain and log writes would loop)
+_IGNORED_COMMANDS = {'explain', 'hello', 'ismaster', 'isMaster', 'ping', 'endSessions',
+                     'saslStart', 'saslContinue', 'getMore', 'killCursors'}
+
+_queue = queue.Queue(maxsize=1000)
+_worker_started = False
+_worker_lock = threading.Lock()
+
+# ============================================
+# QUERY SHAPES (never store user data in the log)
+# ============================================
+
+def query_shape(value):
+    """Replace literal values with their type names, keep operators and field names"""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [query_shape(item) for item in value[:5]]
+    return type(value).__name__
+
+
+def _command_filter(command_name, command):
+    """Pull the filter/pipeline out of a command for display"""
+    if command_name == 'find':
+        return {'filter': command.get('filter', {}), 'sort': command.get('sort')}
+    if command_name == 'aggregate':
+        return {'pipeline': command.get('pipeline', [])}
+    if command_name in ('count', 'distinct'):
+        return {'query': command.get('query', {})}
+    if command_name == 'findAndModify':
+        return {'query': command.get('query', {})}
+    if command_name in ('update', 'delete'):
+        key = 'updates' if command_name == 'update' else 'deletes'
+        return {'q': [op.get('q', {}) for op in command.get(key, [])[:1]]}
+    return {}
+
+# ============================================
+# EXPLAIN SUMMARY
+# ============================================
+
+def _find_key(node, key):
+    """Depth-first search for the first value stored under key"""
+    if isinstance(node, dict):
+        if key in node:
+            return node[key]
+        children = node.values()
+    elif isinstance(node, list):
+        children = node
+    else:
+        return None
+    for child in children:
+        found = _find_key(child, key)
+        if found is not None:
+            return found
+    return None
+
+
+def _plan_stages(plan, stages, indexes):
+    """Collect stage names and index names from a (winning) plan tree"""
+    if not isinstance(plan, dict):
+        return
+    if 'stage' in plan:
+        stages.append(plan['stage'])
+    if 'indexName' in plan:
+        indexes.add(plan['indexName'])
+    # Newer servers nest the classic plan under queryPlan
+    for child_key in ('inputStage', 'queryPlan'):
+        _plan_stages(plan.get(child_key), stages, indexes)
+    for child in plan.get('inputStages', []):
+        _plan_stages(child, stages, indexes)
+
+
+def plan_outline(plan):
+    """Plan tree with only stage names, indexes and children (no literal values)"""
+    if not isinstance(plan, dict):
+        return None
+    outline = {key: plan[key] for key in ('stage', 'indexName', 'keyPattern', 'direction')
+               if key in plan}
+    for child_key in ('inputStage', 'queryPlan'):
+        if child_key in plan:
+            outline[child_key] = plan_outline(plan[child_key])
+    if 'inputStages' in plan:
+        outline['inputStages'] = [plan_outline(child) for child in plan['inputStages']]
+    return outline
+
+
+def summarize_explain(explain):
+    """
+    Reduce an explain("executionStats") result to the numbers we care about
+
+    Returns:
+        dict: stages, indexes used, COLLSCAN flag and docs examined/returned
+    """
+    stages, indexes = [], set()
+    _plan_stages(_find_key(explain, 'winningPlan'), stages, indexes)
+
+    stats = _find_key(explain, 'executionStats') or {}
+    docs_examined = stats.get('totalDocsExamined', 0)
+    returned = stats.get('nReturned', 0)
+
+    return {
+        'stages': stages,
+        'indexes': sorted(indexes),
+        'collscan': 'COLLSCAN' in stages,
+        'docs_examined': docs_examined,
+        'keys_examined': stats.get('totalKeysExamined', 0),
+        'returned': returned,
+        'examined_per_returned': round(docs_examined / max(returned, 1), 1),
+        'execution_ms': stats.get('executionTimeMillis'),
+    }
+
+# ============================================
+# BACKGROUND WRITER
+# ============================================
+
+def _log_collection():
+    from models.database import db
+
+    if SLOW_QUERIES_COLLECTION not in db.list_collection_names():
+        try:
+            db.create_collection(SLOW_QUERIES_COLLECTION, capped=True, size=SLOW_QUERY_LOG_BYTES)
+        except Exception:
+            pass  # Another worker created it first
+    return db[SLOW_QUERIES_COLLECTION]
+
+
+def _client_for(address):
+    """Our client connected to the server at address (host, port)"""
+    from models.database import client
+    from models.user_model import get_shared_db
+
+    for candidate in (client, get_shared_db().client):
+        if address in candidate.nodes:
+            return candidate
+    return client
+
+
+def _run_explain(address, database, command_name, command):
+    to_explain = {key: value for key, value in command.items() if key not in _DRIVER_FIELDS}
+    return _client_for(address)[database].command({'explain': to_explain, 'verbosity': 'executionStats'})
+
+
+def _writer():
+    collection = _log_collection()
+    while True:
+        entry, command, address = _queue.get()
+        try:
+            if command is not None:
+                explain = _run_explain(address, entry['database'], entry['command'], command)
+                entry['explain'] = summarize_explain(explain)
+                entry['winning_plan'] = plan_outline(_find_key(explain, 'winningPlan'))
+        except Exception as e:
+            entry['explain_error'] = str(e)
+        try:
+            collection.insert_one(entry)
+        except Exception:
+            logger.exception("Error writing slow query log")
+
+
+def _ensure_worker():
+    global _worker_started
+    if _worker_started:
+        return
+    with _worker_lock:
+        if not _worker_started:
+            threading.Thread(target=_writer, name='slow-query-log', daemon=True).start()
+            _worker_started = True
+
+# ============================================
+# COMMAND LISTENER
+# ============================================
+
+class SlowQueryListener(monitoring.CommandListener):
+    """Queues commands slower than SLOW_QUERY_MS for logging"""
+
+    def __init__(self):
+        self._pending = {}  # request_id -> (command, database, route)
+
+    def started(self, event):
+        if event.command_name in _IGNORED_COMMANDS:
+            return
+        collection = event.command.get(event.command_name)
+        if collection == SLOW_QUERIES_COLLECTION:
+            return
+        route = request.endpoint if has_request_context() else threading.current_thread().name
+        self._pending[event.request_id] = (event.command, event.database_name, route)
+
+    def succeeded(self, event):
+        pending = self._pending.pop(event.request_id, None)
+        if pending is None:
+            return
+        duration_ms = event.duration_micros / 1000
+        if duration_ms < SLOW_QUERY_MS:
+            return
+
+        command, database, route = pending
+        collection = command.get(event.command_name)
+        entry = {
+            'timestamp': datetime.utcnow(),
+            'database': database,
+            'collection': collection if isinstance(collection, str) else None,
+            'command': event.command_name,
+            'duration_ms': round(duration_ms, 1),
+            'route': route or 'unmatched',
+            'shape': query_shape(_command_filter(event.command_name, command)),
+        }
+        explain_command = None
+        if (event.command_name in EXPLAINABLE_COMMANDS and
+                random.random() < SLOW_QUERY_EXPLAIN_SAMPLE):
+            explain_command = command
+
+        _ensure_worker()
+        try:
+            _queue.put_nowait((entry, explain_command, event.connection_id))
+        except queue.Full:
+            pass  # Never slow down requests for the sake of the log
+
+    def failed(self, event):
+        self._pending.pop(event.request_id, None)
+
+
+monitoring.register(SlowQueryListener())
+
+# ============================================
+# REPORT
+# ============================================
+
+def slow_query_report(limit=50):
+    """
+    Group logged slow queries by collection, command, route and query shape
+
+    Args:
+        limit (int): Number of groups to return (slowest total time first)
+
+    Returns:
+        list: One dict per group with counts, timings and plan findings
+    """
+    from models.database import db
+
+    pipeline = [
+        {'$group': {
+            '_id': {
+                'collection': '$collection',
+                'command': '$command',
+                'route': '$route',
+                'shape': '$shape'
+            },
+            'count': {'$sum': 1},
+            'total_ms': {'$sum': '$duration_ms'},
+            'avg_ms': {'$avg': '$duration_ms'},
+            'max_ms': {'$max': '$duration_ms'},
+            'last_seen': {'$max': '$timestamp'},
+            'explained': {'$sum': {'$cond': [{'$ifNull': ['$explain', False]}, 1, 0]}},
+            'collscans': {'$sum': {'$cond': ['$explain.collscan', 1, 0]}},
+            'max_examined_per_returned': {'$max': '$explain.examined_per_returned'},
+            'indexes': {'$addToSet': '$explain.indexes'},
+            'sample_plan': {'$last': '$winning_plan'}
+        }},
+        {'$sort': {'total_ms': -1}},
+        {'$limit': limit}
+    ]
+
+    report = []
+    for group in db[SLOW_QUERIES_COLLECTION].aggregate(pipeline):
+        key = group.pop('_id')
+        indexes = sorted({name for names in group.pop('indexes') for name in names or []})
+        group.update(key)
+        group['indexes'] = indexes
+        group['avg_ms'] = round(group['avg_ms'], 1)
+        group['total_ms'] = round(group['total_ms'], 1)
+        report.append(group)
+    return report
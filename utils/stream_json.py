@@ -0,0 +1,327 @@
+"""
+Streaming JSON - Validate a medicine answer while the model is still writing it
+File: utils/stream_json.py
+
+MedicineStreamParser takes the model's output a chunk at a time (as tokens
+arrive over the streamed chat completion) and checks it against the medicine
+schema as it goes: one JSON object whose fields are strings, or arrays of
+strings for advice/warning. Values of any other field are skipped whatever
+their type (nested objects included) and left out of the result. As soon as
+the output can't turn into a valid answer, feed() raises StreamAbort so the
+caller can close the stream instead of paying for the rest of the generation:
+
+- structure that isn't JSON (after an optional ``` fence and a short preamble)
+- a required field with the wrong type (number, object, ...)
+- a field longer than its budget in FIELD_BUDGETS, or the whole answer
+  longer than MAX_ANSWER_CHARS
+- the object closing with required fields missing
+
+feed() returns True once the object is complete; anything after it (a
+closing fence, chatter) can be dropped by closing the stream.
+
+    parser = MedicineStreamParser()
+    for chunk in chunks:
+        if parser.feed(chunk):
+            break
+    medicine_info = parser.result()
+
+Measured with benchmarks/bench_stream_json.py.
+"""
+
+import json
+import os
+import re
+
+REQUIRED_FIELDS = ('name', 'description', 'advice', 'warning', 'pubmed_link')
+
+# Longest value accepted per field, in characters of JSON source
+# (array items are counted together). The prompt asks for far less.
+FIELD_BUDGETS = {
+    'name': 120,
+    'description': 1500,
+    'advice': 2000,
+    'warning': 2000,
+    'pubmed_link': 400,
+}
+EXTRA_FIELD_BUDGET = 1000
+
+MAX_ANSWER_CHARS = int(os.getenv('LM_MAX_ANSWER_CHARS', '8000'))
+
+# Text allowed before the opening '{' ("Here is the JSON:" and the like)
+MAX_PREAMBLE_CHARS = 200
+
+# Fields that may be an array of strings instead of one string
+LIST_FIELDS = ('advice', 'warning')
+
+_WHITESPACE = ' \t\r\n'
+_STRING_CHUNK = re.compile(r'[^"\\]+')
+# Characters that matter while skipping a value; everything else is passed over
+_SKIP_SPECIAL = re.compile(r'[\\"{}\[\],\s]')
+
+# Raw control characters inside strings are accepted (models emit real newlines)
+_decoder = json.JSONDecoder(strict=False)
+
+# Parser states
+_PREAMBLE, _KEY_OR_END, _KEY, _COLON, _VALUE, _STRING, _ARRAY_ITEM, \
+    _ARRAY_STRING, _ARRAY_NEXT, _SKIP, _AFTER_VALUE, _DONE = range(12)
+
+
+class StreamAbort(ValueError):
+    """The answer can't become a valid medicine; stop generating it"""
+
+    def __init__(self, reason, detail=''):
+        super().__init__(f"{reason}: {detail}" if detail else reason)
+        self.reason = reason  # Short, fixed label (used for metrics)
+        self.detail = detail
+
+
+class MedicineStreamParser:
+    """Incremental parser/validator for one medicine JSON object"""
+
+    def __init__(self, budgets=FIELD_BUDGETS, max_chars=MAX_ANSWER_CHARS):
+        self.budgets = budgets
+        self.max_chars = max_chars
+        self.fields = {}
+        self.chars = 0
+
+        self._state = _PREAMBLE
+        self._preamble = 0
+        self._key = None
+        self._raw = []        # Undecoded pieces of the current string
+        self._raw_length = 0  # Characters in the current field so far
+        self._escape = False  # Last chunk ended on a backslash
+        self._items = None    # Decoded items of the current array
+        self._skip_depth = 0        # Open {/[ in the value being skipped
+        self._skip_string = False   # Inside a string in the value being skipped
+
+    @property
+    def done(self):
+        return self._state == _DONE
+
+    def feed(self, text):
+        """
+        Consume the next chunk of model output
+
+        Returns:
+            bool: True once the object is complete
+
+        Raises:
+            StreamAbort: the answer can't be valid any more
+        """
+        if self._state == _DONE:
+            return True
+        self.chars += len(text)
+        if self.chars > self.max_chars:
+            raise StreamAbort('too_large', f'{self.chars} characters')
+
+        i, end = 0, len(text)
+        while i < end:
+            state = self._state
+
+            if state == _KEY or state == _STRING or state == _ARRAY_STRING:
+                i = self._read_string(text, i)
+                continue
+
+            if state == _SKIP:
+                i = self._skip_value(text, i)
+                continue
+
+            char = text[i]
+
+            if char in _WHITESPACE:
+                i += 1
+                continue
+
+            if state == _PREAMBLE:
+                if char == '{':
+                    self._state = _KEY_OR_END
+                else:
+                    # ``` fences and a short lead-in sentence are tolerated
+                    self._preamble += 1
+                    if self._preamble > MAX_PREAMBLE_CHARS:
+                        raise StreamAbort('preamble', 'no JSON object found')
+            elif state == _KEY_OR_END:
+                if char == '"':
+                    self._start_string(_KEY)
+                elif char == '}':
+                    self._close_object()
+                else:
+                    raise StreamAbort('malformed', f'expected a field name, got {char!r}')
+            elif state == _COLON:
+                if char != ':':
+                    raise StreamAbort('malformed', f"expected ':' after {self._key!r}")
+                self._state = _VALUE
+            elif state == _VALUE:
+                self._start_value(char)
+                if self._state == _SKIP:
+                    continue  # The character is part of the skipped value
+            elif state == _ARRAY_ITEM:
+                if char == '"':
+                    self._start_string(_ARRAY_STRING)
+                elif char == ']':
+                    self._finish_value(self._items)
+                else:
+                    raise StreamAbort('bad_type', f'{self._key} must be a list of strings')
+            elif state == _ARRAY_NEXT:
+                if char == ',':
+                    self._state = _ARRAY_ITEM
+                elif char == ']':
+                    self._finish_value(self._items)
+                else:
+                    raise StreamAbort('malformed', f"expected ',' or ']' in {self._key}")
+            elif state == _AFTER_VALUE:
+                if char == ',':
+                    self._state = _KEY_OR_END
+                elif char == '}':
+                    self._close_object()
+                else:
+                    raise StreamAbort('malformed', f"expected ',' or '}}' after {self._key}")
+            i += 1
+
+            if self._state == _DONE:
+                return True
+        return False
+
+    def result(self):
+        """
+        The parsed fields (advice/warning joined into newline-separated text)
+
+        Raises:
+            StreamAbort: the object never closed
+        """
+        if self._state != _DONE:
+            raise StreamAbort('incomplete', 'answer ended before the JSON object closed')
+        return dict(self.fields)
+
+    # ---- strings ----
+
+    def _start_string(self, state):
+        self._state = state
+        self._raw = []
+        if state != _ARRAY_STRING:
+            self._raw_length = 0
+
+    def _read_string(self, text, i):
+        """Consume string content from text[i:], return the next index"""
+        if self._escape:
+            self._escape = False
+            self._add_raw(text[i])
+            return i + 1
+
+        match = _STRING_CHUNK.match(text, i)
+        if match:
+            self._add_raw(match.group())
+            return match.end()
+
+        if text[i] == '\\':
+            self._add_raw('\\')
+            if i + 1 < len(text):
+                self._add_raw(text[i + 1])
+                return i + 2
+            self._escape = True
+            return i + 1
+
+        # Closing quote
+        value = self._decode_string()
+        if self._state == _KEY:
+            self._key = value
+            self._raw_length = 0
+            self._state = _COLON
+        elif self._state == _ARRAY_STRING:
+            self._items.append(value)
+            self._state = _ARRAY_NEXT
+        else:
+            self._finish_value(value)
+        return i + 1
+
+    def _add_raw(self, piece):
+        self._raw.append(piece)
+        self._raw_length += len(piece)
+        if self._state == _KEY:
+            if self._raw_length > 100:
+                raise StreamAbort('malformed', 'field name too long')
+        elif self._raw_length > self.budgets.get(self._key, EXTRA_FIELD_BUDGET):
+            raise StreamAbort('too_long', self._key)
+
+    def _decode_string(self):
+        try:
+            return _decoder.decode('"' + ''.join(self._raw) + '"')
+        except ValueError:
+            raise StreamAbort('malformed', f'bad string escape in {self._key!r}') from None
+
+    # ---- values ----
+
+    def _start_value(self, char):
+        if self._key not in REQUIRED_FIELDS:
+            if char not in '"{[-0123456789tfn':
+                raise StreamAbort('malformed', f'unexpected {char!r} for {self._key!r}')
+            # A field we don't use: skip its value, whatever it holds
+            self._raw_length = 0
+            self._skip_depth = 0
+            self._skip_string = False
+            self._state = _SKIP
+        elif char == '"':
+            self._start_string(_STRING)
+        elif char == '[' and self._key in LIST_FIELDS:
+            self._items = []
+            self._raw_length = 0
+            self._state = _ARRAY_ITEM
+        else:
+            raise StreamAbort('bad_type', f'{self._key} must be a string')
+
+    def _skip_value(self, text, i):
+        """
+        Pass over part of an unused field's value in text[i:], return the next
+        index. Only strings and bracket nesting are tracked, enough to find
+        where the value ends; it still counts against the field budget.
+        """
+        start, end = i, len(text)
+        finished = False
+        while i < end:
+            if self._escape:
+                self._escape = False
+                i += 1
+                continue
+            match = _SKIP_SPECIAL.search(text, i)
+            if not match:
+                i = end
+                break
+            i = match.start()
+            char = text[i]
+            if self._skip_string:
+                if char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._skip_string = False
+                    finished = not self._skip_depth
+            elif char == '"':
+                self._skip_string = True
+            elif char in '{[':
+                self._skip_depth += 1
+            elif char in '}]' and self._skip_depth:
+                self._skip_depth -= 1
+                finished = not self._skip_depth
+            elif not self._skip_depth:
+                break  # ',', '}' or whitespace after a number/true/false/null
+            i += 1
+            if finished:
+                break
+
+        self._raw_length += i - start
+        if self._raw_length > self.budgets.get(self._key, EXTRA_FIELD_BUDGET):
+            raise StreamAbort('too_long', self._key)
+        if finished or i < end:
+            self._state = _AFTER_VALUE
+        return i
+
+    def _finish_value(self, value):
+        if isinstance(value, list) and self._key in LIST_FIELDS:
+            value = '\n'.join(value)
+        self.fields[self._key] = value
+        self._state = _AFTER_VALUE
+
+    def _close_object(self):
+        missing = [field for field in REQUIRED_FIELDS if field not in self.fields]
+        if missing:
+            raise StreamAbort('missing_fields', ', '.join(missing))
+        self._state = _DONE
@@ -0,0 +1,11 @@
+"""
+WSGI Entry Point - Production Server
+File: wsgi.py
+
+Run with:
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+from app import create_app
+
+app = create_app()